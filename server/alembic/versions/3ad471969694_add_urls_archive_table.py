@@ -0,0 +1,44 @@
+"""add_urls_archive_table
+
+Revision ID: 3ad471969694
+Revises: 04d78d97baeb
+Create Date: 2026-10-19 09:12:41.204518
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3ad471969694"
+down_revision: Union[str, Sequence[str], None] = "04d78d97baeb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	op.create_table(
+		"urls_archive",
+		sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+		sa.Column("key", sa.String(), nullable=False),
+		sa.Column("secret_key", sa.String(), nullable=True),
+		sa.Column("target_url", sa.String(), nullable=True),
+		sa.Column("is_active", sa.Boolean(), nullable=True),
+		sa.Column("clicks", sa.Integer(), nullable=True),
+		sa.Column("created_at", sa.DateTime(), nullable=False),
+		sa.Column("archived_at", sa.DateTime(), nullable=False),
+		sa.PrimaryKeyConstraint("id"),
+	)
+	op.create_index(
+		op.f("ix_urls_archive_key"), "urls_archive", ["key"], unique=True
+	)
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	op.drop_index(op.f("ix_urls_archive_key"), table_name="urls_archive")
+	op.drop_table("urls_archive")
@@ -0,0 +1,67 @@
+"""drop_secret_key_index
+
+Revision ID: 5b7e0c3d9a21
+Revises: 8c1f5e2a7d40
+Create Date: 2026-10-19 15:40:52.118204
+
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7e0c3d9a21"
+down_revision: Union[str, Sequence[str], None] = "8c1f5e2a7d40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+urls = sa.table(
+	"urls", sa.column("id"), sa.column("key"), sa.column("secret_key")
+)
+
+
+def derive_secret_key(server_secret: str, key: str) -> str:
+	"""Secret key derivation of this revision (see security.py at the time)."""
+	mac = hmac.digest(server_secret.encode(), key.encode(), hashlib.sha256)
+	return f"{key}_{base64.b32encode(mac[:10]).decode()}"
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# Admin lookups now go through the key index and verify the secret
+	# (see crud.get_db_url_by_secret_key). Existing rows keep their stored
+	# secret key, so their admin URLs stay valid; rows created with
+	# SECRET_KEY_HMAC set store NULL.
+	op.drop_index(op.f("ix_urls_secret_key"), table_name="urls")
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	# Older code finds URLs by stored secret key only: store the derived
+	# ones (this needs the same SECRET_KEY_HMAC the rows were created with,
+	# from the environment)
+	bind = op.get_bind()
+	rows = bind.execute(
+		sa.select(urls.c.id, urls.c.key).where(urls.c.secret_key.is_(None))
+	).all()
+	server_secret = os.environ.get("SECRET_KEY_HMAC", "")
+	if rows and not server_secret:
+		raise RuntimeError(
+			"SECRET_KEY_HMAC must be set to store the derived secret keys"
+		)
+	for url_id, key in rows:
+		bind.execute(
+			urls.update()
+			.where(urls.c.id == url_id)
+			.values(secret_key=derive_secret_key(server_secret, key))
+		)
+	op.create_index(
+		op.f("ix_urls_secret_key"), "urls", ["secret_key"], unique=True
+	)
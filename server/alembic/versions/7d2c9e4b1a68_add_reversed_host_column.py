@@ -0,0 +1,101 @@
+"""add_reversed_host_column
+
+Revision ID: 7d2c9e4b1a68
+Revises: a3d6b1f07e52
+Create Date: 2026-10-19 18:12:37.502816
+
+"""
+
+from typing import Optional, Sequence, Union
+from urllib.parse import urlsplit
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7d2c9e4b1a68"
+down_revision: Union[str, Sequence[str], None] = "a3d6b1f07e52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_CHUNK = 5000
+
+urls = sa.table(
+	"urls",
+	sa.column("id"),
+	sa.column("target_url"),
+	sa.column("reversed_host"),
+)
+
+
+def reversed_target_host(url: Optional[str]) -> Optional[str]:
+	"""
+	Reversed-label host of a URL, as app/utils/hosts.py computed it at this
+	revision: lowercased, without trailing dot, IDNA encoded.
+	"""
+	try:
+		host = (urlsplit(url or "").hostname or "").strip().rstrip(".").lower()
+	except ValueError:
+		return None
+	if not host or ".." in host:
+		return None
+	if host.isascii():
+		labels = host.split(".")
+		if not labels[0] or max(map(len, labels)) > 63:
+			return None
+	else:
+		try:
+			host = host.encode("idna").decode("ascii")
+		except UnicodeError:
+			return None
+	return ".".join(reversed(host.split(".")))
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# Target host with reversed labels, for takedowns by domain (see
+	# app/utils/hosts.py). Compared bytewise, hence collation "C".
+	op.add_column(
+		"urls",
+		sa.Column(
+			"reversed_host",
+			sa.String().with_variant(sa.String(collation="C"), "postgresql"),
+		),
+	)
+
+	# Backfill in id order, one chunk per statement batch
+	bind = op.get_bind()
+	last_id = 0
+	while rows := bind.execute(
+		sa.select(urls.c.id, urls.c.target_url)
+		.where(urls.c.id > last_id)
+		.order_by(urls.c.id)
+		.limit(BACKFILL_CHUNK)
+	).all():
+		bind.execute(
+			urls.update()
+			.where(urls.c.id == sa.bindparam("row_id"))
+			.values(reversed_host=sa.bindparam("host")),
+			[
+				{"row_id": row_id, "host": reversed_target_host(target_url)}
+				for row_id, target_url in rows
+			],
+		)
+		last_id = rows[-1].id
+
+	# Active rows only, so deactivated rows leave it during a takedown
+	op.create_index(
+		"ix_urls_reversed_host",
+		"urls",
+		["reversed_host"],
+		postgresql_where=sa.text("is_active"),
+		sqlite_where=sa.text("is_active = 1"),
+	)
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	op.drop_index("ix_urls_reversed_host", table_name="urls")
+	with op.batch_alter_table("urls") as batch_op:
+		batch_op.drop_column("reversed_host")
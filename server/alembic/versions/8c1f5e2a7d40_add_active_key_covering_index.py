@@ -0,0 +1,47 @@
+"""add_active_key_covering_index
+
+Revision ID: 8c1f5e2a7d40
+Revises: 3ad471969694
+Create Date: 2026-10-19 11:02:17.583920
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c1f5e2a7d40"
+down_revision: Union[str, Sequence[str], None] = "3ad471969694"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# Covering index for the redirect lookup (key + is_active -> id,
+	# target_url). PostgreSQL gets a partial unique index with INCLUDE;
+	# SQLite has no INCLUDE, so the payload becomes trailing key columns.
+	if op.get_bind().dialect.name == "postgresql":
+		op.create_index(
+			"ix_urls_active_key",
+			"urls",
+			["key"],
+			unique=True,
+			postgresql_include=["id", "target_url"],
+			postgresql_where=sa.text("is_active"),
+		)
+	else:
+		op.create_index(
+			"ix_urls_active_key",
+			"urls",
+			["key", "target_url", "is_active"],
+			sqlite_where=sa.text("is_active = 1"),
+		)
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	op.drop_index("ix_urls_active_key", table_name="urls")
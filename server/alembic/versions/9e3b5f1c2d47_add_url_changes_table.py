@@ -0,0 +1,47 @@
+"""add_url_changes_table
+
+Revision ID: 9e3b5f1c2d47
+Revises: 7d2c9e4b1a68
+Create Date: 2026-10-19 19:05:12.318604
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e3b5f1c2d47"
+down_revision: Union[str, Sequence[str], None] = "7d2c9e4b1a68"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# URL changes read by every worker to invalidate its redirect cache
+	# (see app/core/invalidation.py)
+	op.create_table(
+		"url_changes",
+		sa.Column("id", sa.Integer(), nullable=False),
+		sa.Column("key", sa.String(), nullable=True),
+		sa.Column("reversed_domain", sa.String(), nullable=True),
+		sa.Column("created_at", sa.DateTime(), nullable=False),
+		sa.PrimaryKeyConstraint("id"),
+		# Ids only grow, even after pruning empties the table
+		sqlite_autoincrement=True,
+	)
+	op.create_index(
+		op.f("ix_url_changes_created_at"),
+		"url_changes",
+		["created_at"],
+		unique=False,
+	)
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	op.drop_index(op.f("ix_url_changes_created_at"), table_name="url_changes")
+	op.drop_table("url_changes")
@@ -0,0 +1,34 @@
+"""add_url_version_column
+
+Revision ID: a3d6b1f07e52
+Revises: e2a94f61c8b3
+Create Date: 2026-10-19 17:02:44.190537
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3d6b1f07e52"
+down_revision: Union[str, Sequence[str], None] = "e2a94f61c8b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# Version tag behind the peek/admin ETags; existing rows start at 1
+	op.add_column(
+		"urls",
+		sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+	)
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	with op.batch_alter_table("urls") as batch_op:
+		batch_op.drop_column("version")
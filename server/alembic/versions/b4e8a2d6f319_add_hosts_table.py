@@ -0,0 +1,167 @@
+"""add_hosts_table
+
+Revision ID: b4e8a2d6f319
+Revises: 9e3b5f1c2d47
+Create Date: 2026-10-19 21:34:48.162097
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b4e8a2d6f319"
+down_revision: Union[str, Sequence[str], None] = "9e3b5f1c2d47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_CHUNK = 5000
+
+hosts = sa.table(
+	"hosts",
+	sa.column("id"),
+	sa.column("origin", sa.String()),
+)
+urls = sa.table(
+	"urls",
+	sa.column("id"),
+	sa.column("target_url", sa.String()),
+	sa.column("host_id"),
+	sa.column("target_path", sa.String()),
+)
+
+
+def split_target(url: str) -> tuple[str, str]:
+	"""Origin and rest of a URL, verbatim (see hosts.split_target)."""
+	start = url.find("://")
+	if start < 0:
+		return "", url
+	end = start + 3
+	while end < len(url) and url[end] not in "/?#":
+		end += 1
+	return url[:end], url[end:]
+
+
+def create_active_key_index(payload: list[str]):
+	"""Covering index of the redirect lookup, carrying `payload` columns."""
+	if op.get_bind().dialect.name == "postgresql":
+		op.create_index(
+			"ix_urls_active_key",
+			"urls",
+			["key"],
+			unique=True,
+			postgresql_include=["id", *payload],
+			postgresql_where=sa.text("is_active"),
+		)
+	else:
+		op.create_index(
+			"ix_urls_active_key",
+			"urls",
+			["key", *payload, "is_active"],
+			sqlite_where=sa.text("is_active = 1"),
+		)
+
+
+def backfill_hosts():
+	"""Split every target_url into a host id and a target path."""
+	bind = op.get_bind()
+	host_ids = dict(bind.execute(sa.select(hosts.c.origin, hosts.c.id)).all())
+	last_id = 0
+	while rows := bind.execute(
+		sa.select(urls.c.id, urls.c.target_url)
+		.where(urls.c.id > last_id)
+		.order_by(urls.c.id)
+		.limit(BACKFILL_CHUNK)
+	).all():
+		targets = {row_id: split_target(url or "") for row_id, url in rows}
+		new_origins = {
+			origin
+			for origin, _ in targets.values()
+			if origin and origin not in host_ids
+		}
+		if new_origins:
+			bind.execute(
+				hosts.insert(), [{"origin": origin} for origin in new_origins]
+			)
+			host_ids.update(
+				bind.execute(
+					sa.select(hosts.c.origin, hosts.c.id).where(
+						hosts.c.origin.in_(new_origins)
+					)
+				).all()
+			)
+		bind.execute(
+			urls.update()
+			.where(urls.c.id == sa.bindparam("row_id"))
+			.values(
+				host_id=sa.bindparam("host"), target_path=sa.bindparam("path")
+			),
+			[
+				{"row_id": row_id, "host": host_ids.get(origin), "path": path}
+				for row_id, (origin, path) in targets.items()
+			],
+		)
+		last_id = rows[-1].id
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# Target origins, shared by many URLs: rows keep a host id and the rest
+	# of their target (see hosts.split_target), which narrows the rows and
+	# the covering index of the redirect lookup
+	op.create_table(
+		"hosts",
+		sa.Column("id", sa.Integer(), nullable=False),
+		sa.Column("origin", sa.String(), nullable=False),
+		sa.PrimaryKeyConstraint("id"),
+	)
+	op.create_index(op.f("ix_hosts_origin"), "hosts", ["origin"], unique=True)
+	op.add_column("urls", sa.Column("host_id", sa.Integer()))
+	op.add_column("urls", sa.Column("target_path", sa.String()))
+	backfill_hosts()
+
+	op.drop_index("ix_urls_active_key", table_name="urls")
+	op.drop_index(op.f("ix_urls_target_url"), table_name="urls")
+	with op.batch_alter_table("urls") as batch_op:
+		batch_op.drop_column("target_url")
+		batch_op.alter_column(
+			"target_path", existing_type=sa.String(), nullable=False
+		)
+		batch_op.create_foreign_key(
+			"fk_urls_host_id_hosts", "hosts", ["host_id"], ["id"]
+		)
+	op.create_index(op.f("ix_urls_host_id"), "urls", ["host_id"])
+	create_active_key_index(
+		["host_id", "target_path", "redirect_status", "cache_max_age"]
+	)
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	op.drop_index("ix_urls_active_key", table_name="urls")
+	op.drop_index(op.f("ix_urls_host_id"), table_name="urls")
+	op.add_column("urls", sa.Column("target_url", sa.String()))
+	op.execute(
+		urls.update().values(
+			target_url=sa.func.coalesce(
+				sa.select(hosts.c.origin)
+				.where(hosts.c.id == urls.c.host_id)
+				.scalar_subquery(),
+				"",
+			)
+			+ urls.c.target_path
+		)
+	)
+	with op.batch_alter_table("urls") as batch_op:
+		batch_op.drop_constraint("fk_urls_host_id_hosts", type_="foreignkey")
+		batch_op.drop_column("target_path")
+		batch_op.drop_column("host_id")
+	op.create_index(op.f("ix_urls_target_url"), "urls", ["target_url"])
+	create_active_key_index(
+		["target_url", "redirect_status", "cache_max_age"]
+	)
+	op.drop_index(op.f("ix_hosts_origin"), table_name="hosts")
+	op.drop_table("hosts")
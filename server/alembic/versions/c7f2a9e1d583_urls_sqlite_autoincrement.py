@@ -0,0 +1,49 @@
+"""urls_sqlite_autoincrement
+
+Revision ID: c7f2a9e1d583
+Revises: b4e8a2d6f319
+Create Date: 2026-10-20 10:12:41.906315
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c7f2a9e1d583"
+down_revision: Union[str, Sequence[str], None] = "b4e8a2d6f319"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# SQLite hands out max(id) + 1 without AUTOINCREMENT: once the newest
+	# row is archived its id comes back, and archiving the new row fails on
+	# the archive's primary key. PostgreSQL sequences never go back.
+	if op.get_bind().dialect.name != "sqlite":
+		return
+	with op.batch_alter_table(
+		"urls", recreate="always", table_kwargs={"sqlite_autoincrement": True}
+	):
+		pass
+	# Start after every id in use so far, archived ones included
+	op.execute("DELETE FROM sqlite_sequence WHERE name = 'urls'")
+	op.execute(
+		"INSERT INTO sqlite_sequence (name, seq) SELECT 'urls', "
+		"max(coalesce((SELECT max(id) FROM urls), 0), "
+		"coalesce((SELECT max(id) FROM urls_archive), 0))"
+	)
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	if op.get_bind().dialect.name != "sqlite":
+		return
+	with op.batch_alter_table(
+		"urls", recreate="always", table_kwargs={"sqlite_autoincrement": False}
+	):
+		pass
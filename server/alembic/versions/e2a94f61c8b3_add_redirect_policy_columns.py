@@ -0,0 +1,58 @@
+"""add_redirect_policy_columns
+
+Revision ID: e2a94f61c8b3
+Revises: 5b7e0c3d9a21
+Create Date: 2026-10-19 16:21:05.734411
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a94f61c8b3"
+down_revision: Union[str, Sequence[str], None] = "5b7e0c3d9a21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def create_active_key_index(payload: list[str]):
+	"""Covering index of the redirect lookup, carrying `payload` columns."""
+	if op.get_bind().dialect.name == "postgresql":
+		op.create_index(
+			"ix_urls_active_key",
+			"urls",
+			["key"],
+			unique=True,
+			postgresql_include=["id", *payload],
+			postgresql_where=sa.text("is_active"),
+		)
+	else:
+		op.create_index(
+			"ix_urls_active_key",
+			"urls",
+			["key", *payload, "is_active"],
+			sqlite_where=sa.text("is_active = 1"),
+		)
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# Per-URL redirect policy, NULL = global default. The redirect lookup
+	# reads both columns, so the covering index is rebuilt to carry them.
+	op.add_column("urls", sa.Column("redirect_status", sa.Integer()))
+	op.add_column("urls", sa.Column("cache_max_age", sa.Integer()))
+	op.drop_index("ix_urls_active_key", table_name="urls")
+	create_active_key_index(["target_url", "redirect_status", "cache_max_age"])
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	op.drop_index("ix_urls_active_key", table_name="urls")
+	create_active_key_index(["target_url"])
+	with op.batch_alter_table("urls") as batch_op:
+		batch_op.drop_column("cache_max_age")
+		batch_op.drop_column("redirect_status")
@@ -0,0 +1,52 @@
+"""unify_active_key_index
+
+Revision ID: f3b8d2c6a915
+Revises: c7f2a9e1d583
+Create Date: 2026-10-21 09:47:03.218554
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b8d2c6a915"
+down_revision: Union[str, Sequence[str], None] = "c7f2a9e1d583"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PAYLOAD = ["host_id", "target_path", "redirect_status", "cache_max_age"]
+
+
+def upgrade() -> None:
+	"""Upgrade schema."""
+	# One definition for every dialect: the payload columns become key
+	# columns on PostgreSQL too, as they already were on SQLite
+	if op.get_bind().dialect.name != "postgresql":
+		return
+	op.drop_index("ix_urls_active_key", table_name="urls")
+	op.create_index(
+		"ix_urls_active_key",
+		"urls",
+		["key", *PAYLOAD, "is_active"],
+		postgresql_include=["id"],
+		postgresql_where=sa.text("is_active"),
+	)
+
+
+def downgrade() -> None:
+	"""Downgrade schema."""
+	if op.get_bind().dialect.name != "postgresql":
+		return
+	op.drop_index("ix_urls_active_key", table_name="urls")
+	op.create_index(
+		"ix_urls_active_key",
+		"urls",
+		["key"],
+		unique=True,
+		postgresql_include=["id", *PAYLOAD],
+		postgresql_where=sa.text("is_active"),
+	)
@@ -1,4 +1,13 @@
-from app import models, schemas
-from app.core.database import Base
+import importlib
 
 __all__ = ["models", "schemas", "Base"]
+
+
+def __getattr__(name: str):
+	# Imported on first access so that importing one module of the package
+	# (e.g. app.core.config) doesn't load SQLAlchemy models and schemas
+	if name in ("models", "schemas"):
+		return importlib.import_module(f"app.{name}")
+	if name == "Base":
+		return importlib.import_module("app.core.database").Base
+	raise AttributeError(f"module 'app' has no attribute '{name}'")
@@ -1,32 +1,207 @@
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from sqlalchemy import (
+	ColumnElement,
+	Row,
+	and_,
+	delete,
+	exists,
+	func,
+	insert,
+	or_,
+	select,
+	text,
+	update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app import models, schemas
-from app.utils import keygen
+from app.core import security
+from app.core.config import get_settings
+from app.core.hostcache import HOST_CACHE
+from app.core.keyindex import KEY_INDEX
+from app.core.metrics import KEYGEN_RETRIES
+from app.utils import hosts, keygen
+
+# Random keys tried before giving up on a create (see create_db_url)
+RANDOM_KEY_ATTEMPTS = 5
+# PostgreSQL channel notified of every recorded URL change
+CHANGES_CHANNEL = "url_changes"
+
+# Columns a redirect needs, all in the `ix_urls_active_key` covering index
+REDIRECT_COLUMNS = (
+	models.URL.key,
+	models.URL.id,
+	models.URL.host_id,
+	models.URL.target_path,
+	models.URL.redirect_status,
+	models.URL.cache_max_age,
+)
+
+
+class RedirectRow(NamedTuple):
+	"""Redirect columns, with the target URL joined back together."""
+
+	key: str
+	id: int
+	target_url: str
+	redirect_status: Optional[int]
+	cache_max_age: Optional[int]
+
+
+class PeekRow(NamedTuple):
+	"""URLPeek fields of a URL, archived or not."""
+
+	key: str
+	target_url: str
+	is_active: bool
+	clicks: int
+	created_at: datetime
+
+
+def get_host_id(db: Session, origin: str) -> Optional[int]:
+	"""
+	Get the id of a target origin, adding it to `hosts` on first use.
+
+	Served by the host cache for known origins. A new origin is inserted
+	and committed on its own, before the URL using it; if another worker
+	inserts it at the same time, the insert is skipped.
+
+	Args:
+		db: Database session
+		origin: Scheme and authority (see hosts.split_target)
+
+	Returns:
+		Host id, None for an empty origin
+	"""
+	if not origin:
+		return None
+	if (host_id := HOST_CACHE.get_id(origin)) is not None:
+		return host_id
+	query = select(models.Host.id).where(models.Host.origin == origin)
+	host_id = db.scalar(query)
+	if host_id is None:
+		dialect = sqlite
+		if db.get_bind().dialect.name == "postgresql":
+			dialect = postgresql
+		db.execute(
+			dialect.insert(models.Host)
+			.values(origin=origin)
+			.on_conflict_do_nothing(index_elements=["origin"])
+		)
+		db.commit()
+		host_id = db.scalar(query)
+	HOST_CACHE.add(host_id, origin)
+	return host_id
+
+
+def get_origins(
+	db: Session, host_ids: Iterable[Optional[int]]
+) -> dict[int, str]:
+	"""
+	Get the origins of host ids, from the host cache or in one query.
+
+	Args:
+		db: Database session
+		host_ids: Host ids (duplicates and None are fine)
+
+	Returns:
+		Dict of host id to origin
+	"""
+	origins = {}
+	missing = []
+	for host_id in set(host_ids) - {None}:
+		if (origin := HOST_CACHE.get_origin(host_id)) is not None:
+			origins[host_id] = origin
+		else:
+			missing.append(host_id)
+	if missing:
+		query = select(models.Host.id, models.Host.origin).where(
+			models.Host.id.in_(missing)
+		)
+		for host_id, origin in db.execute(query):
+			HOST_CACHE.add(host_id, origin)
+			origins[host_id] = origin
+	return origins
+
+
+def _redirect_rows(db: Session, rows: list[Row]) -> list[RedirectRow]:
+	origins = get_origins(db, (row.host_id for row in rows))
+	return [
+		RedirectRow(
+			row.key,
+			row.id,
+			origins.get(row.host_id, "") + row.target_path,
+			row.redirect_status,
+			row.cache_max_age,
+		)
+		for row in rows
+	]
 
 
 def create_db_url(db: Session, url: schemas.URLBase) -> models.URL:
-	# Use custom key if provided, otherwise generate random key
-	if url.custom_key:
-		# Custom key is already validated by Pydantic schema
-		# Just need to check if it's available
-		if not keygen.is_key_available(db, url.custom_key):
-			# This will be handled by the endpoint with HTTPException
-			# Return None to signal key is taken
-			return None
-		key = url.custom_key
-	else:
-		key = keygen.create_unique_random_key(db)
-
-	secret_key = f"{key}_{keygen.create_random_key(length=8)}"
-	db_url = models.URL(
-		target_url=url.target_url,
-		key=key,
-		secret_key=secret_key,
-	)
+	"""
+	Create a URL with its custom key, or with a random one.
 
-	db.add(db_url)
-	db.commit()
+	The UNIQUE constraint on `key` is the final check: a custom key taken
+	since the availability check gives None, a random key taken by another
+	worker after this one built its key index is replaced by a new one, up
+	to RANDOM_KEY_ATTEMPTS times.
+
+	Args:
+		db: Database session
+		url: URL to create
+
+	Returns:
+		Created URL, None if the custom key is taken
+
+	Raises:
+		IntegrityError: No random key could be inserted
+	"""
+	# Custom key is already validated by Pydantic schema
+	# Just need to check if it's available
+	if url.custom_key and not keygen.is_key_available(db, url.custom_key):
+		# This will be handled by the endpoint with HTTPException
+		return None
+	origin, target_path = hosts.split_target(url.target_url)
+	host_id = get_host_id(db, origin)
+
+	for attempt in range(1, RANDOM_KEY_ATTEMPTS + 1):
+		key = url.custom_key or keygen.create_unique_random_key(db)
+		# Derived secret keys are recomputed on lookup, so nothing is stored
+		secret_key = None
+		if not get_settings().secret_key_hmac:
+			secret_key = f"{key}_{keygen.create_random_key(length=8)}"
+		db_url = models.URL(
+			host_id=host_id,
+			target_path=target_path,
+			reversed_host=hosts.reversed_target_host(url.target_url),
+			key=key,
+			secret_key=secret_key,
+			redirect_status=url.redirect_status,
+			cache_max_age=url.cache_max_age,
+		)
+		db.add(db_url)
+		try:
+			db.commit()
+			break
+		except IntegrityError:
+			db.rollback()
+			# Taken since the availability check, or created by another
+			# worker after this one built its key index
+			if KEY_INDEX.ready:
+				KEY_INDEX.add(key)
+			if url.custom_key:
+				return None
+			if attempt == RANDOM_KEY_ATTEMPTS:
+				raise
+			KEYGEN_RETRIES.inc()
 	db.refresh(db_url)
+	if KEY_INDEX.ready:
+		KEY_INDEX.add(key)
 
 	return db_url
 
@@ -39,24 +214,166 @@ def get_db_url_by_key(db: Session, url_key: str) -> models.URL:
 	)
 
 
+def get_redirect_target(db: Session, url_key: str) -> RedirectRow | None:
+	"""
+	Get the id, target URL and redirect policy of an active URL.
+
+	Only reads columns carried by the `ix_urls_active_key` covering index,
+	so the lookup is an index-only scan instead of index probe + row fetch.
+	SQLite always prefers the plain unique index on `key`, hence the hint
+	(rendered by app/core/database.py).
+	The target URL is rebuilt with the origin from the host cache.
+
+	Args:
+		db: Database session
+		url_key: URL key
+
+	Returns:
+		RedirectRow if an active URL exists, None otherwise
+	"""
+	query = (
+		select(*REDIRECT_COLUMNS)
+		.where(models.URL.key == url_key, models.URL.is_active)
+		.with_hint(
+			models.URL, "INDEXED BY ix_urls_active_key", dialect_name="sqlite"
+		)
+	)
+	if row := db.execute(query).first():
+		return _redirect_rows(db, [row])[0]
+	return None
+
+
+def get_popular_redirect_targets(db: Session, limit: int) -> list[RedirectRow]:
+	"""
+	Get redirect rows of the most clicked active URLs, for cache warm-up.
+
+	Args:
+		db: Database session
+		limit: Maximum number of rows
+
+	Returns:
+		RedirectRows like get_redirect_target's, most clicked first
+	"""
+	query = (
+		select(*REDIRECT_COLUMNS)
+		.where(models.URL.is_active)
+		.order_by(models.URL.clicks.desc())
+		.limit(limit)
+	)
+	return _redirect_rows(db, db.execute(query).all())
+
+
+def get_url_version(db: Session, url_key: str) -> Row | None:
+	"""
+	Get what conditional requests are answered from, without the full row.
+
+	Args:
+		db: Database session
+		url_key: URL key
+
+	Returns:
+		Row with `id`, `key`, `secret_key`, `is_active` and `version` if
+		the key exists in `urls` (active or not), None otherwise
+	"""
+	query = select(
+		models.URL.id,
+		models.URL.key,
+		models.URL.secret_key,
+		models.URL.is_active,
+		models.URL.version,
+	).where(models.URL.key == url_key)
+	return db.execute(query).first()
+
+
 def get_db_url_for_peek(db: Session, url_key: str) -> models.URL:
 	"""
 	Get URL by key for peek operation (returns even if inactive).
 
+	Falls back to the archive table for keys that were moved out of the hot
+	table by the archival job.
+
 	Args:
 		db: Database session
 		url_key: URL key
 
 	Returns:
-		URL model if exists, None otherwise
+		URL (or URLArchive) model if exists, None otherwise
+	"""
+	if db_url := (
+		db.query(models.URL).filter(models.URL.key == url_key).first()
+	):
+		return db_url
+	return (
+		db.query(models.URLArchive)
+		.filter(models.URLArchive.key == url_key)
+		.first()
+	)
+
+
+def get_peek_rows(
+	db: Session, keys: list[str], chunk_size: int = 500
+) -> dict[str, PeekRow]:
+	"""
+	Get the peek columns of many URLs, archived ones included.
+
+	Keys are looked up with `WHERE key IN (...)` queries of `chunk_size`
+	keys (within every database's bound parameter limit); only keys missing
+	from `urls` are looked up in the archive.
+
+	Args:
+		db: Database session
+		keys: URL keys (duplicates are looked up once)
+		chunk_size: Keys per query
+
+	Returns:
+		Dict of found key to PeekRow
 	"""
-	return db.query(models.URL).filter(models.URL.key == url_key).first()
+	rows = {}
+	missing = list(dict.fromkeys(keys))
+	for start in range(0, len(missing), chunk_size):
+		query = select(
+			models.URL.key,
+			models.URL.host_id,
+			models.URL.target_path,
+			models.URL.is_active,
+			models.URL.clicks,
+			models.URL.created_at,
+		).where(models.URL.key.in_(missing[start : start + chunk_size]))
+		found = db.execute(query).all()
+		origins = get_origins(db, (row.host_id for row in found))
+		rows.update(
+			(
+				row.key,
+				PeekRow(
+					row.key,
+					origins.get(row.host_id, "") + row.target_path,
+					row.is_active,
+					row.clicks,
+					row.created_at,
+				),
+			)
+			for row in found
+		)
+
+	missing = [key for key in missing if key not in rows]
+	for start in range(0, len(missing), chunk_size):
+		query = select(
+			models.URLArchive.key,
+			models.URLArchive.target_url,
+			models.URLArchive.is_active,
+			models.URLArchive.clicks,
+			models.URLArchive.created_at,
+		).where(models.URLArchive.key.in_(missing[start : start + chunk_size]))
+		rows.update((row.key, PeekRow(*row)) for row in db.execute(query))
+	return rows
 
 
 def key_exists_in_db(db: Session, key: str) -> bool:
 	"""
 	Check if a key exists in the database (regardless of is_active status).
 
+	Archived keys count as existing so they are never handed out again.
+
 	Args:
 		db: Database session
 		key: URL key to check
@@ -64,33 +381,315 @@ def key_exists_in_db(db: Session, key: str) -> bool:
 	Returns:
 		True if key exists, False otherwise
 	"""
-	return (
-		db.query(models.URL).filter(models.URL.key == key).first() is not None
+	return db.scalar(
+		select(
+			or_(
+				exists().where(models.URL.key == key),
+				exists().where(models.URLArchive.key == key),
+			)
+		)
 	)
 
 
-def get_db_url_by_secret_key(db: Session, secret_key: str) -> models.URL:
-	return (
-		db.query(models.URL)
-		.filter(models.URL.secret_key == secret_key, models.URL.is_active)
-		.first()
+def get_taken_keys(db: Session, keys: list[str]) -> set[str]:
+	"""
+	Find which of `keys` are in use, archived ones included, in one query.
+
+	Args:
+		db: Database session
+		keys: Keys to check
+
+	Returns:
+		The keys that exist
+	"""
+	if not keys:
+		return set()
+	query = select(models.URL.key).where(models.URL.key.in_(keys))
+	query = query.union_all(
+		select(models.URLArchive.key).where(models.URLArchive.key.in_(keys))
 	)
+	return set(db.scalars(query))
+
+
+def iter_all_keys(db: Session, batch_size: int = 10000) -> Iterator[str]:
+	"""
+	Stream every key in use, active, inactive and archived, unordered.
+
+	Keys are fetched `batch_size` rows at a time, so memory stays flat
+	however many URLs there are.
+
+	Args:
+		db: Database session
+		batch_size: Rows fetched per round trip
+
+	Yields:
+		URL keys
+	"""
+	for column in (models.URL.key, models.URLArchive.key):
+		yield from db.scalars(
+			select(column).execution_options(yield_per=batch_size)
+		)
+
+
+def get_db_url_by_secret_key(db: Session, secret_key: str) -> models.URL:
+	"""
+	Get an active URL by its admin secret key.
+
+	Secret keys start with the URL key followed by "_" (the random or HMAC
+	part never contains one), so the row is fetched through the `key`
+	index and the secret is then verified in constant time. `secret_key`
+	itself is not indexed.
+
+	Args:
+		db: Database session
+		secret_key: Admin secret key
+
+	Returns:
+		URL model if the secret key is valid and the URL active, None
+		otherwise
+	"""
+	key, _, _ = secret_key.rpartition("_")
+	db_url = get_db_url_by_key(db, key)
+	if db_url and security.is_secret_key(db_url, secret_key):
+		return db_url
+	return None
 
 
 def update_db_clicks(db: Session, db_url: schemas.URL) -> models.URL:
 	db_url.clicks += 1
+	db_url.version += 1
 	db.commit()
 	db.refresh(db_url)
 	return db_url
 
 
+def increment_db_clicks(db: Session, url_id: int):
+	"""
+	Increment the click counter of a URL without loading the row.
+
+	Args:
+		db: Database session
+		url_id: URL primary key
+	"""
+	db.query(models.URL).filter(models.URL.id == url_id).update(
+		{
+			models.URL.clicks: models.URL.clicks + 1,
+			models.URL.version: models.URL.version + 1,
+		},
+		synchronize_session=False,
+	)
+	db.commit()
+
+
 def deactivate_db_url_by_secret_key(
 	db: Session, secret_key: str
 ) -> models.URL:
 	db_url = get_db_url_by_secret_key(db, secret_key)
 	if db_url:
 		db_url.is_active = False
+		db_url.version += 1
+		record_url_changes(db, keys=[db_url.key])
 		db.commit()
 		db.refresh(db_url)
 
 	return db_url
+
+
+def match_domain(column, reversed_domain: str) -> ColumnElement[bool]:
+	"""
+	Condition matching a reversed host and every host under it.
+
+	`com.example` matches `com.example` and `com.example.*`: one index range
+	["com.example", "com.example/"), as "/" follows "." in ASCII. Hosts
+	like `com.example-shop` fall in the range too ("-" sorts before "/")
+	and are filtered out. The column must compare bytewise.
+	"""
+	return and_(
+		column >= reversed_domain,
+		column < reversed_domain + "/",
+		or_(column == reversed_domain, column >= reversed_domain + "."),
+	)
+
+
+def deactivate_urls_by_domain_chunk(
+	db: Session, reversed_domain: str, limit: int
+) -> list[str]:
+	"""
+	Deactivate one chunk of active URLs whose target host is in a domain.
+
+	Rows are found through the `reversed_host` index and deactivated in a
+	single transaction, with their version bumped like a single delete.
+
+	Args:
+		db: Database session
+		reversed_domain: Domain in reversed-label form (see
+			app/utils/hosts.py), matching its subdomains too
+		limit: Maximum number of rows to deactivate
+
+	Returns:
+		Keys deactivated in this chunk (empty when done)
+	"""
+	rows = db.execute(
+		select(models.URL.id, models.URL.key)
+		.where(
+			match_domain(models.URL.reversed_host, reversed_domain),
+			models.URL.is_active,
+		)
+		.limit(limit)
+	).all()
+	if not rows:
+		return []
+
+	db.execute(
+		update(models.URL)
+		.where(models.URL.id.in_([row.id for row in rows]))
+		.values(is_active=False, version=models.URL.version + 1)
+	)
+	record_url_changes(db, reversed_domain=reversed_domain)
+	db.commit()
+	return [row.key for row in rows]
+
+
+def record_url_changes(
+	db: Session,
+	keys: Iterable[str] = (),
+	reversed_domain: Optional[str] = None,
+):
+	"""
+	Record URL changes for the redirect caches of every worker.
+
+	Added to the caller's transaction, so workers see the changes once it
+	commits (see app/core/invalidation.py). Nothing is recorded while the
+	redirect cache is disabled, as there is nothing to invalidate.
+
+	Args:
+		db: Database session, committed by the caller
+		keys: Keys of the changed URLs
+		reversed_domain: Domain (see app/utils/hosts.py) whose URLs all
+			changed
+	"""
+	if not get_settings().redirect_cache_size:
+		return
+	changes = [{"key": key} for key in keys]
+	if reversed_domain:
+		changes.append({"reversed_domain": reversed_domain})
+	db.execute(insert(models.URLChange), changes)
+	if db.get_bind().dialect.name == "postgresql":
+		# Delivered on commit, wakes the listening workers up
+		db.execute(
+			text("SELECT pg_notify(:channel, '')"),
+			{"channel": CHANGES_CHANNEL},
+		)
+
+
+def get_url_changes(
+	db: Session, after_id: int, limit: int, missing: Iterable[int] = ()
+) -> list[Row]:
+	"""
+	Get the URL changes recorded after a change id, in id order.
+
+	Args:
+		db: Database session
+		after_id: Id of the last change already read
+		limit: Maximum number of changes, plus one per missing id
+		missing: Ids up to `after_id` not seen yet, returned as well if
+			they exist by now
+
+	Returns:
+		Rows with id, key and reversed_domain
+	"""
+	condition = models.URLChange.id > after_id
+	if missing := list(missing):
+		condition = or_(condition, models.URLChange.id.in_(missing))
+	return db.execute(
+		select(
+			models.URLChange.id,
+			models.URLChange.key,
+			models.URLChange.reversed_domain,
+		)
+		.where(condition)
+		.order_by(models.URLChange.id)
+		.limit(limit + len(missing))
+	).all()
+
+
+def get_last_url_change_id(db: Session, created_before: datetime) -> int:
+	"""Id of the last change recorded before a time, 0 if there is none."""
+	return db.scalar(
+		select(func.coalesce(func.max(models.URLChange.id), 0)).where(
+			models.URLChange.created_at < created_before
+		)
+	)
+
+
+def delete_url_changes(db: Session, created_before: datetime) -> int:
+	"""
+	Delete the URL changes recorded before a time.
+
+	Returns:
+		Number of deleted changes
+	"""
+	result = db.execute(
+		delete(models.URLChange).where(
+			models.URLChange.created_at < created_before
+		)
+	)
+	db.commit()
+	return result.rowcount
+
+
+def archive_inactive_urls_chunk(
+	db: Session, created_before: datetime, after_key: str, limit: int
+) -> list[str]:
+	"""
+	Move one chunk of inactive URLs into the archive table.
+
+	Rows are picked in key order, starting strictly after `after_key`, and
+	are copied and deleted in a single transaction so a chunk is either fully
+	archived or not at all.
+
+	Args:
+		db: Database session
+		created_before: Only archive rows created before this moment
+		after_key: Resume point (exclusive), "" to start from the beginning
+		limit: Maximum number of rows to move
+
+	Returns:
+		Keys moved in this chunk, in key order (empty when done)
+	"""
+	rows = (
+		db.query(models.URL)
+		.filter(
+			models.URL.is_active.is_(False),
+			models.URL.created_at < created_before,
+			models.URL.key > after_key,
+		)
+		.order_by(models.URL.key)
+		.limit(limit)
+		.all()
+	)
+	if not rows:
+		return []
+
+	keys = [row.key for row in rows]
+	db.execute(
+		insert(models.URLArchive),
+		[
+			{
+				"id": row.id,
+				"key": row.key,
+				"secret_key": row.secret_key,
+				"target_url": row.target_url,
+				"is_active": False,
+				"clicks": row.clicks,
+				"created_at": row.created_at,
+			}
+			for row in rows
+		],
+	)
+	db.execute(
+		delete(models.URL).where(models.URL.id.in_([row.id for row in rows]))
+	)
+	db.commit()
+
+	return keys
@@ -1,20 +1,32 @@
-from fastapi import HTTPException, Request, status
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request, Response, status
 from starlette.datastructures import URL
 
 from app import models, schemas
 from app.core.config import get_settings
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, get_engine
+from app.core.security import get_secret_key, is_admin_token
 
 
 def get_db():
 	"""Database session dependency"""
-	db = SessionLocal()
+	db = SessionLocal(bind=get_engine())
 	try:
 		yield db
 	finally:
 		db.close()
 
 
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+	"""Operational endpoints dependency: require a valid X-Admin-Token"""
+	if not is_admin_token(x_admin_token):
+		raise HTTPException(
+			status_code=status.HTTP_403_FORBIDDEN,
+			detail="A valid admin token is required",
+		)
+
+
 def raise_bad_request(message: str):
 	"""Raise HTTP 400 Bad Request exception"""
 	raise HTTPException(
@@ -28,6 +40,35 @@ def raise_not_found(request: Request):
 	raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=message)
 
 
+def make_etag(db_url) -> str:
+	"""
+	Strong ETag of a URL (any object with `id` and `version`).
+
+	The version is bumped whenever clicks or the active flag change, so
+	the ETag changes with every representation of the URL.
+	"""
+	return f'"{db_url.id}-{db_url.version}"'
+
+
+def is_not_modified(if_none_match: Optional[str], etag: str) -> bool:
+	"""Check an If-None-Match header against an ETag (weak comparison)."""
+	if not if_none_match:
+		return False
+	if if_none_match.strip() == "*":
+		return True
+	return any(
+		tag.strip().removeprefix("W/") == etag
+		for tag in if_none_match.split(",")
+	)
+
+
+def not_modified(etag: str) -> Response:
+	"""HTTP 304 Not Modified response, without a body"""
+	return Response(
+		status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+	)
+
+
 def get_admin_info(db_url: models.URL, app) -> schemas.URLInfo:
 	"""
 	Enrich URL model with admin info (shortened url and admin url).
@@ -42,7 +83,7 @@ def get_admin_info(db_url: models.URL, app) -> schemas.URLInfo:
 	base_url = URL(get_settings().base_url)
 	admin_endpoint = app.url_path_for(
 		"administration info",
-		secret_key=db_url.secret_key,
+		secret_key=get_secret_key(db_url),
 	)
 	db_url.url = str(base_url.replace(path=db_url.key))
 	db_url.admin_url = str(base_url.replace(path=admin_endpoint))
@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, Request
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Request, Response
 from sqlalchemy.orm import Session
 
 from app import schemas
 from app.api import crud
-from app.api.deps import get_admin_info, get_db, raise_not_found
+from app.api.deps import (
+	get_admin_info,
+	get_db,
+	is_not_modified,
+	make_etag,
+	not_modified,
+	raise_not_found,
+)
+from app.core import security
+from app.core.cache import REDIRECT_CACHE
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -14,15 +25,24 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 	response_model=schemas.URLInfo,
 )
 def get_url_info(
-	secret_key: str, request: Request, db: Session = Depends(get_db)
+	secret_key: str,
+	request: Request,
+	response: Response,
+	db: Session = Depends(get_db),
+	if_none_match: Optional[str] = Header(None),
 ):
 	"""
 	Get URL information using admin secret key.
 
+	Responses carry an ETag; a matching If-None-Match is answered with 304
+	from the URL's version alone, without loading or serializing the row.
+
 	Args:
 		secret_key: Admin secret key for the URL
 		request: FastAPI request object
+		response: Response whose ETag header is set
 		db: Database session
+		if_none_match: ETags the client already has
 
 	Returns:
 		URLInfo with full URL details
@@ -30,7 +50,19 @@ def get_url_info(
 	Raises:
 		404: Secret key not found or URL inactive
 	"""
+	if if_none_match:
+		key, _, _ = secret_key.rpartition("_")
+		version = crud.get_url_version(db, key)
+		if (
+			version
+			and version.is_active
+			and security.is_secret_key(version, secret_key)
+			and is_not_modified(if_none_match, make_etag(version))
+		):
+			return not_modified(make_etag(version))
+
 	if db_url := crud.get_db_url_by_secret_key(db, secret_key=secret_key):
+		response.headers["ETag"] = make_etag(db_url)
 		return get_admin_info(db_url, request.app)
 	else:
 		raise_not_found(request)
@@ -57,6 +89,7 @@ def delete_url(
 	if db_url := crud.deactivate_db_url_by_secret_key(
 		db, secret_key=secret_key
 	):
+		REDIRECT_CACHE.invalidate(db_url.key)
 		message = (
 			f"Successfully deleted shortened URL for '{db_url.target_url}'"
 		)
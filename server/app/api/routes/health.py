@@ -0,0 +1,149 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.core import database
+from app.core.cache import REDIRECT_CACHE
+from app.core.config import Settings
+from app.core.keyindex import KEY_INDEX
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+# Single thread so a hung database can tie up at most one extra thread
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="health")
+_lock = threading.Lock()
+_cached = {"expires_at": 0.0, "ready": False, "payload": {}}
+
+
+def pool_status(pool, max_overflow: int) -> dict:
+	"""
+	Describe how busy the connection pool is.
+
+	Args:
+		pool: SQLAlchemy connection pool
+		max_overflow: Connections the pool may open beyond its size
+			(`db_pool_max_overflow`)
+
+	Returns:
+		Dict with checked out connections, capacity and saturation (0-1);
+		capacity is None for pools without a fixed size (e.g. NullPool)
+	"""
+	if not hasattr(pool, "checkedout"):
+		return {"checked_out": None, "capacity": None, "saturation": 0.0}
+	capacity = pool.size() + max(max_overflow, 0)
+	checked_out = pool.checkedout()
+	return {
+		"checked_out": checked_out,
+		"capacity": capacity,
+		"saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+	}
+
+
+def warm_up_status() -> dict:
+	"""
+	Describe the in-memory state filled at startup (see main.warm_up).
+
+	Warm-up completes before the worker accepts connections, so this only
+	tells how warm it got (e.g. a cold worker after a database error).
+
+	Returns:
+		Dict with the redirect cache (entries, warmed entries) and whether
+		the key index is ready
+	"""
+	return {
+		"redirect_cache": {
+			"entries": len(REDIRECT_CACHE),
+			"warmed": REDIRECT_CACHE.warmed,
+		},
+		"key_index": {"ready": KEY_INDEX.ready, "keys": len(KEY_INDEX)},
+	}
+
+
+def _ping_database():
+	with database.get_engine().connect() as connection:
+		connection.execute(text("SELECT 1"))
+
+
+def check_readiness(settings: Settings) -> tuple[bool, dict]:
+	"""
+	Check whether this worker can serve traffic.
+
+	A worker with a saturated pool is reported as not ready without
+	waiting for a connection; otherwise a `SELECT 1` must succeed within
+	`health_check_timeout` seconds.
+
+	Args:
+		settings: Settings of the app serving the probe
+
+	Returns:
+		Tuple of (ready, payload)
+	"""
+	pool = pool_status(
+		database.get_engine().pool, settings.db_pool_max_overflow
+	)
+	checks = {"pool": pool, "warm_up": warm_up_status()}
+
+	if pool["saturation"] >= settings.health_max_pool_saturation:
+		checks["database"] = "skipped: pool saturated"
+		return False, checks
+
+	try:
+		_executor.submit(_ping_database).result(
+			timeout=settings.health_check_timeout
+		)
+		checks["database"] = "ok"
+	except FutureTimeoutError:
+		checks["database"] = "timeout"
+	except Exception as exc:
+		checks["database"] = f"error: {type(exc).__name__}"
+
+	return checks["database"] == "ok", checks
+
+
+@router.get("/live")
+async def live():
+	"""
+	Liveness probe: the process is up and serving the event loop.
+
+	Never touches the database, so a slow database doesn't get workers
+	restarted.
+	"""
+	return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready(request: Request):
+	"""
+	Readiness probe: the worker can get a database connection quickly.
+
+	The result is cached for `health_cache_ttl` seconds so that probe
+	storms don't turn into query storms.
+
+	Returns:
+		200 with pool, warm-up and database status when ready, 503
+		otherwise
+	"""
+	settings = request.app.state.settings
+	with _lock:
+		now = time.monotonic()
+		if now >= _cached["expires_at"]:
+			is_ready, checks = check_readiness(settings)
+			_cached["ready"] = is_ready
+			_cached["payload"] = {
+				"status": "ok" if is_ready else "unavailable",
+				**checks,
+			}
+			_cached["expires_at"] = now + settings.health_cache_ttl
+		is_ready, payload = _cached["ready"], _cached["payload"]
+
+	return JSONResponse(
+		payload,
+		status_code=status.HTTP_200_OK
+		if is_ready
+		else status.HTTP_503_SERVICE_UNAVAILABLE,
+	)
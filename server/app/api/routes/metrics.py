@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+	"""
+	Expose metrics in the Prometheus text format.
+
+	Returns:
+		Metrics merged across all worker processes
+	"""
+	return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+
+from app import schemas
+from app.api.deps import raise_not_found, require_admin_token
+from app.core.sampler import PROFILER
+
+router = APIRouter(
+	prefix="/admin/profiles",
+	tags=["admin"],
+	dependencies=[Depends(require_admin_token)],
+)
+
+
+@router.get("", response_model=schemas.ProfileList)
+def list_profiles():
+	"""
+	List stored request profiles.
+
+	Returns:
+		Current sample rate and profile ids, newest first
+	"""
+	return {
+		"sample_rate": PROFILER.sample_rate,
+		"profiles": PROFILER.list_profiles(),
+	}
+
+
+@router.put("/sampling", response_model=schemas.ProfileList)
+def set_sampling(config: schemas.SamplingConfig):
+	"""
+	Change the fraction of requests profiled by this worker.
+
+	Args:
+		config: New sampling configuration
+
+	Returns:
+		Updated sample rate and stored profile ids
+	"""
+	PROFILER.sample_rate = config.sample_rate
+	return list_profiles()
+
+
+@router.get("/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str, request: Request):
+	"""
+	Download a profile as collapsed stacks (flamegraph.pl, speedscope).
+
+	Args:
+		profile_id: Id returned in the X-Profile-Id response header
+		request: FastAPI request object
+
+	Raises:
+		404: Profile not found
+	"""
+	if (profile := PROFILER.load(profile_id)) is None:
+		raise_not_found(request)
+	return PlainTextResponse(profile)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.api.deps import get_db, raise_bad_request, require_admin_token
+from app.utils.takedown import parse_domain, take_down_domain
+
+router = APIRouter(
+	prefix="/admin/takedown",
+	tags=["admin"],
+	dependencies=[Depends(require_admin_token)],
+)
+
+
+@router.post("", response_model=schemas.TakedownResult)
+def take_down(
+	takedown: schemas.TakedownRequest,
+	request: Request,
+	db: Session = Depends(get_db),
+):
+	"""
+	Deactivate every active link to a domain and its subdomains.
+
+	Runs in chunks of TAKEDOWN_BATCH_SIZE links, logging progress (see
+	app/utils/takedown.py, also usable from the command line).
+
+	Args:
+		takedown: Domain to take down
+		request: FastAPI request object
+		db: Database session
+
+	Returns:
+		Normalized domain and number of links deactivated
+
+	Raises:
+		400: Not a domain name
+	"""
+	settings = request.app.state.settings
+	try:
+		domain = parse_domain(takedown.domain)
+	except ValueError as error:
+		raise_bad_request(message=str(error))
+	deactivated = take_down_domain(
+		db, domain, batch_size=settings.takedown_batch_size
+	)
+	return {"domain": domain, "deactivated": deactivated}
@@ -1,20 +1,53 @@
+from typing import Optional
+
 import validators
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.responses import RedirectResponse
+from fastapi import (
+	APIRouter,
+	Depends,
+	Header,
+	Query,
+	Request,
+	Response,
+	status,
+)
+from fastapi.responses import JSONResponse, RedirectResponse
 from sqlalchemy.orm import Session
 
-from app import schemas
+from app import models, schemas
 from app.api import crud
 from app.api.deps import (
 	get_admin_info,
 	get_db,
+	is_not_modified,
+	make_etag,
+	not_modified,
 	raise_bad_request,
 	raise_not_found,
 )
+from app.core import redirects
+from app.core.blocklist import BLOCKLIST
+from app.core.bots import CLASSIFIER
+from app.core.cache import REDIRECT_CACHE
+from app.core.database import SessionLocal, get_engine
+from app.core.jobs import JOBS
+from app.core.metrics import BLOCKED_URLS, CLICKS_SKIPPED
+from app.utils import keygen
 
 router = APIRouter()
 
 
+def count_click(url_id: int):
+	"""Background job: increment the clicks of a URL"""
+	db = SessionLocal(bind=get_engine())
+	try:
+		crud.increment_db_clicks(db=db, url_id=url_id)
+	finally:
+		db.close()
+
+
+JOBS.register("click", count_click)
+
+
 @router.get("/")
 def read_root():
 	"""Welcome endpoint"""
@@ -25,6 +58,7 @@ def read_root():
 	"/url",
 	response_model=schemas.URLInfo,
 	status_code=status.HTTP_201_CREATED,
+	responses={status.HTTP_409_CONFLICT: {"model": schemas.KeyConflict}},
 )
 def create_url(
 	url: schemas.URLBase, request: Request, db: Session = Depends(get_db)
@@ -41,29 +75,71 @@ def create_url(
 		URLInfo with shortened URL details
 
 	Raises:
-		400: Invalid URL or custom key format
-		409: Custom key already in use
+		400: Invalid URL, blocked target domain or custom key format
+		409: Custom key already in use, with available keys close to it
 	"""
 	if not validators.url(url.target_url):
 		raise_bad_request(message="Your provided URL is not valid")
+	if domain := BLOCKLIST.blocked_domain(url.target_url):
+		BLOCKED_URLS.inc()
+		raise_bad_request(message=f"Links to '{domain}' are not allowed")
 
 	db_url = crud.create_db_url(db=db, url=url)
 
 	# If db_url is None, it means the custom key is already taken
 	if db_url is None:
-		raise HTTPException(
-			status_code=status.HTTP_409_CONFLICT,
+		count = request.app.state.settings.key_suggestions
+		conflict = schemas.KeyConflict(
 			detail=f"Custom key '{url.custom_key}' is already in use",
+			suggestions=(
+				keygen.suggest_keys(db, url.custom_key, count) if count else []
+			),
+		)
+		return JSONResponse(
+			status_code=status.HTTP_409_CONFLICT,
+			content=conflict.model_dump(),
 		)
 
 	return get_admin_info(db_url, request.app)
 
 
+@router.get("/url/suggest", response_model=schemas.KeySuggestions)
+def suggest_keys(
+	key: str = Query(min_length=1, max_length=200),
+	count: int = Query(5, ge=1, le=20),
+	db: Session = Depends(get_db),
+):
+	"""
+	Check a custom key and suggest available keys close to it.
+
+	All suggestions are checked at once (see keygen.suggest_keys), so this
+	replaces guessing variants one create request at a time.
+
+	Args:
+		key: Wanted custom key
+		count: Maximum number of suggestions
+		db: Database session
+
+	Returns:
+		KeySuggestions: whether `key` can be used, and available keys
+	"""
+	return schemas.KeySuggestions(
+		key=key,
+		available=(
+			keygen.is_valid_custom_key(key)
+			and keygen.is_key_available(db, key)
+		),
+		suggestions=keygen.suggest_keys(db, key, count),
+	)
+
+
 @router.get("/peek/{url_key}", response_model=schemas.URLPeek)
 def peek_url(
 	url_key: str,
 	request: Request,
+	response: Response,
 	db: Session = Depends(get_db),
+	if_none_match: Optional[str] = Header(None),
 ):
 	"""
 	Peek at a shortened URL without redirecting or incrementing clicks.
@@ -71,10 +147,15 @@ def peek_url(
 	This endpoint allows users to check the target URL behind a shortened URL
 	without actually visiting it. Useful for security and preview purposes.
 
+	Responses carry an ETag; a matching If-None-Match is answered with 304
+	from the URL's version alone, without loading or serializing the row.
+
 	Args:
 		url_key: Short URL key
 		request: FastAPI request object
+		response: Response whose ETag header is set
 		db: Database session
+		if_none_match: ETags the client already has
 
 	Returns:
 		URLPeek with key, target_url, is_active, clicks, and created_at
@@ -82,13 +163,53 @@ def peek_url(
 	Raises:
 		404: URL key not found
 	"""
+	if if_none_match and (version := crud.get_url_version(db, url_key)):
+		etag = make_etag(version)
+		if is_not_modified(if_none_match, etag):
+			return not_modified(etag)
+
 	if db_url := crud.get_db_url_for_peek(db=db, url_key=url_key):
+		# Archived URLs never change and carry no version
+		if isinstance(db_url, models.URL):
+			response.headers["ETag"] = make_etag(db_url)
 		return db_url
 	else:
 		raise_not_found(request)
 
 
+@router.post("/peek/batch", response_model=schemas.PeekBatch)
+def peek_batch(batch: schemas.PeekBatchRequest, db: Session = Depends(get_db)):
+	"""
+	Peek at many shortened URLs in one request.
+
+	Keys are resolved with a few batched queries instead of one request
+	and query per key (see crud.get_peek_rows).
+
+	Args:
+		batch: Keys to peek at (up to PEEK_BATCH_MAX_KEYS)
+		db: Database session
+
+	Returns:
+		PeekBatch with one item per requested key, in the same order;
+		unknown keys have `found` false and no `url`
+	"""
+	rows = crud.get_peek_rows(db=db, keys=batch.keys)
+	return schemas.PeekBatch(
+		items=[
+			schemas.PeekBatchItem(
+				key=key,
+				found=key in rows,
+				url=schemas.URLPeek.model_validate(rows[key])
+				if key in rows
+				else None,
+			)
+			for key in batch.keys
+		]
+	)
+
+
 @router.get("/{url_key}")
+@router.head("/{url_key}")
 def forward_to_target_url(
 	url_key: str,
 	request: Request,
@@ -97,19 +218,46 @@ def forward_to_target_url(
 	"""
 	Redirect to the original URL.
 
+	Only visits count as clicks: HEAD requests, prefetches and known bots
+	(see app/core/bots.py) get the same redirect without a click write,
+	so a cached HEAD never touches the database.
+
 	Args:
 		url_key: Short URL key
 		request: FastAPI request object
 		db: Database session
 
 	Returns:
-		RedirectResponse to the original URL
+		RedirectResponse to the original URL, with the URL's status code
+		and Cache-Control header (see app/core/redirects.py)
 
 	Raises:
 		404: URL key not found or inactive
 	"""
-	if db_url := crud.get_db_url_by_key(db=db, url_key=url_key):
-		crud.update_db_clicks(db=db, db_url=db_url)
-		return RedirectResponse(db_url.target_url)
+	target = REDIRECT_CACHE.get(url_key)
+	if target is None:
+		if row := crud.get_redirect_target(db=db, url_key=url_key):
+			target = redirects.resolve(row, request.app.state.settings)
+			REDIRECT_CACHE.set(url_key, target)
+
+	if target:
+		if request.method == "HEAD":
+			skipped = "head"
+		elif request.app.state.settings.skip_bot_clicks:
+			skipped = CLASSIFIER.classify(request.headers)
+		else:
+			skipped = None
+
+		if skipped:
+			CLICKS_SKIPPED.inc(skipped)
+		elif request.app.state.settings.defer_clicks:
+			JOBS.submit("click", target.id)
+		else:
+			crud.increment_db_clicks(db=db, url_id=target.id)
+		return RedirectResponse(
+			target.target_url,
+			status_code=target.status_code,
+			headers={"Cache-Control": target.cache_control},
+		)
 	else:
 		raise_not_found(request)
@@ -0,0 +1,223 @@
+"""
+Blocklist of target domains.
+
+Links to a blocked domain, or to any host under it, are refused at
+creation (see create_url in app/api/routes/urls.py). The list is read from
+the blocklist_path file, one domain per line, in any of these forms:
+
+	evil.com
+	*.evil.com
+	0.0.0.0 evil.com    (hosts file: the last field is the domain)
+
+Blank lines, "#" comments and entries that aren't host names are ignored.
+Names are normalized like target hosts (see app/utils/hosts.py).
+
+Domains are stored as 64-bit hashes in one sorted array('Q'), 8 bytes per
+domain, so millions of them take a few dozen MB and no Python objects. A
+second array holds where each value of the top BUCKET_BITS bits starts,
+so a lookup bisects a few dozen hashes instead of millions. A host is
+checked by hashing it and each of its parent domains (`a.evil.com`,
+`evil.com`, `com`) and looking each up: O(labels) lookups. Two domains
+share a hash with a probability of about n / 2**64, negligible even for
+millions of domains.
+
+The file is loaded before forking (see app/server.py), so workers share
+the array. Each worker then checks the file every blocklist_reload_interval
+seconds and reloads it when it changed: the new array is built in the
+background and swapped in with one assignment, so requests are never
+blocked, and keep the previous list if the new file can't be read.
+"""
+
+import logging
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from app.core.metrics import BLOCKLIST_DOMAINS
+from app.utils import hosts
+
+logger = logging.getLogger(__name__)
+
+# Hashes are bucketed by their top bits (2**16 buckets, 256 KB of offsets)
+BUCKET_BITS = 16
+BUCKET_SHIFT = 64 - BUCKET_BITS
+HASH_MASK = 2**64 - 1
+
+
+def domain_hash(domain: str) -> int:
+	"""
+	64-bit hash of a normalized domain name.
+
+	Python's string hash: fast, and salted per interpreter, which is fine
+	as hashes never leave the process tree that loaded the list.
+	"""
+	return hash(domain) & HASH_MASK
+
+
+def parse_line(line: str) -> Optional[str]:
+	"""Normalized domain of a blocklist line, None if it holds none."""
+	fields = line.split("#", 1)[0].split()
+	if not fields:
+		return None
+	return hosts.normalize_host(fields[-1].removeprefix("*."))
+
+
+def build(lines: Iterable[str]) -> tuple[array, array]:
+	"""
+	Hash the domains of blocklist lines.
+
+	Returns:
+		Sorted array of the unique hashes, and the position of the first
+		hash of every bucket (plus the end)
+	"""
+	hashes = set()
+	for line in lines:
+		if domain := parse_line(line):
+			hashes.add(domain_hash(domain))
+	hashes = array("Q", sorted(hashes))
+	starts = array(
+		"I",
+		(
+			bisect_left(hashes, bucket << BUCKET_SHIFT)
+			for bucket in range(2**BUCKET_BITS + 1)
+		),
+	)
+	return hashes, starts
+
+
+class Blocklist:
+	"""Set of blocked domains, matching their subdomains too."""
+
+	def __init__(self):
+		self.path = ""
+		self.reload_interval = 30.0
+		# Hashes and bucket starts, swapped together by loads
+		self._table = build(())
+		self._mtime: Optional[float] = None
+		# Serializes loads; lookups never take it
+		self._lock = threading.Lock()
+		self._thread: Optional[threading.Thread] = None
+		self._stop = threading.Event()
+
+	def configure(self, path: str, reload_interval: float):
+		"""
+		Set the blocklist file (empty disables the blocklist).
+
+		Drops the loaded domains; takes effect on the next load().
+
+		Args:
+			path: Blocklist file
+			reload_interval: Seconds between checks of the file for changes
+		"""
+		self.path = path
+		self.reload_interval = reload_interval
+		self._table = build(())
+		self._mtime = None
+		BLOCKLIST_DOMAINS.set(0)
+
+	@property
+	def enabled(self) -> bool:
+		return bool(self.path)
+
+	def __len__(self) -> int:
+		return len(self._table[0])
+
+	def memory_bytes(self) -> int:
+		return sum(map(sys.getsizeof, self._table))
+
+	def load(self) -> int:
+		"""
+		Read the blocklist file and swap the new domains in.
+
+		Returns:
+			Number of blocked domains
+
+		Raises:
+			OSError: The file can't be read (the loaded list is kept)
+		"""
+		with self._lock:
+			mtime = os.stat(self.path).st_mtime
+			with open(self.path, encoding="utf-8", errors="replace") as lines:
+				self._table = build(lines)
+			self._mtime = mtime
+		BLOCKLIST_DOMAINS.set(len(self))
+		logger.info("Blocklist: %d domains from %s", len(self), self.path)
+		return len(self)
+
+	def reload_if_changed(self) -> bool:
+		"""
+		Load the file again if it changed since the last load.
+
+		Returns:
+			Whether it was reloaded
+
+		Raises:
+			OSError: The file can't be read (the loaded list is kept)
+		"""
+		if os.stat(self.path).st_mtime == self._mtime:
+			return False
+		self.load()
+		return True
+
+	def blocked_domain(self, url: str) -> Optional[str]:
+		"""
+		Blocked domain a URL's host is in.
+
+		Args:
+			url: Target URL
+
+		Returns:
+			The host or the parent domain that is blocked, None if none is
+		"""
+		hashes, starts = self._table
+		host = hosts.target_host(url)
+		if not hashes or not host:
+			return None
+		domain = host
+		while True:
+			value = domain_hash(domain)
+			bucket = value >> BUCKET_SHIFT
+			end = starts[bucket + 1]
+			position = bisect_left(hashes, value, starts[bucket], end)
+			if position < end and hashes[position] == value:
+				return domain
+			dot = domain.find(".")
+			if dot < 0:
+				return None
+			domain = domain[dot + 1 :]
+
+	def start(self):
+		"""Start watching the file for changes."""
+		if self._thread or not self.enabled:
+			return
+		self._stop = threading.Event()
+		self._thread = threading.Thread(
+			target=self._watch,
+			args=(self._stop,),
+			name="blocklist-reload",
+			daemon=True,
+		)
+		self._thread.start()
+
+	def stop(self, timeout: float = 5.0):
+		"""Stop watching the file."""
+		if not self._thread:
+			return
+		self._stop.set()
+		self._thread.join(timeout)
+		self._thread = None
+
+	def _watch(self, stop: threading.Event):
+		while not stop.wait(self.reload_interval):
+			try:
+				self.reload_if_changed()
+			except OSError:
+				logger.exception(
+					"Blocklist reload failed, keeping the old one"
+				)
+
+
+BLOCKLIST = Blocklist()
@@ -0,0 +1,60 @@
+"""
+Recognition of link prefetchers and bots.
+
+Chat apps, email scanners and crawlers fetch short links to unfurl or scan
+them. They still get the redirect, but their requests are not counted as
+clicks (see the redirect endpoint in app/api/routes/urls.py). Requests
+are classified as:
+
+	prefetch  a Purpose, Sec-Purpose, X-Purpose or X-Moz header mentions
+		"prefetch" or "preview"
+	bot       the User-Agent contains one of the configured patterns
+
+User-Agent patterns are case-insensitive substrings (bot_user_agents
+setting), compiled once into a single regular expression.
+"""
+
+import re
+from typing import Iterable, Optional
+
+PREFETCH_HEADERS = ("purpose", "sec-purpose", "x-purpose", "x-moz")
+PREFETCH_VALUES = re.compile(r"prefetch|preview", re.IGNORECASE)
+
+
+class BotClassifier:
+	"""Classifies requests as "prefetch", "bot" or (None) human visits."""
+
+	def __init__(self, patterns: Iterable[str] = ()):
+		self.configure(patterns)
+
+	def configure(self, patterns: Iterable[str]):
+		"""Compile the User-Agent patterns (blank ones are ignored)."""
+		patterns = [p.strip() for p in patterns if p.strip()]
+		self._user_agents = None
+		if patterns:
+			self._user_agents = re.compile(
+				"|".join(re.escape(p) for p in patterns), re.IGNORECASE
+			)
+
+	def classify(self, headers) -> Optional[str]:
+		"""
+		Classify a request by its headers.
+
+		Args:
+			headers: Request headers (case-insensitive mapping)
+
+		Returns:
+			"prefetch", "bot", or None for a presumably human visit
+		"""
+		for name in PREFETCH_HEADERS:
+			value = headers.get(name)
+			if value and PREFETCH_VALUES.search(value):
+				return "prefetch"
+		user_agent = headers.get("user-agent")
+		if self._user_agents and user_agent:
+			if self._user_agents.search(user_agent):
+				return "bot"
+		return None
+
+
+CLASSIFIER = BotClassifier()
@@ -0,0 +1,115 @@
+"""
+In-process cache of redirect targets.
+
+Maps active URL keys to the redirect target (id, target URL and resolved
+redirect policy, see app/core/redirects.py) used by the redirect endpoint,
+so popular keys skip the lookup query. The cache is
+bounded (least recently used entries are evicted first) and entries expire
+after a TTL.
+
+Each worker has its own cache. Deactivating a URL invalidates the entry in
+the worker that handled the request at once, and in every other worker
+within cache_invalidation_interval (see app/core/invalidation.py). Should
+that fail (database unreachable), the TTL still bounds how stale they can
+be.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from app.core.metrics import record_cache_lookup
+
+
+class RedirectCache:
+	"""Thread-safe LRU cache with per-entry expiry; size 0 disables it."""
+
+	def __init__(self, max_size: int = 0, ttl: float = 60.0):
+		self.max_size = max_size
+		self.ttl = ttl
+		self._lock = threading.Lock()
+		self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+		# Entries added by the last warm(), reported by the readiness probe
+		self.warmed = 0
+
+	def configure(self, max_size: int, ttl: float):
+		with self._lock:
+			self.max_size = max_size
+			self.ttl = ttl
+			self._entries.clear()
+
+	@property
+	def enabled(self) -> bool:
+		return self.max_size > 0
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def get(self, key: str) -> Optional[Any]:
+		if not self.enabled:
+			return None
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and entry[1] <= time.monotonic():
+				del self._entries[key]
+				entry = None
+			if entry is not None:
+				self._entries.move_to_end(key)
+		record_cache_lookup("redirect", entry is not None)
+		return entry[0] if entry is not None else None
+
+	def set(self, key: str, value: Any):
+		if not self.enabled:
+			return
+		with self._lock:
+			self._entries[key] = (value, time.monotonic() + self.ttl)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_size:
+				self._entries.popitem(last=False)
+
+	def invalidate(self, key: str):
+		with self._lock:
+			self._entries.pop(key, None)
+
+	def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+		"""
+		Invalidate every entry whose value matches a predicate.
+
+		Returns:
+			Number of invalidated entries
+		"""
+		with self._lock:
+			keys = [
+				key
+				for key, (value, _) in self._entries.items()
+				if predicate(value)
+			]
+			for key in keys:
+				del self._entries[key]
+		return len(keys)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+	def warm(self, rows: Iterable) -> int:
+		"""
+		Fill the cache from redirect targets (anything with a `key`).
+
+		Rows are expected most popular first; once the cache is full the
+		remaining rows are ignored.
+
+		Returns:
+			Number of entries added
+		"""
+		self.warmed = 0
+		for row in rows:
+			if self.warmed >= self.max_size:
+				break
+			self.set(row.key, row)
+			self.warmed += 1
+		return self.warmed
+
+
+REDIRECT_CACHE = RedirectCache()
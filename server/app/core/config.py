@@ -1,3 +1,4 @@
+import logging
 from functools import lru_cache
 
 from pydantic_settings import BaseSettings
@@ -7,6 +8,120 @@ class Settings(BaseSettings):
 	env_name: str = "Local"
 	base_url: str = "http://localhost:8000"
 	db_url: str = "sqlite:///./shortener.db"
+	# Connection pool of the engine: connections kept, and extra ones opened
+	# under load (also the capacity behind the readiness pool saturation)
+	db_pool_size: int = 5
+	db_pool_max_overflow: int = 10
+
+	# Startup (see app/main.py): pool connections opened before serving, and
+	# the redirect cache (see app/core/cache.py), filled with the
+	# redirect_cache_warm most clicked URLs at startup. Size 0 disables it;
+	# entries expire after redirect_cache_ttl seconds.
+	db_pool_prewarm: int = 0
+	redirect_cache_size: int = 0
+	redirect_cache_ttl: float = 60.0
+	redirect_cache_warm: int = 1000
+	# Cross-worker invalidation of the redirect cache (see
+	# app/core/invalidation.py): seconds between polls for URL changes and
+	# seconds recorded changes are kept
+	cache_invalidation_interval: float = 0.5
+	cache_invalidation_retention: float = 3600.0
+	# Host ids and origins cached per worker (see app/core/hostcache.py)
+	host_cache_size: int = 100_000
+	# In-memory index of every key in use (see app/core/keyindex.py),
+	# built at startup, so custom key availability needs no query
+	key_index_enabled: bool = False
+	# Available keys suggested in the 409 answer to a taken custom key
+	key_suggestions: int = 5
+
+	# Default redirect policy (see app/core/redirects.py): status code and
+	# Cache-Control max-age in seconds (0 = no-store)
+	redirect_status_code: int = 307
+	redirect_max_age: int = 0
+
+	# Click counting (see app/core/bots.py): prefetchers and User-Agents
+	# containing one of the comma-separated patterns get the redirect
+	# without a click being counted
+	skip_bot_clicks: bool = True
+	bot_user_agents: str = (
+		"bot,crawl,spider,slurp,facebookexternalhit,whatsapp,embedly,"
+		"preview,proofpoint,mimecast,barracuda,google-safety"
+	)
+
+	# Background jobs (see app/core/jobs.py): queue size and worker threads
+	# per job type, retries of database errors (backoff in seconds, doubled
+	# per retry) and how long shutdown waits for the queues to drain.
+	# defer_clicks counts redirect clicks in a job instead of the request.
+	job_queue_size: int = 10000
+	job_workers: int = 1
+	job_retries: int = 3
+	job_retry_backoff: float = 0.1
+	job_drain_timeout: float = 10.0
+	defer_clicks: bool = False
+
+	# Production launcher (see app/server.py); 0 workers = one per CPU core
+	workers: int = 0
+	graceful_timeout: float = 30.0
+
+	# Per-client rate limiting (see app/core/ratelimit.py): sustained
+	# requests per minute and burst size of each budget. Clients are
+	# identified by IP, or by the rate_limit_key_header value when present
+	# (e.g. an API key checked by a gateway in front of the app).
+	rate_limit_enabled: bool = False
+	rate_limit_key_header: str = ""
+	rate_limit_slots: int = 65536
+	rate_limit_create_per_minute: float = 30.0
+	rate_limit_create_burst: int = 10
+	rate_limit_redirect_per_minute: float = 600.0
+	rate_limit_redirect_burst: int = 100
+	rate_limit_admin_per_minute: float = 60.0
+	rate_limit_admin_burst: int = 20
+
+	# Archival of inactive URLs (see app/utils/archive.py)
+	archive_after_days: int = 90
+	archive_chunk_size: int = 1000
+
+	# Blocked target domains (see app/core/blocklist.py): file of one domain
+	# per line, subdomains blocked too (empty disables it), checked for
+	# changes every blocklist_reload_interval seconds
+	blocklist_path: str = ""
+	blocklist_reload_interval: float = 30.0
+
+	# Bulk takedown by domain (see app/utils/takedown.py): links
+	# deactivated per transaction
+	takedown_batch_size: int = 1000
+
+	# Prometheus metrics (see app/core/metrics.py). Set metrics_dir to a
+	# directory shared by all workers of this host when running more than one
+	# process.
+	metrics_enabled: bool = True
+	metrics_dir: str = ""
+	metrics_flush_interval: float = 1.0
+
+	# Health probes (see app/api/routes/health.py)
+	health_cache_ttl: float = 1.0
+	health_check_timeout: float = 0.5
+	health_max_pool_saturation: float = 0.9
+
+	# Per-request SQL profiling (see app/core/profiling.py); requests with
+	# more database time than profiling_slow_request_ms are logged (0 = off)
+	profiling_enabled: bool = False
+	profiling_slow_request_ms: float = 0.0
+
+	# Server secret admin secret keys are derived from (see
+	# app/core/security.py); empty stores a random secret key per URL
+	# instead. Changing it invalidates every derived admin URL.
+	secret_key_hmac: str = ""
+
+	# Token guarding operational endpoints (X-Admin-Token); empty disables
+	# them. Unrelated to the per-URL secret keys.
+	admin_token: str = ""
+
+	# Sampling profiler (see app/core/sampler.py)
+	profiler_sample_rate: float = 0.0
+	profiler_interval_ms: float = 5.0
+	profiler_dir: str = ".profiles"
+	profiler_max_files: int = 100
 
 	model_config = {
 		"env_file": (".env", ".env.local"),
@@ -14,8 +129,11 @@ class Settings(BaseSettings):
 	}
 
 
+logger = logging.getLogger(__name__)
+
+
 @lru_cache
 def get_settings() -> Settings:
 	settings = Settings()
-	print(f"Loading settings for: {settings.env_name}")
+	logger.info("Loading settings for: %s", settings.env_name)
 	return settings
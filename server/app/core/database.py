@@ -1,16 +1,104 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+"""
+Database engine and session factory.
+
+The engine is created on first use rather than at import time, so importing
+models (e.g. from Alembic's env.py) doesn't open a connection pool or load
+a database driver. The app's lifespan creates it at startup (see
+app/main.py); `dispose_engine` drops it so the next use starts a fresh
+pool.
+
+SQLAlchemy's SQLite dialect drops table hints, so `with_hint(...,
+dialect_name="sqlite")` (e.g. INDEXED BY) is rendered here.
+"""
 
-from .config import get_settings
+from typing import Optional
 
-# Get database URL
-db_url = get_settings().db_url
+from sqlalchemy import Table, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from .config import Settings, get_settings
 
-# Configure connect_args based on database type
-connect_args = {}
-if db_url.startswith("sqlite"):
-	connect_args = {"check_same_thread": False}
+_state: dict[str, Optional[Engine]] = {"engine": None}
 
-engine = create_engine(db_url, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Unbound: callers pass bind=get_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
+
+
+@compiles(Table, "sqlite")
+def _compile_sqlite_table(table, compiler, fromhints=None, **kw):
+	sql = compiler.visit_table(table, fromhints=fromhints, **kw)
+	if kw.get("asfrom") and fromhints and table in fromhints:
+		sql += " " + fromhints[table]
+	return sql
+
+
+def connect_args_for(db_url: str) -> dict:
+	"""DBAPI connect arguments needed for `db_url`."""
+	if db_url.startswith("sqlite"):
+		return {"check_same_thread": False}
+	return {}
+
+
+def get_engine(settings: Optional[Settings] = None) -> Engine:
+	"""
+	Get the engine, creating it on first use.
+
+	Args:
+		settings: Settings providing `db_url` and the pool size if the engine
+			doesn't exist yet (default: get_settings())
+
+	Returns:
+		The process-wide engine
+	"""
+	if _state["engine"] is None:
+		settings = settings or get_settings()
+		_state["engine"] = create_engine(
+			settings.db_url,
+			connect_args=connect_args_for(settings.db_url),
+			pool_size=settings.db_pool_size,
+			max_overflow=settings.db_pool_max_overflow,
+		)
+	return _state["engine"]
+
+
+def dispose_engine(close: bool = True):
+	"""
+	Forget the engine, closing its pooled connections.
+
+	Args:
+		close: False in a forked child, whose inherited connections still
+			belong to the parent and must be dropped without being closed
+	"""
+	engine = _state["engine"]
+	if engine is not None:
+		_state["engine"] = None
+		engine.dispose(close=close)
+
+
+def prewarm_pool(engine: Engine, connections: int) -> int:
+	"""
+	Open pool connections ahead of the first requests.
+
+	Connections are checked out together (so each one is a new connection)
+	and then returned to the pool. Never opens more than the pool keeps.
+
+	Args:
+		engine: Engine whose pool to fill
+		connections: Number of connections to open
+
+	Returns:
+		Number of connections opened
+	"""
+	if hasattr(engine.pool, "size"):
+		connections = min(connections, engine.pool.size())
+	opened = []
+	try:
+		for _ in range(connections):
+			opened.append(engine.connect())
+	finally:
+		for connection in opened:
+			connection.close()
+	return len(opened)
@@ -0,0 +1,72 @@
+"""
+In-process cache of target origins (see models.Host).
+
+Target URLs are stored as a host id plus the rest of the URL. This cache
+maps origins to host ids when URLs are created, and host ids back to
+origins when redirect and peek rows are turned into full URLs (see
+crud.get_redirect_target), so the few thousand hosts most links point to
+cost no query either way.
+
+Host rows never change, so entries never go stale and every worker keeps
+its own cache. It is bounded: least recently used hosts are evicted first.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.metrics import record_cache_lookup
+
+
+class HostCache:
+	"""Thread-safe LRU mapping between host ids and origins."""
+
+	def __init__(self, max_size: int = 100_000):
+		self.max_size = max_size
+		self._lock = threading.Lock()
+		self._origins: OrderedDict[int, str] = OrderedDict()
+		self._ids: dict[str, int] = {}
+
+	def configure(self, max_size: int):
+		with self._lock:
+			self.max_size = max_size
+			self._origins.clear()
+			self._ids.clear()
+
+	def __len__(self) -> int:
+		return len(self._origins)
+
+	def get_id(self, origin: str) -> Optional[int]:
+		with self._lock:
+			host_id = self._ids.get(origin)
+			if host_id is not None:
+				self._origins.move_to_end(host_id)
+		record_cache_lookup("host", host_id is not None)
+		return host_id
+
+	def get_origin(self, host_id: int) -> Optional[str]:
+		with self._lock:
+			origin = self._origins.get(host_id)
+			if origin is not None:
+				self._origins.move_to_end(host_id)
+		record_cache_lookup("host", origin is not None)
+		return origin
+
+	def add(self, host_id: int, origin: str):
+		if self.max_size <= 0:
+			return
+		with self._lock:
+			self._origins[host_id] = origin
+			self._origins.move_to_end(host_id)
+			self._ids[origin] = host_id
+			while len(self._origins) > self.max_size:
+				_, evicted = self._origins.popitem(last=False)
+				del self._ids[evicted]
+
+	def clear(self):
+		with self._lock:
+			self._origins.clear()
+			self._ids.clear()
+
+
+HOST_CACHE = HostCache()
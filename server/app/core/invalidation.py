@@ -0,0 +1,266 @@
+"""
+Invalidation of redirect cache entries across workers and nodes.
+
+Deactivating a URL evicts it from the redirect cache (see
+app/core/cache.py) of the worker doing it only. The change is also
+recorded in the `url_changes` table, in the same transaction (see
+crud.record_url_changes), and a thread in every worker reads the changes
+committed since the last one it saw and evicts the affected entries:
+
+	polling  every cache_invalidation_interval seconds (0.5 by default),
+		on any database, SQLite included
+	NOTIFY   on PostgreSQL, recording a change also notifies the
+		`url_changes` channel; the thread LISTENs on it and reads changes
+		as soon as they commit, polling remains the fallback
+
+A change names a key, or a domain for takedowns (see app/utils/takedown.py):
+every entry whose target is in the domain is evicted.
+
+Change ids only grow, but PostgreSQL assigns them before commit, so a
+lower id can become visible after a higher one. Skipped ids are asked for
+again on the next polls, for up to GAP_TIMEOUT seconds (a rolled back
+transaction never fills its gap).
+
+At startup a worker also replays the changes of the last
+redirect_cache_ttl seconds: entries cached before it forked (see
+app/server.py) may be older than the worker. Changes older than
+cache_invalidation_retention are deleted by the workers.
+"""
+
+import logging
+import select
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.api import crud
+from app.core.cache import REDIRECT_CACHE
+from app.core.database import SessionLocal
+from app.core.metrics import CACHE_INVALIDATIONS
+from app.models.url import utc_now
+from app.utils import hosts
+
+logger = logging.getLogger(__name__)
+
+# Changes read per query
+BATCH_SIZE = 1000
+# Seconds an id skipped by the ids read after it is waited for
+GAP_TIMEOUT = 10.0
+# Larger gaps (e.g. pruned changes) are not waited for
+MAX_GAP = 1000
+# Seconds between deletions of expired changes
+PRUNE_INTERVAL = 60.0
+
+
+def listen(engine: Engine) -> Any:
+	"""
+	Open a PostgreSQL connection listening for URL changes.
+
+	Returns:
+		Pool connection, to pass to wait() and close when done
+	"""
+	connection = engine.raw_connection()
+	driver_connection = connection.driver_connection
+	driver_connection.autocommit = True
+	with driver_connection.cursor() as cursor:
+		cursor.execute(f"LISTEN {crud.CHANGES_CHANNEL}")
+	return connection
+
+
+def wait(connection: Any, timeout: float) -> bool:
+	"""
+	Wait for a notification on a listening connection.
+
+	Returns:
+		Whether notifications arrived (they are consumed)
+	"""
+	driver_connection = connection.driver_connection
+	if not select.select([driver_connection], [], [], timeout)[0]:
+		return False
+	driver_connection.poll()
+	notified = bool(driver_connection.notifies)
+	driver_connection.notifies.clear()
+	return notified
+
+
+def affects(target: Any, reversed_domains: set[str]) -> bool:
+	"""Whether a cached redirect target is in one of the domains."""
+	reversed_host = hosts.reversed_target_host(target.target_url)
+	return any(
+		hosts.is_in_domain(reversed_host, reversed_domain)
+		for reversed_domain in reversed_domains
+	)
+
+
+class CacheInvalidator:
+	"""Background thread applying URL changes to the redirect cache."""
+
+	def __init__(self):
+		self.interval = 0.5
+		self.retention = 3600.0
+		self.replay = 60.0
+		self._thread: Optional[threading.Thread] = None
+		self._stop = threading.Event()
+		self._reset()
+
+	def _reset(self):
+		# Id of the last change read (None: not positioned yet)
+		self._last_id: Optional[int] = None
+		# Skipped ids, with the time to give up on them
+		self._missing: dict[int, float] = {}
+		self._last_prune = 0.0
+
+	def configure(self, interval: float, retention: float, replay: float):
+		"""
+		Set the poll interval and how long changes are kept and replayed.
+
+		Takes effect on the next start().
+
+		Args:
+			interval: Seconds between polls
+			retention: Seconds changes are kept before being deleted
+			replay: Seconds of past changes applied at start
+		"""
+		self.interval = interval
+		self.retention = retention
+		self.replay = replay
+
+	@property
+	def running(self) -> bool:
+		return self._thread is not None
+
+	def start(self, engine: Engine):
+		"""Start applying the changes recorded through `engine`'s database."""
+		if self._thread:
+			return
+		self._reset()
+		self._stop = threading.Event()
+		self._thread = threading.Thread(
+			target=self._run,
+			args=(engine, self._stop),
+			name="cache-invalidation",
+			daemon=True,
+		)
+		self._thread.start()
+
+	def stop(self, timeout: float = 5.0):
+		"""Stop the thread, waiting up to `timeout` seconds for it."""
+		if not self._thread:
+			return
+		self._stop.set()
+		self._thread.join(timeout)
+		self._thread = None
+
+	def poll(self, db: Session) -> int:
+		"""
+		Apply the changes recorded since the last poll.
+
+		Positions itself `replay` seconds back on the first call.
+
+		Args:
+			db: Database session
+
+		Returns:
+			Number of changes applied
+		"""
+		if self._last_id is None:
+			self._last_id = crud.get_last_url_change_id(
+				db, utc_now() - timedelta(seconds=self.replay)
+			)
+		now = time.monotonic()
+		applied = 0
+		while True:
+			changes = crud.get_url_changes(
+				db, self._last_id, limit=BATCH_SIZE, missing=self._missing
+			)
+			read = self._track(changes, now)
+			self._apply(changes)
+			applied += len(changes)
+			if read < BATCH_SIZE:
+				break
+		for change_id, deadline in list(self._missing.items()):
+			if deadline <= now:
+				del self._missing[change_id]
+		return applied
+
+	def _track(self, changes: list, now: float) -> int:
+		"""Advance past the changes read; returns how many were new."""
+		read = 0
+		for change in changes:
+			if change.id <= self._last_id:
+				del self._missing[change.id]
+				continue
+			read += 1
+			gap = change.id - self._last_id - 1
+			if 0 < gap <= MAX_GAP:
+				self._missing.update(
+					dict.fromkeys(
+						range(self._last_id + 1, change.id), now + GAP_TIMEOUT
+					)
+				)
+			self._last_id = change.id
+		return read
+
+	def _apply(self, changes: list):
+		"""Evict the cache entries affected by changes."""
+		keys = [change.key for change in changes if change.key]
+		reversed_domains = {
+			change.reversed_domain
+			for change in changes
+			if change.reversed_domain
+		}
+		for key in keys:
+			REDIRECT_CACHE.invalidate(key)
+		if reversed_domains:
+			REDIRECT_CACHE.invalidate_where(
+				lambda target: affects(target, reversed_domains)
+			)
+		CACHE_INVALIDATIONS.inc("key", amount=len(keys))
+		CACHE_INVALIDATIONS.inc("domain", amount=len(reversed_domains))
+
+	def prune(self, db: Session) -> int:
+		"""
+		Delete expired changes, at most once per PRUNE_INTERVAL.
+
+		Returns:
+			Number of deleted changes
+		"""
+		now = time.monotonic()
+		if now - self._last_prune < PRUNE_INTERVAL:
+			return 0
+		self._last_prune = now
+		return crud.delete_url_changes(
+			db, utc_now() - timedelta(seconds=self.retention)
+		)
+
+	def _run(self, engine: Engine, stop: threading.Event):
+		connection = None
+		while not stop.is_set():
+			try:
+				if connection is None and engine.dialect.name == "postgresql":
+					connection = listen(engine)
+				db = SessionLocal(bind=engine)
+				try:
+					self.poll(db)
+					self.prune(db)
+				finally:
+					db.close()
+				if connection is not None:
+					wait(connection, self.interval)
+					continue
+			except Exception:
+				# Retried after the interval; cached entries still expire
+				logger.exception("Applying URL changes failed")
+				if connection is not None:
+					connection.invalidate()
+					connection = None
+			stop.wait(self.interval)
+		if connection is not None:
+			connection.close()
+
+
+INVALIDATOR = CacheInvalidator()
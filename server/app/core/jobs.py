@@ -0,0 +1,208 @@
+"""
+In-process background jobs.
+
+Work that doesn't have to delay the response is submitted as a job of a
+registered type (e.g. "click", see app/api/routes/urls.py). Every type has
+its own bounded queue served by its own worker threads, so a slow type
+can't starve the others. Handlers are plain synchronous functions that
+open their own database session.
+
+Backpressure: when a type's queue is full, submit() runs the job in the
+calling thread ("caller runs"), so a burst slows requests down instead of
+growing memory or losing work. Jobs also run inline while the runner is
+not started (CLI tools, tests, before startup).
+
+Failures: jobs raising an OperationalError (database unreachable, lock
+timeout, deadlock) are retried with exponential backoff; any other error,
+and giving up, is logged and counted, and the job is dropped.
+
+Shutdown (see the lifespan in app/main.py): stop() makes later submits run
+inline, lets the workers drain the queues and waits up to a deadline; jobs
+still queued after it are dropped and logged.
+
+Each worker process runs its own threads, started in its lifespan, after
+app/server.py forked it.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy.exc import OperationalError
+
+from app.core.metrics import JOB_LAG, JOB_QUEUE_DEPTH, JOB_RESULTS
+
+logger = logging.getLogger(__name__)
+
+# Queued behind the remaining jobs by stop(): the worker taking it exits
+STOP = None
+
+
+class JobRunner:
+	"""Bounded per-type job queues served by worker threads."""
+
+	def __init__(self):
+		self.handlers: dict[str, Callable[..., None]] = {}
+		self.max_queue = 10000
+		self.workers = 1
+		self.retries = 3
+		self.backoff = 0.1
+		self._lock = threading.Lock()
+		self._running = False
+		self._queues: dict[str, queue.Queue] = {}
+		self._threads: list[threading.Thread] = []
+		self._abort = threading.Event()
+
+	def register(self, name: str, handler: Callable[..., None]):
+		"""Register a job type; its handler receives the submitted args."""
+		self.handlers[name] = handler
+
+	def configure(
+		self, max_queue: int, workers: int, retries: int, backoff: float
+	):
+		"""
+		Set queue size and worker threads per job type, and the retries.
+
+		Takes effect on the next start().
+
+		Args:
+			max_queue: Queue size per job type
+			workers: Worker threads per job type
+			retries: Retries of a job failing with a database error
+			backoff: Seconds before the first retry (doubled for each one)
+		"""
+		self.max_queue = max_queue
+		self.workers = workers
+		self.retries = retries
+		self.backoff = backoff
+
+	@property
+	def running(self) -> bool:
+		return self._running
+
+	def start(self):
+		"""Start the worker threads of every registered job type."""
+		with self._lock:
+			if self._running:
+				return
+			# Fresh event, so threads of a previous run can't be revived
+			self._abort = threading.Event()
+			self._queues = {
+				name: queue.Queue(self.max_queue) for name in self.handlers
+			}
+			self._threads = [
+				threading.Thread(
+					target=self._work,
+					args=(name, self._queues[name], self._abort),
+					name=f"job-{name}-{number}",
+					daemon=True,
+				)
+				for name in self.handlers
+				for number in range(self.workers)
+			]
+			for thread in self._threads:
+				thread.start()
+			self._running = True
+
+	def submit(self, name: str, *args):
+		"""
+		Run the `name` job with `args` in the background.
+
+		Runs it in the calling thread instead when the runner is not
+		started or the job type's queue is full.
+		"""
+		with self._lock:
+			if self._running:
+				jobs = self._queues[name]
+				try:
+					jobs.put_nowait((time.monotonic(), args))
+				except queue.Full:
+					pass
+				else:
+					JOB_QUEUE_DEPTH.set(jobs.qsize(), name)
+					return
+		JOB_RESULTS.inc(name, "inline")
+		self._run(name, args, self._abort)
+
+	def stop(self, timeout: float) -> int:
+		"""
+		Stop accepting jobs and drain the queues.
+
+		Args:
+			timeout: Seconds to wait for the queues to drain
+
+		Returns:
+			Number of queued jobs dropped because the deadline passed
+		"""
+		with self._lock:
+			if not self._running:
+				return 0
+			self._running = False
+		deadline = time.monotonic() + timeout
+		# Queues with room first, so a full one can't hold back the others
+		stops = dict.fromkeys(self._queues, self.workers)
+		for block in (False, True):
+			for name, jobs in self._queues.items():
+				try:
+					while stops[name]:
+						jobs.put(
+							STOP, block, max(deadline - time.monotonic(), 0)
+						)
+						stops[name] -= 1
+				except queue.Full:
+					continue  # Still full (at the deadline when blocking)
+		for thread in self._threads:
+			thread.join(max(deadline - time.monotonic(), 0))
+		# Stops retry backoffs and keeps workers from taking more jobs
+		self._abort.set()
+
+		dropped = 0
+		for name, jobs in self._queues.items():
+			dropped += sum(item is not STOP for item in list(jobs.queue))
+			JOB_QUEUE_DEPTH.set(0, name)
+		if dropped:
+			logger.warning(
+				"Dropped %d queued jobs after the %.1fs drain deadline",
+				dropped,
+				timeout,
+			)
+		return dropped
+
+	def _work(self, name: str, jobs: queue.Queue, abort: threading.Event):
+		while not abort.is_set():
+			item = jobs.get()
+			if item is STOP:
+				return
+			enqueued, args = item
+			JOB_QUEUE_DEPTH.set(jobs.qsize(), name)
+			JOB_LAG.observe(time.monotonic() - enqueued, name)
+			self._run(name, args, abort)
+
+	def _run(self, name: str, args: tuple, abort: threading.Event):
+		"""Run one job, retrying database errors with backoff."""
+		handler = self.handlers[name]
+		for attempt in range(self.retries + 1):
+			try:
+				handler(*args)
+				JOB_RESULTS.inc(name, "done")
+				return
+			except OperationalError:
+				delay = self.backoff * 2**attempt
+				if attempt < self.retries and not abort.wait(delay):
+					JOB_RESULTS.inc(name, "retried")
+					continue
+				logger.exception(
+					"Job %s%r failed after %d attempts",
+					name,
+					args,
+					attempt + 1,
+				)
+			except Exception:
+				logger.exception("Job %s%r failed", name, args)
+			JOB_RESULTS.inc(name, "failed")
+			return
+
+
+JOBS = JobRunner()
@@ -0,0 +1,268 @@
+"""
+Compact in-memory set of every key in use.
+
+Answers custom key availability (see keygen.is_key_available) without a
+database round trip. It holds the keys of `urls` and `urls_archive`,
+active or not, is built at startup (see app/main.py) and updated when this
+process creates a URL. Keys created by other workers are missed, so only a
+"taken" answer is certain: the unique constraint on urls.key stays the
+final authority, and crud.create_db_url turns a violation into a 409.
+
+Keys are stored in three parts:
+
+	packed   keys of up to 6 digits and uppercase letters (all generated
+		keys), as base-36 numbers in one sorted array('I') per length,
+		4 bytes each
+	blocks   other keys, sorted and front coded in blocks of 32 (each key
+		is stored as the length of the prefix it shares with the previous
+		one plus the rest), found by bisecting the first key of each block
+	pending  keys added since the last merge, in a set; merged into the
+		other two once it holds 1/32 of the index
+
+Base-36 digits sort like ASCII, so packed values of one length sort like
+their keys. memory_bytes() reports the footprint; it stays well under 16
+bytes per key on average.
+"""
+
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from app.core.metrics import KEY_INDEX_BYTES, KEY_INDEX_KEYS
+
+PACKED_MAX_LENGTH = 6  # 36**6 < 2**32
+BLOCK_SIZE = 32
+# Encoded keys longer than this can't be front coded and stay pending
+MAX_BLOCK_KEY = 255
+MIN_PENDING = 4096
+PENDING_RATIO = 32
+# Larger batches while building, so blocks are rebuilt fewer times
+BUILD_PENDING_RATIO = 4
+# Packed values are sorted in buckets of 2**20 while building
+BUCKET_SHIFT = 20
+
+_packable = re.compile(f"[0-9A-Z]{{1,{PACKED_MAX_LENGTH}}}").fullmatch
+
+
+def pack(key: str) -> Optional[int]:
+	"""Base-36 value of a key of digits and uppercase letters, else None."""
+	return int(key, 36) if _packable(key) else None
+
+
+def encode_block(keys: list[bytes]) -> bytes:
+	"""Front code sorted keys: (shared prefix, suffix length, suffix)."""
+	block = bytearray()
+	previous = b""
+	for key in keys:
+		shared = 0
+		limit = min(len(previous), len(key))
+		while shared < limit and previous[shared] == key[shared]:
+			shared += 1
+		suffix = key[shared:]
+		block += bytes((shared, len(suffix)))
+		block += suffix
+		previous = key
+	return bytes(block)
+
+
+def decode_block(block: bytes) -> list[bytes]:
+	keys = []
+	key = b""
+	position = 0
+	while position < len(block):
+		shared, length = block[position], block[position + 1]
+		position += 2
+		key = key[:shared] + block[position : position + length]
+		position += length
+		keys.append(key)
+	return keys
+
+
+def block_contains(block: bytes, target: bytes) -> bool:
+	key = b""
+	position = 0
+	while position < len(block):
+		shared, length = block[position], block[position + 1]
+		position += 2
+		key = key[:shared] + block[position : position + length]
+		position += length
+		if key >= target:
+			return key == target
+	return False
+
+
+def merge_sorted(values: array, new: list[int]) -> array:
+	"""Merge sorted new values into a sorted array, skipping duplicates."""
+	if not values:
+		return array("I", new)
+	merged = array("I")
+	start = 0
+	for value in new:
+		position = bisect_left(values, value, start)
+		merged.extend(values[start:position])
+		if position == len(values) or values[position] != value:
+			merged.append(value)
+		start = position
+	merged.extend(values[start:])
+	return merged
+
+
+class KeyIndex:
+	"""Thread-safe compact set of keys; not used until built (`ready`)."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._reset()
+
+	def _reset(self):
+		self._packed = {
+			length: array("I") for length in range(1, PACKED_MAX_LENGTH + 1)
+		}
+		self._blocks: list[bytes] = []
+		self._firsts: list[bytes] = []
+		self._pending: set[str] = set()
+		self._block_keys = 0
+		self._stored = 0
+		self.ready = False
+
+	def __len__(self) -> int:
+		return self._stored + len(self._pending)
+
+	def __contains__(self, key: str) -> bool:
+		with self._lock:
+			return self._contains(key)
+
+	def _contains(self, key: str) -> bool:
+		if key in self._pending:
+			return True
+		value = pack(key)
+		if value is not None:
+			values = self._packed[len(key)]
+			position = bisect_left(values, value)
+			return position < len(values) and values[position] == value
+		encoded = key.encode()
+		position = bisect_right(self._firsts, encoded) - 1
+		return position >= 0 and block_contains(
+			self._blocks[position], encoded
+		)
+
+	def add(self, key: str):
+		with self._lock:
+			if self._contains(key):
+				return
+			self._pending.add(key)
+			if len(self._pending) < max(
+				MIN_PENDING, self._stored // PENDING_RATIO
+			):
+				return
+			self._merge()
+		self._report()
+
+	def build(self, keys: Iterable[str]) -> int:
+		"""
+		Replace the contents with `keys` and mark the index ready.
+
+		Keys may come in any order. Packed values are appended to arrays
+		bucketed by their high bits and each bucket is sorted at the end;
+		other keys are merged in batches as they stream in. Either way the
+		full key list is never held as strings.
+
+		Returns:
+			Number of keys in the index
+		"""
+		buckets = defaultdict(lambda: array("I"))
+		with self._lock:
+			self._reset()
+			for key in keys:
+				value = pack(key)
+				if value is not None:
+					buckets[len(key), value >> BUCKET_SHIFT].append(value)
+					continue
+				self._pending.add(key)
+				if len(self._pending) >= max(
+					MIN_PENDING, self._block_keys // BUILD_PENDING_RATIO
+				):
+					self._merge()
+			for bucket in sorted(buckets):
+				self._packed[bucket[0]].extend(
+					sorted(set(buckets.pop(bucket)))
+				)
+			self._merge()
+			self.ready = True
+		self._report()
+		return len(self)
+
+	def clear(self):
+		"""Drop every key; the index is not used until built again."""
+		with self._lock:
+			self._reset()
+		self._report()
+
+	def _merge(self):
+		packed = defaultdict(list)
+		custom = []
+		too_long = set()
+		for key in self._pending:
+			value = pack(key)
+			if value is not None:
+				packed[len(key)].append(value)
+				continue
+			encoded = key.encode()
+			if len(encoded) > MAX_BLOCK_KEY:
+				too_long.add(key)
+			else:
+				custom.append(encoded)
+
+		for length, values in packed.items():
+			self._packed[length] = merge_sorted(
+				self._packed[length], sorted(values)
+			)
+		if custom:
+			self._merge_blocks(sorted(custom))
+		self._pending = too_long
+		self._stored = sum(map(len, self._packed.values())) + self._block_keys
+
+	def _merge_blocks(self, keys: list[bytes]):
+		"""Merge sorted keys into the blocks they belong to."""
+		targets = defaultdict(list)
+		for key in keys:
+			targets[max(bisect_right(self._firsts, key) - 1, 0)].append(key)
+		# Back to front, so splitting a block doesn't shift the others
+		for index in sorted(targets, reverse=True):
+			existing = []
+			if index < len(self._blocks):
+				existing = decode_block(self._blocks[index])
+			merged = sorted(set(existing).union(targets[index]))
+			count = -(-len(merged) // BLOCK_SIZE)
+			size = -(-len(merged) // count)
+			chunks = [
+				merged[start : start + size]
+				for start in range(0, len(merged), size)
+			]
+			self._blocks[index : index + 1] = [
+				encode_block(chunk) for chunk in chunks
+			]
+			self._firsts[index : index + 1] = [chunk[0] for chunk in chunks]
+			self._block_keys += len(merged) - len(existing)
+
+	def memory_bytes(self) -> int:
+		"""Approximate memory held by the index, containers included."""
+		with self._lock:
+			total = sum(map(sys.getsizeof, self._packed.values()))
+			total += sys.getsizeof(self._blocks) + sys.getsizeof(self._firsts)
+			total += sum(map(sys.getsizeof, self._blocks))
+			total += sum(map(sys.getsizeof, self._firsts))
+			total += sys.getsizeof(self._pending)
+			total += sum(map(sys.getsizeof, self._pending))
+			return total
+
+	def _report(self):
+		KEY_INDEX_KEYS.set(len(self))
+		KEY_INDEX_BYTES.set(self.memory_bytes())
+
+
+KEY_INDEX = KeyIndex()
@@ -0,0 +1,479 @@
+"""
+Prometheus-compatible metrics collected in-process.
+
+Metrics are plain counters, gauges and histograms guarded by one lock, so
+recording a sample costs a dict lookup and a few additions. When
+`metrics_dir` is set, every worker process periodically dumps its values to
+`<metrics_dir>/<pid>.json` and the `/metrics` endpoint merges all dumps, so
+the exposition is correct no matter which uvicorn worker answers the
+scrape. When a worker exits, its dump is folded into `retired.json` (see
+Registry.retire): by the launcher (app/server.py) as soon as it reaps the
+worker, otherwise (e.g. under `uvicorn --workers`) by the next scrape that
+finds the worker's process gone. Dumps are matched to processes by pid, so
+`metrics_dir` must not be shared across hosts or containers.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (
+	0.0005,
+	0.001,
+	0.0025,
+	0.005,
+	0.01,
+	0.025,
+	0.05,
+	0.1,
+	0.25,
+	0.5,
+	1.0,
+	2.5,
+)
+
+
+# Values of exited workers (see Registry.retire)
+RETIRED_DUMP = "retired.json"
+# Serializes retirements, which any worker may run
+RETIRE_LOCK = "retired.lock"
+
+
+def _read_dump(path: Path) -> list[dict]:
+	"""Snapshot dumped at `path`, as a list of zero or one snapshots."""
+	try:
+		return [json.loads(path.read_text())]
+	except (OSError, ValueError):
+		return []  # Gone, or being rewritten right now
+
+
+def _is_alive(pid: int) -> bool:
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		pass  # Exists, owned by another user
+	return True
+
+
+class Registry:
+	"""Holds every metric of the process and (de)serializes their values."""
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.metrics = {}
+		self.metrics_dir = None
+		self.flush_interval = 1.0
+		self._last_flush = 0.0
+
+	def register(self, metric):
+		metric.lock = self.lock
+		self.metrics[metric.name] = metric
+		return metric
+
+	def configure(self, metrics_dir: str, flush_interval: float):
+		"""Enable (or disable, with an empty dir) multi-process dumps."""
+		self.metrics_dir = Path(metrics_dir) if metrics_dir else None
+		self.flush_interval = flush_interval
+		if self.metrics_dir:
+			self.metrics_dir.mkdir(parents=True, exist_ok=True)
+
+	def snapshot(self) -> dict:
+		"""Return the values of every metric as JSON-serializable data."""
+		with self.lock:
+			return {
+				name: [
+					[list(labels), value]
+					for labels, value in metric.values.items()
+				]
+				for name, metric in self.metrics.items()
+			}
+
+	def flush(self):
+		"""Dump this process' values to the shared metrics directory."""
+		if not self.metrics_dir:
+			return
+		self._last_flush = time.monotonic()
+		path = self.metrics_dir / f"{os.getpid()}.json"
+		tmp_path = path.with_suffix(".tmp")
+		tmp_path.write_text(json.dumps(self.snapshot()))
+		tmp_path.replace(path)
+
+	def maybe_flush(self):
+		"""Flush at most once per `flush_interval` seconds."""
+		if (
+			self.metrics_dir
+			and time.monotonic() - self._last_flush >= self.flush_interval
+		):
+			self.flush()
+
+	def collect(self) -> dict:
+		"""
+		Merge the values of all worker processes.
+
+		Returns:
+			Mapping of metric name to {labels tuple: value}
+		"""
+		snapshots = [self.snapshot()]
+		if self.metrics_dir:
+			self.retire_exited()
+			own_dump = f"{os.getpid()}.json"
+			for path in self.metrics_dir.glob("*.json"):
+				if path.name != own_dump:
+					snapshots.extend(_read_dump(path))
+		return self._merge(snapshots)
+
+	def _merge(self, snapshots: list[dict]) -> dict:
+		merged = {name: {} for name in self.metrics}
+		for snapshot in snapshots:
+			for name, samples in snapshot.items():
+				if name not in self.metrics:
+					continue
+				metric = self.metrics[name]
+				values = merged[name]
+				for label_list, value in samples:
+					labels = tuple(label_list)
+					values[labels] = metric.merge(values.get(labels), value)
+		return merged
+
+	def retire(self, pid: int):
+		"""
+		Fold the dump of an exited worker into RETIRED_DUMP.
+
+		Counters and histograms keep counting what the worker did, so
+		merged totals never go backwards; gauges described the worker
+		itself and are dropped, so a replaced worker isn't counted twice.
+
+		Args:
+			pid: Process id of the exited worker
+		"""
+		if not self.metrics_dir:
+			return
+		path = self.metrics_dir / f"{pid}.json"
+		retired_path = self.metrics_dir / RETIRED_DUMP
+		with open(self.metrics_dir / RETIRE_LOCK, "a") as lock_file:
+			fcntl.flock(lock_file, fcntl.LOCK_EX)
+			if not path.exists():
+				return  # Never flushed, or retired already
+			merged = self._merge(
+				[*_read_dump(path), *_read_dump(retired_path)]
+			)
+			retired = {
+				name: [
+					[list(labels), value] for labels, value in values.items()
+				]
+				for name, values in merged.items()
+				if self.metrics[name].type != "gauge"
+			}
+			tmp_path = retired_path.with_suffix(".tmp")
+			tmp_path.write_text(json.dumps(retired))
+			tmp_path.replace(retired_path)
+			path.unlink()
+
+	def retire_exited(self):
+		"""Retire the dumps of worker processes that no longer exist."""
+		for path in self.metrics_dir.glob("*.json"):
+			if path.stem.isdigit() and not _is_alive(int(path.stem)):
+				self.retire(int(path.stem))
+
+	def render(self) -> str:
+		"""Render all metrics in the Prometheus text exposition format."""
+		lines = []
+		for name, values in self.collect().items():
+			metric = self.metrics[name]
+			lines.append(f"# HELP {name} {metric.documentation}")
+			lines.append(f"# TYPE {name} {metric.type}")
+			for labels, value in sorted(values.items()):
+				lines.extend(metric.render(labels, value))
+		return "\n".join(lines) + "\n"
+
+
+def _format_labels(labelnames, labels, extra: str = "") -> str:
+	pairs = [f'{name}="{value}"' for name, value in zip(labelnames, labels)]
+	if extra:
+		pairs.append(extra)
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+	type = "counter"
+
+	def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = labelnames
+		self.values = {}
+
+	def inc(self, *labels: str, amount: float = 1):
+		with self.lock:
+			self.values[labels] = self.values.get(labels, 0) + amount
+
+	def merge(self, current, value):
+		return (current or 0) + value
+
+	def render(self, labels, value):
+		return [
+			f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+		]
+
+
+class Gauge:
+	"""Current value; values of several processes are summed."""
+
+	type = "gauge"
+
+	def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = labelnames
+		self.values = {}
+
+	def set(self, value: float, *labels: str):
+		with self.lock:
+			self.values[labels] = value
+
+	def merge(self, current, value):
+		return (current or 0) + value
+
+	def render(self, labels, value):
+		return [
+			f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+		]
+
+
+class Histogram:
+	"""Histogram storing per-bucket counts followed by sum and count."""
+
+	type = "histogram"
+
+	def __init__(
+		self,
+		name: str,
+		documentation: str,
+		labelnames: tuple = (),
+		buckets: tuple = LATENCY_BUCKETS,
+	):
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = labelnames
+		self.buckets = buckets
+		self.values = {}
+
+	def observe(self, value: float, *labels: str):
+		index = bisect_left(self.buckets, value)
+		with self.lock:
+			state = self.values.get(labels)
+			if state is None:
+				state = self.values[labels] = [0] * (len(self.buckets) + 3)
+			state[index] += 1
+			state[-2] += value
+			state[-1] += 1
+
+	def merge(self, current, value):
+		if current is None:
+			return list(value)
+		return [a + b for a, b in zip(current, value)]
+
+	def render(self, labels, value):
+		lines = []
+		cumulative = 0
+		bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+		for bound, count in zip(bounds, value):
+			cumulative += count
+			label_str = _format_labels(
+				self.labelnames, labels, f'le="{bound}"'
+			)
+			lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+		label_str = _format_labels(self.labelnames, labels)
+		lines.append(f"{self.name}_sum{label_str} {value[-2]}")
+		lines.append(f"{self.name}_count{label_str} {value[-1]}")
+		return lines
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(
+	Counter(
+		"http_requests_total",
+		"HTTP requests by method, route and status code.",
+		("method", "route", "status"),
+	)
+)
+HTTP_LATENCY = REGISTRY.register(
+	Histogram(
+		"http_request_duration_seconds",
+		"HTTP request latency by method and route.",
+		("method", "route"),
+	)
+)
+DB_QUERIES = REGISTRY.register(
+	Counter(
+		"db_queries_total",
+		"SQL statements executed, by statement type.",
+		("statement",),
+	)
+)
+DB_LATENCY = REGISTRY.register(
+	Histogram(
+		"db_query_duration_seconds",
+		"SQL statement execution time, by statement type.",
+		("statement",),
+	)
+)
+CACHE_LOOKUPS = REGISTRY.register(
+	Counter(
+		"cache_lookups_total",
+		"In-process cache lookups by cache and result (hit or miss).",
+		("cache", "result"),
+	)
+)
+KEYGEN_RETRIES = REGISTRY.register(
+	Counter(
+		"keygen_retries_total",
+		"Random keys discarded because they were already taken.",
+	)
+)
+RATE_LIMITED = REGISTRY.register(
+	Counter(
+		"rate_limited_requests_total",
+		"Requests rejected with 429 by budget (create, redirect, admin).",
+		("budget",),
+	)
+)
+
+CLICKS_SKIPPED = REGISTRY.register(
+	Counter(
+		"redirect_clicks_skipped_total",
+		"Redirects not counted as clicks, by reason (head, prefetch, bot).",
+		("reason",),
+	)
+)
+
+JOB_QUEUE_DEPTH = REGISTRY.register(
+	Gauge(
+		"job_queue_depth",
+		"Background jobs waiting in the queue, by job type.",
+		("job",),
+	)
+)
+JOB_LAG = REGISTRY.register(
+	Histogram(
+		"job_lag_seconds",
+		"Time background jobs waited in the queue, by job type.",
+		("job",),
+	)
+)
+JOB_RESULTS = REGISTRY.register(
+	Counter(
+		"jobs_total",
+		"Background job runs by job type and result "
+		"(done, retried, failed, inline).",
+		("job", "result"),
+	)
+)
+CACHE_INVALIDATIONS = REGISTRY.register(
+	Counter(
+		"cache_invalidations_total",
+		"URL changes read from other workers, by change (key or domain).",
+		("change",),
+	)
+)
+BLOCKLIST_DOMAINS = REGISTRY.register(
+	Gauge(
+		"blocklist_domains",
+		"Domains in the target domain blocklist (summed over workers).",
+	)
+)
+BLOCKED_URLS = REGISTRY.register(
+	Counter(
+		"blocked_urls_total",
+		"URLs refused because their target domain is blocklisted.",
+	)
+)
+KEY_INDEX_KEYS = REGISTRY.register(
+	Gauge(
+		"key_index_keys",
+		"Keys held by the in-memory key index (summed over workers).",
+	)
+)
+KEY_INDEX_BYTES = REGISTRY.register(
+	Gauge(
+		"key_index_bytes",
+		"Approximate memory of the in-memory key index (summed over workers).",
+	)
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+	"""Count a lookup in one of the in-process caches."""
+	CACHE_LOOKUPS.inc(cache, "hit" if hit else "miss")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, *_):
+	# Kept on the statement's execution context, which a failed statement
+	# takes with it (after_cursor_execute only fires on success)
+	if context is not None:
+		context.metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, *_):
+	start = getattr(context, "metrics_query_start", None)
+	if start is None:
+		return
+	elapsed = time.perf_counter() - start
+	statement_type = (statement.split(None, 1) or ["OTHER"])[0].upper()
+	DB_QUERIES.inc(statement_type)
+	DB_LATENCY.observe(elapsed, statement_type)
+
+
+def instrument_engines():
+	"""Collect query metrics from every SQLAlchemy engine."""
+	if not event.contains(
+		Engine, "before_cursor_execute", _before_cursor_execute
+	):
+		event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+		event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+	"""
+	ASGI middleware recording request counts and latency per route.
+
+	Requests are labelled with the route template (e.g. `/{url_key}`), not
+	the raw path, so scanners probing random URLs can't blow up cardinality.
+	"""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		start = time.perf_counter()
+		status_code = 500
+
+		async def send_with_status(message):
+			nonlocal status_code
+			if message["type"] == "http.response.start":
+				status_code = message["status"]
+			await send(message)
+
+		try:
+			await self.app(scope, receive, send_with_status)
+		finally:
+			route = getattr(scope.get("route"), "path", "unmatched")
+			HTTP_REQUESTS.inc(scope["method"], route, str(status_code))
+			HTTP_LATENCY.observe(
+				time.perf_counter() - start, scope["method"], route
+			)
+			REGISTRY.maybe_flush()
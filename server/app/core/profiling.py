@@ -0,0 +1,136 @@
+"""
+Opt-in per-request SQL profiling.
+
+When `profiling_enabled` is set, every request gets a `RequestProfile` that
+SQLAlchemy cursor events fill with the number of statements, the total time
+spent in the database and the slowest statement. The summary is returned in
+a `Server-Timing` header (visible in browser dev tools) and, for requests
+whose database time exceeds `profiling_slow_request_ms`, logged as one JSON
+line so N+1 queries and extra round trips show up in production logs.
+"""
+
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.profiling")
+
+# Longest statement prefix kept in slow request logs
+MAX_STATEMENT_LENGTH = 300
+
+
+@dataclass
+class RequestProfile:
+	query_count: int = 0
+	db_time: float = 0.0
+	slowest_time: float = 0.0
+	slowest_statement: str = ""
+
+	def record(self, statement: str, elapsed: float):
+		self.query_count += 1
+		self.db_time += elapsed
+		if elapsed > self.slowest_time:
+			self.slowest_time = elapsed
+			self.slowest_statement = statement
+
+	def server_timing(self, total_time: float) -> str:
+		"""Format the profile as a Server-Timing header value (in ms)."""
+		return ", ".join(
+			[
+				f'db;dur={self.db_time * 1000:.2f};desc="'
+				f'{self.query_count} queries"',
+				f"db-slowest;dur={self.slowest_time * 1000:.2f}",
+				f"total;dur={total_time * 1000:.2f}",
+			]
+		)
+
+
+# Mutable profile shared with the threadpool running sync endpoints, which
+# gets a copy of the request context
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+	"current_profile", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, *_):
+	# On the execution context, dropped with it if the statement fails
+	if _current_profile.get() is not None and context is not None:
+		context.profiling_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, *_):
+	profile = _current_profile.get()
+	start = getattr(context, "profiling_query_start", None)
+	if profile is not None and start is not None:
+		profile.record(statement, time.perf_counter() - start)
+
+
+def instrument_engines():
+	"""Attribute the statements of every SQLAlchemy engine to requests."""
+	if not event.contains(
+		Engine, "before_cursor_execute", _before_cursor_execute
+	):
+		event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+		event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingMiddleware:
+	"""ASGI middleware adding a Server-Timing header with SQL statistics."""
+
+	def __init__(self, app, slow_request_ms: float = 0.0):
+		self.app = app
+		self.slow_request_ms = slow_request_ms
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		profile = RequestProfile()
+		token = _current_profile.set(profile)
+		start = time.perf_counter()
+
+		async def send_with_timing(message):
+			if message["type"] == "http.response.start":
+				header = profile.server_timing(time.perf_counter() - start)
+				message["headers"] = [
+					*message.get("headers", []),
+					(b"server-timing", header.encode("latin-1")),
+				]
+			await send(message)
+
+		try:
+			await self.app(scope, receive, send_with_timing)
+		finally:
+			_current_profile.reset(token)
+			self.log_if_slow(scope, profile, time.perf_counter() - start)
+
+	def log_if_slow(self, scope, profile: RequestProfile, total_time: float):
+		if (
+			not self.slow_request_ms
+			or profile.db_time * 1000 < self.slow_request_ms
+		):
+			return
+		logger.warning(
+			json.dumps(
+				{
+					"event": "slow_request_sql",
+					"method": scope["method"],
+					# Template, not path: admin paths carry secret keys
+					"route": getattr(scope.get("route"), "path", "unmatched"),
+					"query_count": profile.query_count,
+					"db_ms": round(profile.db_time * 1000, 2),
+					"total_ms": round(total_time * 1000, 2),
+					"slowest_ms": round(profile.slowest_time * 1000, 2),
+					"slowest_statement": profile.slowest_statement[
+						:MAX_STATEMENT_LENGTH
+					],
+				}
+			)
+		)
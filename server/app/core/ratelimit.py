@@ -0,0 +1,188 @@
+"""
+Per-client token bucket rate limiting shared by all worker processes.
+
+Buckets live in an anonymous shared memory map allocated when the app is
+created, i.e. in the launcher's master process before it forks (see
+app/server.py), so every worker reads and updates the same buckets. Each
+bucket is a 24-byte slot (client fingerprint, tokens, last update), and the
+table is 4-way set associative: a client maps to a group of 4 slots and,
+when none of them holds its bucket, takes over the least recently updated
+one (which starts full). The table never grows, so a flood of distinct
+clients costs no memory, only evictions.
+
+Python has no atomic compare-and-swap on shared memory, so a slot group is
+updated under one of a fixed set of process-shared locks (lock striping):
+workers only contend when they touch the same stripe at the same moment.
+A check costs about 2 microseconds.
+
+Workers started by plain `uvicorn --workers` are spawned, not forked, and
+each get their own table.
+"""
+
+import math
+import mmap
+import multiprocessing
+import struct
+import time
+
+from app.core.metrics import RATE_LIMITED
+
+# Fingerprint (0 = empty slot), tokens, last update (time.monotonic)
+SLOT = struct.Struct("=qdd")
+WAYS = 4
+GROUP = struct.Struct("=" + "qdd" * WAYS)
+LOCK_STRIPES = 64
+
+# First path segments that are never redirects
+RESERVED_SEGMENTS = {"", "health", "metrics", "docs", "redoc", "openapi.json"}
+
+
+class RateLimiter:
+	"""Token buckets per (budget, client) in a shared memory table."""
+
+	def __init__(self, slots: int = 65536):
+		self.budgets: dict[str, tuple[float, float]] = {}
+		self._locks = [multiprocessing.Lock() for _ in range(LOCK_STRIPES)]
+		self._allocate(slots)
+
+	def _allocate(self, slots: int):
+		self.groups = max(slots // WAYS, 1)
+		self._table = mmap.mmap(-1, self.groups * WAYS * SLOT.size)
+
+	def configure(self, slots: int, budgets: dict[str, tuple[float, float]]):
+		"""
+		Set the table size and budgets, dropping all buckets.
+
+		Args:
+			slots: Number of buckets the table holds
+			budgets: Budget name to (tokens per second, burst size)
+		"""
+		self.budgets = budgets
+		self._allocate(slots)
+
+	def acquire(self, budget: str, client: str) -> float:
+		"""
+		Take one token from the client's bucket for `budget`.
+
+		Returns:
+			0.0 if the request may proceed, otherwise the seconds until
+			a token becomes available
+		"""
+		rate, burst = self.budgets[budget]
+		fingerprint = hash((budget, client)) or 1
+		group = fingerprint % self.groups
+		first = group * WAYS
+		table = self._table
+		now = time.monotonic()
+
+		lock = self._locks[group % LOCK_STRIPES]
+		# acquire()/release() are the C semaphore methods; `with` goes
+		# through Python-level __enter__/__exit__ and costs 5x more
+		lock.acquire()
+		try:
+			values = GROUP.unpack_from(table, first * SLOT.size)
+			keys = values[::3]
+			if fingerprint in keys:
+				way = keys.index(fingerprint)
+				updated = values[way * 3 + 2]
+				tokens = min(
+					burst, values[way * 3 + 1] + (now - updated) * rate
+				)
+			else:
+				# Take over the least recently updated (or an empty) slot
+				updates = values[2::3]
+				way = updates.index(min(updates))
+				tokens = burst
+
+			if tokens >= 1:
+				tokens -= 1
+				wait = 0.0
+			else:
+				wait = (1 - tokens) / rate
+			SLOT.pack_into(
+				table, (first + way) * SLOT.size, fingerprint, tokens, now
+			)
+		finally:
+			lock.release()
+		return wait
+
+
+LIMITER = RateLimiter()
+
+
+def classify(method: str, path: str):
+	"""
+	Budget a request counts against, None for unlimited requests.
+
+	Classified from the raw path, before routing, so rejected requests
+	cost no routing or dependency work.
+	"""
+	if method == "POST" and path == "/url":
+		return "create"
+	if method == "POST" and path == "/peek/batch":
+		return "redirect"
+	_, segment, *rest = path.split("/")
+	if segment == "admin":
+		return "admin"
+	if method in ("GET", "HEAD") and (
+		segment == "peek"
+		or path == "/url/suggest"
+		or (not rest and segment not in RESERVED_SEGMENTS)
+	):
+		return "redirect"
+	return None
+
+
+class RateLimitMiddleware:
+	"""
+	ASGI middleware answering 429 to clients over their budget.
+
+	Clients are identified by IP address, or by the value of `key_header`
+	when it is set and present in the request.
+	"""
+
+	def __init__(
+		self, app, limiter: RateLimiter = LIMITER, key_header: str = ""
+	):
+		self.app = app
+		self.limiter = limiter
+		self.key_header = key_header.lower().encode("latin-1")
+
+	def client_id(self, scope) -> str:
+		if self.key_header:
+			for name, value in scope["headers"]:
+				if name == self.key_header:
+					return "key:" + value.decode("latin-1")
+		client = scope.get("client")
+		return client[0] if client else "unknown"
+
+	async def __call__(self, scope, receive, send):
+		budget = None
+		if scope["type"] == "http":
+			budget = classify(scope["method"], scope["path"])
+		if budget is None:
+			await self.app(scope, receive, send)
+			return
+
+		wait = self.limiter.acquire(budget, self.client_id(scope))
+		if not wait:
+			await self.app(scope, receive, send)
+			return
+
+		RATE_LIMITED.inc(budget)
+		await send(
+			{
+				"type": "http.response.start",
+				"status": 429,
+				"headers": [
+					(b"content-type", b"application/json"),
+					(b"retry-after", str(math.ceil(wait)).encode()),
+				],
+			}
+		)
+		await send(
+			{
+				"type": "http.response.body",
+				"body": b'{"detail":"Too many requests"}',
+			}
+		)
@@ -0,0 +1,65 @@
+"""
+HTTP caching policies of redirects.
+
+A policy is the status code of a redirect and its Cache-Control header.
+Each URL may set its own status code (`redirect_status`) and max-age
+(`cache_max_age`); NULL falls back to the redirect_status_code and
+redirect_max_age settings.
+
+	max-age > 0  "public, max-age=N", browsers and CDNs answer repeats
+	max-age 0    "no-store", every visit reaches us and is counted
+
+Use a max-age for links that never change: repeat visits answered by a
+cache are not counted as clicks.
+
+301 and 308 are cacheable by default, so they always carry an explicit
+Cache-Control header. Policies are resolved once per lookup and cached
+with the redirect target, so a cache hit applies them without a query.
+"""
+
+from typing import NamedTuple
+
+from app.core.config import Settings
+
+REDIRECT_STATUS_CODES = (301, 302, 307, 308)
+
+
+class RedirectTarget(NamedTuple):
+	"""What the redirect endpoint needs to answer, policy included."""
+
+	key: str
+	id: int
+	target_url: str
+	status_code: int
+	cache_control: str
+
+
+def cache_control(max_age: int) -> str:
+	"""Cache-Control header value for a max-age (0 = not cacheable)."""
+	if max_age > 0:
+		return f"public, max-age={max_age}"
+	return "no-store"
+
+
+def resolve(row, settings: Settings) -> RedirectTarget:
+	"""
+	Apply the per-URL policy, or the global one, to a redirect row.
+
+	Args:
+		row: Row with `key`, `id`, `target_url`, `redirect_status` and
+			`cache_max_age`
+		settings: Application settings with the global policy
+
+	Returns:
+		RedirectTarget ready to be cached and answered
+	"""
+	max_age = row.cache_max_age
+	if max_age is None:
+		max_age = settings.redirect_max_age
+	return RedirectTarget(
+		key=row.key,
+		id=row.id,
+		target_url=row.target_url,
+		status_code=row.redirect_status or settings.redirect_status_code,
+		cache_control=cache_control(max_age),
+	)
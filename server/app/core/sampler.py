@@ -0,0 +1,209 @@
+"""
+On-demand sampling profiler for individual requests.
+
+A profiled request starts a session on a background thread that snapshots
+the Python stacks of all busy threads every `interval` seconds via
+`sys._current_frames()`. Nothing is traced, so unprofiled requests pay only
+for a header check (and a random draw when a sample rate is set).
+
+Sessions are saved as collapsed stacks (`frame;frame;frame count` per line),
+the input format of flamegraph.pl and speedscope, and can be downloaded
+through the admin-only `/admin/profiles` endpoints.
+
+Stacks are taken from every busy thread while the request runs, so under
+concurrent traffic a profile also contains work done for other requests.
+"""
+
+import asyncio
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import count
+from pathlib import Path
+from typing import Optional
+
+from app.core.security import is_admin_token
+
+PROFILE_HEADER = b"x-profile-request"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+PROFILE_ID_PATTERN = re.compile(r"^[\w.-]+$")
+
+# Innermost frames of threads that are parked rather than working
+IDLE_FRAMES = {
+	("threading.py", "wait"),
+	("threading.py", "_wait_for_tstate_lock"),
+	("queue.py", "get"),
+	("selectors.py", "select"),
+}
+
+
+def collapse_stack(frame) -> str:
+	"""Render a frame and its callers as `module:function` from the root."""
+	names = []
+	while frame is not None:
+		module = frame.f_globals.get("__name__", "?")
+		names.append(f"{module}:{frame.f_code.co_name}")
+		frame = frame.f_back
+	return ";".join(reversed(names))
+
+
+def is_idle(frame) -> bool:
+	code = frame.f_code
+	return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+	"""Samples thread stacks while at least one session is open."""
+
+	def __init__(self):
+		self.sample_rate = 0.0
+		self.interval = 0.005
+		self.directory = Path(".profiles")
+		self.max_files = 100
+		self._lock = threading.Lock()
+		self._sessions: dict[int, Counter] = {}
+		self._session_ids = count()
+		self._thread: Optional[threading.Thread] = None
+
+	def configure(
+		self,
+		sample_rate: float,
+		interval: float,
+		directory: str,
+		max_files: int,
+	):
+		self.sample_rate = sample_rate
+		self.interval = interval
+		self.directory = Path(directory)
+		self.max_files = max_files
+
+	def start_session(self) -> int:
+		with self._lock:
+			session_id = next(self._session_ids)
+			self._sessions[session_id] = Counter()
+			if self._thread is None:
+				self._thread = threading.Thread(
+					target=self._run, name="stack-sampler", daemon=True
+				)
+				self._thread.start()
+		return session_id
+
+	def stop_session(self, session_id: int) -> Counter:
+		with self._lock:
+			return self._sessions.pop(session_id, Counter())
+
+	def _run(self):
+		own_id = threading.get_ident()
+		while True:
+			with self._lock:
+				if not self._sessions:
+					self._thread = None
+					return
+			stacks = [
+				collapse_stack(frame)
+				for thread_id, frame in sys._current_frames().items()
+				if thread_id != own_id and not is_idle(frame)
+			]
+			with self._lock:
+				for stack_counts in self._sessions.values():
+					stack_counts.update(stacks)
+			time.sleep(self.interval)
+
+	def save(self, stack_counts: Counter, label: str) -> str:
+		"""
+		Write a session as collapsed stacks and prune old profiles.
+
+		Args:
+			stack_counts: Samples per collapsed stack
+			label: Human readable part of the profile id (method and path)
+
+		Returns:
+			Profile id usable with `load`
+		"""
+		self.directory.mkdir(parents=True, exist_ok=True)
+		safe_label = re.sub(r"[^\w.-]+", "_", label).strip("_")
+		profile_id = f"{time.time_ns()}-{os.getpid()}-{safe_label}"
+		lines = [f"{stack} {n}" for stack, n in stack_counts.most_common()]
+		path = self.directory / f"{profile_id}.collapsed"
+		path.write_text("\n".join(lines) + "\n")
+
+		profiles = sorted(self.directory.glob("*.collapsed"))
+		for old_path in profiles[: -self.max_files]:
+			old_path.unlink(missing_ok=True)
+		return profile_id
+
+	def list_profiles(self) -> list[str]:
+		if not self.directory.exists():
+			return []
+		return sorted(
+			(path.stem for path in self.directory.glob("*.collapsed")),
+			reverse=True,
+		)
+
+	def load(self, profile_id: str) -> Optional[str]:
+		if not PROFILE_ID_PATTERN.match(profile_id):
+			return None
+		path = self.directory / f"{profile_id}.collapsed"
+		return path.read_text() if path.exists() else None
+
+
+PROFILER = SamplingProfiler()
+
+
+class SamplingProfilerMiddleware:
+	"""
+	ASGI middleware profiling a sampled fraction of requests.
+
+	A request is also profiled when it carries `X-Profile-Request` together
+	with a valid `X-Admin-Token`. The profile id is returned in the
+	`X-Profile-Id` response header.
+	"""
+
+	def __init__(self, app, profiler: SamplingProfiler = PROFILER):
+		self.app = app
+		self.profiler = profiler
+
+	def should_profile(self, scope) -> bool:
+		headers = dict(scope["headers"])
+		if PROFILE_HEADER in headers:
+			token = headers.get(ADMIN_TOKEN_HEADER, b"").decode("latin-1")
+			return is_admin_token(token)
+		rate = self.profiler.sample_rate
+		return rate > 0 and random.random() < rate
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http" or not self.should_profile(scope):
+			await self.app(scope, receive, send)
+			return
+
+		session_id = self.profiler.start_session()
+		label = f"{scope['method']} {scope['path']}"
+		profile_id = f"pending-{session_id}"
+
+		async def send_with_profile_id(message):
+			nonlocal profile_id
+			if message["type"] == "http.response.start":
+				# The response is complete from the app's point of view.
+				# Written before the headers go out, so the returned id can
+				# be downloaded at once; on a thread, as file IO would
+				# stall every request on this event loop.
+				profile_id = await asyncio.to_thread(
+					self.profiler.save,
+					self.profiler.stop_session(session_id),
+					label,
+				)
+				message["headers"] = [
+					*message.get("headers", []),
+					(b"x-profile-id", profile_id.encode()),
+				]
+			await send(message)
+
+		try:
+			await self.app(scope, receive, send_with_profile_id)
+		finally:
+			if profile_id.startswith("pending-"):
+				self.profiler.stop_session(session_id)
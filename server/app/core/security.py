@@ -0,0 +1,70 @@
+import base64
+import hashlib
+import hmac
+import secrets
+from typing import Optional
+
+from app.core.config import get_settings
+
+# Bytes of the HMAC kept in derived secret keys (80 bits, 16 base32 chars)
+SECRET_MAC_BYTES = 10
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+	"""
+	Check a token against the configured admin token in constant time.
+
+	Args:
+		token: Token sent by the client (X-Admin-Token header)
+
+	Returns:
+		True if an admin token is configured and the token matches it
+	"""
+	admin_token = get_settings().admin_token
+	if not admin_token or not token:
+		return False
+	return secrets.compare_digest(token.encode(), admin_token.encode())
+
+
+def derive_secret_key(key: str) -> Optional[str]:
+	"""
+	Derive the admin secret key of a URL key from the server secret.
+
+	The secret key is `key` + "_" + truncated HMAC-SHA256(server secret,
+	key), base32 encoded so it never contains "_" and the key can be split
+	off again at the last underscore.
+
+	Args:
+		key: URL key
+
+	Returns:
+		Derived secret key, None if no server secret (secret_key_hmac) is
+		configured
+	"""
+	server_secret = get_settings().secret_key_hmac
+	if not server_secret:
+		return None
+	mac = hmac.digest(server_secret.encode(), key.encode(), hashlib.sha256)
+	return f"{key}_{base64.b32encode(mac[:SECRET_MAC_BYTES]).decode()}"
+
+
+def get_secret_key(db_url) -> Optional[str]:
+	"""Admin secret key of a URL: the stored one, else the derived one."""
+	return db_url.secret_key or derive_secret_key(db_url.key)
+
+
+def is_secret_key(db_url, secret_key: str) -> bool:
+	"""
+	Check an admin secret key against a URL in constant time.
+
+	Args:
+		db_url: URL model (with `key` and, for older rows, `secret_key`)
+		secret_key: Secret key sent by the client
+
+	Returns:
+		True if the secret key belongs to the URL
+	"""
+	expected = get_secret_key(db_url)
+	if expected is None:
+		return False
+	return secrets.compare_digest(secret_key.encode(), expected.encode())
@@ -1,12 +1,243 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.api import crud
+from app.api.routes import (
+	admin,
+	health,
+	metrics,
+	profiles,
+	takedown,
+	urls,
+)
+from app.core import (
+	bots,
+	database,
+	profiling,
+	ratelimit,
+	redirects,
+	sampler,
+)
+from app.core import metrics as app_metrics
+from app.core.blocklist import BLOCKLIST
+from app.core.cache import REDIRECT_CACHE
+from app.core.config import Settings, get_settings
+from app.core.hostcache import HOST_CACHE
+from app.core.invalidation import INVALIDATOR
+from app.core.jobs import JOBS
+from app.core.keyindex import KEY_INDEX
+
+logger = logging.getLogger(__name__)
+
+
+def warm_cache(settings: Settings) -> int:
+	"""
+	Fill the redirect cache with the most clicked URLs.
+
+	Returns:
+		Number of cached URLs
+	"""
+	if not (REDIRECT_CACHE.enabled and settings.redirect_cache_warm):
+		return 0
+	db = database.SessionLocal(bind=database.get_engine(settings))
+	try:
+		limit = min(settings.redirect_cache_warm, settings.redirect_cache_size)
+		return REDIRECT_CACHE.warm(
+			redirects.resolve(row, settings)
+			for row in crud.get_popular_redirect_targets(db, limit)
+		)
+	finally:
+		db.close()
+
+
+def build_key_index(settings: Settings) -> int:
+	"""
+	Load every key in use into the key index, when enabled.
+
+	Returns:
+		Number of indexed keys
+	"""
+	if not settings.key_index_enabled:
+		return 0
+	db = database.SessionLocal(bind=database.get_engine(settings))
+	try:
+		count = KEY_INDEX.build(crud.iter_all_keys(db))
+	finally:
+		db.close()
+	logger.info(
+		"Key index: %d keys, %.1f bytes per key",
+		count,
+		KEY_INDEX.memory_bytes() / max(count, 1),
+	)
+	return count
+
+
+def load_blocklist(settings: Settings) -> int:
+	"""
+	Load the target domain blocklist, when configured.
+
+	A blocklist that can't be read is logged, leaving creation unchecked
+	until the file is fixed (workers keep checking it for changes).
+
+	Returns:
+		Number of blocked domains
+	"""
+	if not BLOCKLIST.enabled:
+		return 0
+	try:
+		return BLOCKLIST.load()
+	except OSError:
+		logger.exception(
+			"Can't load the blocklist %s", settings.blocklist_path
+		)
+		return 0
+
+
+def warm_up(settings: Settings, fill_cache: bool = True):
+	"""
+	Prepare this worker for traffic: create the engine, open pool
+	connections, fill the redirect cache, build the key index and load
+	the blocklist.
+
+	Database errors are logged rather than raised, so a worker started
+	while the database is down still comes up (and reports not ready).
+
+	Args:
+		settings: Application settings
+		fill_cache: False when the cache, key index and blocklist were
+			filled before forking (see app/server.py)
+	"""
+	if fill_cache:
+		load_blocklist(settings)
+	engine = database.get_engine(settings)
+	try:
+		database.prewarm_pool(engine, settings.db_pool_prewarm)
+		if fill_cache:
+			warm_cache(settings)
+			build_key_index(settings)
+	except SQLAlchemyError:
+		logger.exception("Warm-up failed, serving with a cold worker")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	# Runs before the server accepts connections, so requests (and
+	# readiness probes) only arrive once the worker is warm
+	settings = app.state.settings
+	warm_up(settings, fill_cache=not app.state.cache_preloaded)
+	JOBS.start()
+	BLOCKLIST.start()
+	if REDIRECT_CACHE.enabled:
+		INVALIDATOR.start(database.get_engine(settings))
+	yield
+	INVALIDATOR.stop()
+	BLOCKLIST.stop()
+	# Queued jobs still need the engine
+	JOBS.stop(settings.job_drain_timeout)
+	database.dispose_engine()
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+	"""
+	Build the FastAPI application.
+
+	Nothing here touches the database: the engine is created by the
+	lifespan hook. Database migrations are managed by Alembic, run
+	'make migrate' to apply pending migrations.
+
+	Args:
+		settings: Application settings (default: get_settings())
+
+	Returns:
+		Configured FastAPI application
+	"""
+	settings = settings or get_settings()
+	app = FastAPI(lifespan=lifespan)
+	app.state.settings = settings
+	app.state.cache_preloaded = False
+	REDIRECT_CACHE.configure(
+		settings.redirect_cache_size, settings.redirect_cache_ttl
+	)
+	HOST_CACHE.configure(settings.host_cache_size)
+	INVALIDATOR.configure(
+		settings.cache_invalidation_interval,
+		settings.cache_invalidation_retention,
+		replay=settings.redirect_cache_ttl,
+	)
+	BLOCKLIST.configure(
+		settings.blocklist_path, settings.blocklist_reload_interval
+	)
+	bots.CLASSIFIER.configure(settings.bot_user_agents.split(","))
+	JOBS.configure(
+		settings.job_queue_size,
+		settings.job_workers,
+		settings.job_retries,
+		settings.job_retry_backoff,
+	)
+
+	if settings.rate_limit_enabled:
+		# Allocated here, before app/server.py forks, to be shared
+		ratelimit.LIMITER.configure(
+			settings.rate_limit_slots,
+			{
+				"create": (
+					settings.rate_limit_create_per_minute / 60,
+					settings.rate_limit_create_burst,
+				),
+				"redirect": (
+					settings.rate_limit_redirect_per_minute / 60,
+					settings.rate_limit_redirect_burst,
+				),
+				"admin": (
+					settings.rate_limit_admin_per_minute / 60,
+					settings.rate_limit_admin_burst,
+				),
+			},
+		)
+		# Added first, so it runs inside (and 429s are counted by) metrics
+		app.add_middleware(
+			ratelimit.RateLimitMiddleware,
+			key_header=settings.rate_limit_key_header,
+		)
+
+	if settings.metrics_enabled:
+		app_metrics.REGISTRY.configure(
+			settings.metrics_dir, settings.metrics_flush_interval
+		)
+		app_metrics.instrument_engines()
+		app.add_middleware(app_metrics.MetricsMiddleware)
+		# Must come before the urls router, whose /{url_key} would match it
+		app.include_router(metrics.router)
+
+	if settings.profiling_enabled:
+		profiling.instrument_engines()
+		app.add_middleware(
+			profiling.ProfilingMiddleware,
+			slow_request_ms=settings.profiling_slow_request_ms,
+		)
+
+	# Always installed so sampling can be switched on at runtime
+	sampler.PROFILER.configure(
+		sample_rate=settings.profiler_sample_rate,
+		interval=settings.profiler_interval_ms / 1000,
+		directory=settings.profiler_dir,
+		max_files=settings.profiler_max_files,
+	)
+	app.add_middleware(sampler.SamplingProfilerMiddleware)
 
-from app.api.routes import admin, urls
+	# Include routers
+	app.include_router(health.router)
+	app.include_router(urls.router)
+	# Both must come before the admin router, whose /{secret_key} would
+	# match them
+	app.include_router(profiles.router)
+	app.include_router(takedown.router)
+	app.include_router(admin.router)
+	return app
 
-# Initialize FastAPI application
-# Note: Database migrations are now managed by Alembic
-# Run 'make migrate' to apply pending migrations
-app = FastAPI()
 
-# Include routers
-app.include_router(urls.router)
-app.include_router(admin.router)
+app = create_app()
@@ -1,3 +1,3 @@
-from .url import URL
+from .url import URL, Host, URLArchive, URLChange
 
-__all__ = ["URL"]
+__all__ = ["Host", "URL", "URLArchive", "URLChange"]
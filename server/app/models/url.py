@@ -1,6 +1,16 @@
 from datetime import UTC, datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import (
+	Boolean,
+	Column,
+	DateTime,
+	ForeignKey,
+	Index,
+	Integer,
+	String,
+	text,
+)
+from sqlalchemy.orm import relationship
 
 from app.core.database import Base
 
@@ -10,13 +20,122 @@ def utc_now():
 	return datetime.now(UTC)
 
 
+class Host(Base):
+	"""
+	Origin (scheme and host) shared by the target URLs of many links.
+
+	Rows are never updated nor deleted, so their ids are cached for good
+	(see app/core/hostcache.py).
+	"""
+
+	__tablename__ = "hosts"
+
+	id = Column(Integer, primary_key=True)
+	origin = Column(String, unique=True, index=True, nullable=False)
+
+
 class URL(Base):
 	__tablename__ = "urls"
 
 	id = Column(Integer, primary_key=True)
 	key = Column(String, unique=True, index=True)
-	secret_key = Column(String, unique=True, index=True)
-	target_url = Column(String, index=True)
+	# NULL when derived from the key (see app/core/security.py). Admin
+	# lookups go through `key`, so this column needs no index.
+	secret_key = Column(String)
+	# Target URL, split by hosts.split_target: its origin in `hosts`, the
+	# rest here. Read it whole through `target_url`.
+	host_id = Column(Integer, ForeignKey("hosts.id"), index=True)
+	target_path = Column(String, nullable=False, default="")
+	# Target host with its labels reversed (see app/utils/hosts.py), so a
+	# domain and its subdomains are one index range. Compared bytewise
+	# (collation "C" on PostgreSQL, SQLite's default), see crud.match_domain.
+	reversed_host = Column(
+		String().with_variant(String(collation="C"), "postgresql")
+	)
 	is_active = Column(Boolean, default=True)
 	clicks = Column(Integer, default=0)
 	created_at = Column(DateTime, default=utc_now, nullable=False)
+	# Bumped on every change visible through peek/admin, for their ETags
+	version = Column(Integer, default=1, server_default="1", nullable=False)
+	# Redirect policy, NULL = global default (see app/core/redirects.py)
+	redirect_status = Column(Integer)
+	cache_max_age = Column(Integer)
+
+	host = relationship(Host, lazy="joined")
+
+	__table_args__ = (
+		# Covering index for the redirect lookup, so that it can be answered
+		# from the index alone (see crud.get_redirect_target). The payload
+		# columns are key columns, as SQLite has no INCLUDE; is_active too,
+		# which SQLite needs to see the partial index as covering. Uniqueness
+		# of keys is enforced by ix_urls_key.
+		Index(
+			"ix_urls_active_key",
+			"key",
+			"host_id",
+			"target_path",
+			"redirect_status",
+			"cache_max_age",
+			"is_active",
+			postgresql_include=["id"],
+			postgresql_where=text("is_active"),
+			sqlite_where=text("is_active = 1"),
+		),
+		# Active rows only: rows leave it as a takedown deactivates them, so
+		# later chunks don't rescan them (see crud.match_domain)
+		Index(
+			"ix_urls_reversed_host",
+			"reversed_host",
+			postgresql_where=text("is_active"),
+			sqlite_where=text("is_active = 1"),
+		),
+		# Ids of archived rows are never reused (see URLArchive.id)
+		{"sqlite_autoincrement": True},
+	)
+
+	@property
+	def target_url(self) -> str:
+		return (self.host.origin if self.host else "") + self.target_path
+
+
+class URLArchive(Base):
+	"""
+	Cold storage for inactive URLs moved out of the hot `urls` table.
+
+	Only the key is indexed: archived rows are never redirected to or
+	administered, they only need to answer peek lookups and keep their key
+	reserved.
+	"""
+
+	__tablename__ = "urls_archive"
+
+	# Keeps the id the row had in `urls`
+	id = Column(Integer, primary_key=True, autoincrement=False)
+	key = Column(String, unique=True, index=True, nullable=False)
+	secret_key = Column(String)
+	target_url = Column(String)
+	is_active = Column(Boolean, default=False)
+	clicks = Column(Integer, default=0)
+	created_at = Column(DateTime, nullable=False)
+	archived_at = Column(DateTime, default=utc_now, nullable=False)
+
+
+class URLChange(Base):
+	"""
+	Change making cached redirects stale, read by every worker (see
+	app/core/invalidation.py).
+
+	Names either one key or, for a takedown, a whole domain. Ids only grow,
+	so workers read the changes after the last id they saw.
+	"""
+
+	__tablename__ = "url_changes"
+	# Pruning may empty the table: ids must not start over (see
+	# CacheInvalidator.poll)
+	__table_args__ = {"sqlite_autoincrement": True}
+
+	id = Column(Integer, primary_key=True)
+	key = Column(String)
+	# Reversed-label domain (see app/utils/hosts.py), subdomains included
+	reversed_domain = Column(String)
+	created_at = Column(DateTime, default=utc_now, nullable=False, index=True)
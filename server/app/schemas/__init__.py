@@ -1,3 +1,30 @@
-from .url import URL, URLBase, URLInfo, URLPeek
+from .profiling import ProfileList, SamplingConfig
+from .url import (
+	URL,
+	KeyConflict,
+	KeySuggestions,
+	PeekBatch,
+	PeekBatchItem,
+	PeekBatchRequest,
+	TakedownRequest,
+	TakedownResult,
+	URLBase,
+	URLInfo,
+	URLPeek,
+)
 
-__all__ = ["URL", "URLBase", "URLInfo", "URLPeek"]
+__all__ = [
+	"URL",
+	"KeyConflict",
+	"KeySuggestions",
+	"PeekBatch",
+	"PeekBatchItem",
+	"PeekBatchRequest",
+	"TakedownRequest",
+	"TakedownResult",
+	"URLBase",
+	"URLInfo",
+	"URLPeek",
+	"ProfileList",
+	"SamplingConfig",
+]
@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+
+
+class SamplingConfig(BaseModel):
+	"""Runtime configuration of the sampling profiler"""
+
+	sample_rate: float = Field(
+		ge=0.0,
+		le=1.0,
+		description="Fraction of requests to profile (0 disables sampling)",
+	)
+
+
+class ProfileList(BaseModel):
+	"""Stored profiles, newest first"""
+
+	sample_rate: float
+	profiles: list[str]
@@ -1,18 +1,50 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
+# Custom key rules, also followed by suggested keys (see app/utils/keygen.py)
+CUSTOM_KEY_PATTERN = r"^[a-zA-Z0-9_-]+$"
+CUSTOM_KEY_MIN_LENGTH = 3
+CUSTOM_KEY_MAX_LENGTH = 50
+# Keys accepted by one POST /peek/batch request
+PEEK_BATCH_MAX_KEYS = 5000
+RESERVED_KEYS = frozenset(
+	{
+		"admin",
+		"api",
+		"url",
+		"static",
+		"docs",
+		"redoc",
+		"openapi",
+		"health",
+		"metrics",
+	}
+)
+
 
 class URLBase(BaseModel):
 	target_url: str
 	custom_key: Optional[str] = Field(
 		None,
-		min_length=3,
-		max_length=50,
-		pattern=r"^[a-zA-Z0-9_-]+$",
+		min_length=CUSTOM_KEY_MIN_LENGTH,
+		max_length=CUSTOM_KEY_MAX_LENGTH,
+		pattern=CUSTOM_KEY_PATTERN,
 		description="Custom URL key (alphanumeric, hyphens, underscores)",
 	)
+	redirect_status: Optional[Literal[301, 302, 307, 308]] = Field(
+		None, description="Redirect status code (default: server setting)"
+	)
+	cache_max_age: Optional[int] = Field(
+		None,
+		ge=0,
+		le=31_536_000,
+		description=(
+			"Seconds browsers and CDNs may cache the redirect, 0 = no-store "
+			"(default: server setting)"
+		),
+	)
 
 	@field_validator("custom_key")
 	@classmethod
@@ -22,20 +54,7 @@ class URLBase(BaseModel):
 		if v is None:
 			return v
 
-		# List of reserved keywords
-		reserved = {
-			"admin",
-			"api",
-			"url",
-			"static",
-			"docs",
-			"redoc",
-			"openapi",
-			"health",
-			"metrics",
-		}
-
-		if v.lower() in reserved:
+		if v.lower() in RESERVED_KEYS:
 			raise ValueError(f"'{v}' is a reserved keyword and cannot be used")
 
 		return v
@@ -47,6 +66,8 @@ class URL(BaseModel):
 	target_url: str
 	is_active: bool
 	clicks: int
+	redirect_status: Optional[int] = None
+	cache_max_age: Optional[int] = None
 
 	model_config = {"from_attributes": True}
 
@@ -56,6 +77,21 @@ class URLInfo(URL):
 	admin_url: str
 
 
+class KeySuggestions(BaseModel):
+	"""Availability of a custom key and available keys close to it"""
+
+	key: str
+	available: bool
+	suggestions: list[str]
+
+
+class KeyConflict(BaseModel):
+	"""409 answer to a taken custom key"""
+
+	detail: str
+	suggestions: list[str]
+
+
 class URLPeek(BaseModel):
 	"""Schema for peeking at a shortened URL without redirecting"""
 
@@ -66,3 +102,36 @@ class URLPeek(BaseModel):
 	created_at: datetime
 
 	model_config = {"from_attributes": True}
+
+
+class PeekBatchRequest(BaseModel):
+	"""Keys to peek at in one request"""
+
+	keys: list[str] = Field(min_length=1, max_length=PEEK_BATCH_MAX_KEYS)
+
+
+class PeekBatchItem(BaseModel):
+	"""Peek result of one key; `url` is None when the key was not found"""
+
+	key: str
+	found: bool
+	url: Optional[URLPeek] = None
+
+
+class PeekBatch(BaseModel):
+	"""Peek results in the order of the requested keys"""
+
+	items: list[PeekBatchItem]
+
+
+class TakedownRequest(BaseModel):
+	"""Domain whose links (subdomains included) are taken down"""
+
+	domain: str = Field(min_length=1, max_length=253)
+
+
+class TakedownResult(BaseModel):
+	"""Outcome of a takedown"""
+
+	domain: str
+	deactivated: int
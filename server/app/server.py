@@ -0,0 +1,304 @@
+"""
+Production launcher: one uvicorn worker process per CPU core.
+
+The master process imports the app, fills the redirect cache and binds the
+listening socket *before* forking, then forks the workers. Workers share
+the imported code and the cache snapshot with the master copy-on-write
+(`gc.freeze()` keeps the garbage collector from touching, and so copying,
+those pages). The master never keeps a database engine: it disposes the
+one used for the cache warm-up before forking, and every worker creates
+its own engine and pool in its lifespan.
+
+Signals handled by the master:
+
+	SIGTERM, SIGINT  stop workers gracefully (SIGKILL after the timeout)
+	SIGHUP           rolling restart, one worker at a time
+
+During a rolling restart every replacement must report ready before the
+worker it replaces is stopped, so capacity never drops.
+
+Workers that die unexpectedly are replaced. Code is preloaded, so a
+rolling restart refreshes processes and pools but not code; deploy new
+code with a full restart.
+
+Usage:
+	python -m app.server [--host 0.0.0.0] [--port 8000] [--workers N]
+		[--log-level info]
+
+How throughput scales with workers is not established: measure it with
+`make scaling` (benchmarks/scaling.py) on the target machine, against
+PostgreSQL, before relying on extra workers for capacity.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import select
+import signal
+import socket
+import time
+from typing import Callable, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import database
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.main import app, build_key_index, load_blocklist, warm_cache
+
+logger = logging.getLogger(__name__)
+
+MASTER_SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+READY_TIMEOUT = 60.0
+
+
+def worker_count(configured: int) -> int:
+	"""Configured worker count, or the number of usable CPU cores if 0."""
+	if configured > 0:
+		return configured
+	if hasattr(os, "sched_getaffinity"):
+		return len(os.sched_getaffinity(0))
+	return os.cpu_count() or 1
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+	sock = socket.create_server((host, port), backlog=backlog)
+	sock.set_inheritable(True)
+	return sock
+
+
+def preload(application: FastAPI):
+	"""
+	Do the work all workers would repeat, once, in the master.
+
+	Fills the redirect cache, builds the key index and loads the blocklist,
+	shared copy-on-write by the workers, and disposes the engine used for
+	it, so no connection is inherited by the workers.
+	"""
+	load_blocklist(application.state.settings)
+	try:
+		cached = warm_cache(application.state.settings)
+		build_key_index(application.state.settings)
+		application.state.cache_preloaded = True
+		logger.info("Preloaded %d redirect cache entries", cached)
+	except SQLAlchemyError:
+		logger.exception("Cache preload failed, workers will fill their own")
+	finally:
+		database.dispose_engine()
+	gc.freeze()
+
+
+class WorkerServer(uvicorn.Server):
+	"""uvicorn server that reports when it is ready to accept requests"""
+
+	def __init__(self, config: uvicorn.Config, on_ready: Callable[[], None]):
+		super().__init__(config)
+		self.on_ready = on_ready
+
+	async def startup(self, sockets: Optional[list] = None):
+		await super().startup(sockets=sockets)
+		if not self.should_exit:
+			self.on_ready()
+
+
+class Launcher:
+	"""
+	Pre-fork process manager.
+
+	Args:
+		worker: Runs in each forked worker; must call the given callback
+			once it serves requests and return when it has shut down
+		workers: Number of worker processes
+		graceful_timeout: Seconds a worker gets to finish after SIGTERM
+	"""
+
+	def __init__(
+		self,
+		worker: Callable[[Callable[[], None]], None],
+		workers: int,
+		graceful_timeout: float = 30.0,
+	):
+		self.worker = worker
+		self.workers = workers
+		self.graceful_timeout = graceful_timeout
+		self.pids: set[int] = set()
+		self._stopping = False
+		self._reload = False
+
+	def spawn(self) -> tuple[int, int]:
+		"""
+		Fork a worker.
+
+		Returns:
+			Tuple of (pid, file descriptor readable once the worker is ready)
+		"""
+		read_fd, write_fd = os.pipe()
+		pid = os.fork()
+		if pid == 0:
+			os._exit(self._run_worker(read_fd, write_fd))
+		os.close(write_fd)
+		self.pids.add(pid)
+		return pid, read_fd
+
+	def _run_worker(self, read_fd: int, write_fd: int) -> int:
+		"""Child side of `spawn`; returns the worker's exit status."""
+		os.close(read_fd)
+		for sig in MASTER_SIGNALS:
+			signal.signal(sig, signal.SIG_DFL)
+		# Anything inherited belongs to the master; build a fresh engine
+		database.dispose_engine(close=False)
+		try:
+			self.worker(lambda: os.write(write_fd, b"."))
+		except SystemExit as exc:
+			return exc.code if isinstance(exc.code, int) else 1
+		except Exception:
+			logger.exception("Worker %d crashed", os.getpid())
+			return 1
+		return 0
+
+	def wait_ready(self, pid: int, ready_fd: int) -> bool:
+		"""Wait until a worker reports ready (False if it died or hung)."""
+		try:
+			readable, _, _ = select.select([ready_fd], [], [], READY_TIMEOUT)
+			ready = bool(readable) and os.read(ready_fd, 1) == b"."
+		finally:
+			os.close(ready_fd)
+		if not ready:
+			logger.error("Worker %d failed to start", pid)
+		return ready
+
+	def stop_worker(self, pid: int):
+		"""SIGTERM a worker and wait for it, SIGKILLing it on timeout."""
+		self.pids.discard(pid)
+		try:
+			self._terminate(pid)
+		finally:
+			REGISTRY.retire(pid)
+
+	def _terminate(self, pid: int):
+		try:
+			os.kill(pid, signal.SIGTERM)
+		except ProcessLookupError:
+			return
+		deadline = time.monotonic() + self.graceful_timeout
+		while time.monotonic() < deadline:
+			if os.waitpid(pid, os.WNOHANG)[0]:
+				return
+			time.sleep(0.05)
+		logger.warning("Worker %d did not stop in time, killing it", pid)
+		os.kill(pid, signal.SIGKILL)
+		os.waitpid(pid, 0)
+
+	def reap(self) -> list[int]:
+		"""Collect exited workers and return their pids."""
+		exited = []
+		while self.pids:
+			pid, status = os.waitpid(-1, os.WNOHANG)
+			if not pid:
+				break
+			if pid in self.pids:
+				self.pids.discard(pid)
+				REGISTRY.retire(pid)
+				exited.append(pid)
+				logger.warning(
+					"Worker %d exited with status %d",
+					pid,
+					os.waitstatus_to_exitcode(status),
+				)
+		return exited
+
+	def rolling_restart(self):
+		"""Replace every worker, one at a time, without dropping capacity."""
+		for old_pid in list(self.pids):
+			new_pid, ready_fd = self.spawn()
+			if not self.wait_ready(new_pid, ready_fd):
+				self.stop_worker(new_pid)
+				logger.error("Rolling restart aborted")
+				return
+			self.stop_worker(old_pid)
+		logger.info("Rolling restart complete")
+
+	def _handle_signal(self, sig, frame):
+		if sig == signal.SIGHUP:
+			self._reload = True
+		else:
+			self._stopping = True
+
+	def run(self) -> int:
+		"""
+		Start the workers and supervise them until stopped.
+
+		Returns:
+			Exit status: 0 after a requested stop, 1 if workers failed
+			to start
+		"""
+		for sig in MASTER_SIGNALS:
+			signal.signal(sig, self._handle_signal)
+
+		started = [self.spawn() for _ in range(self.workers)]
+		if not all([self.wait_ready(*worker) for worker in started]):
+			self.stop()
+			return 1
+		logger.info("Serving with %d workers", self.workers)
+
+		while not self._stopping:
+			if self._reload:
+				self._reload = False
+				self.rolling_restart()
+			for _ in self.reap():
+				if not self.wait_ready(*self.spawn()):
+					# Don't fork in a tight loop while workers can't start
+					time.sleep(1.0)
+			time.sleep(0.1)
+
+		self.stop()
+		return 0
+
+	def stop(self):
+		for pid in list(self.pids):
+			self.stop_worker(pid)
+
+
+def serve(
+	application: FastAPI, sock: socket.socket, on_ready: Callable[[], None]
+):
+	"""Run uvicorn on an already bound socket (worker side)."""
+	config = uvicorn.Config(application, access_log=False, log_config=None)
+	WorkerServer(config, on_ready).run(sockets=[sock])
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+	settings = get_settings()
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument("--host", default="0.0.0.0")
+	parser.add_argument("--port", type=int, default=8000)
+	parser.add_argument(
+		"--workers",
+		type=int,
+		default=settings.workers,
+		help="Worker processes (default: one per CPU core)",
+	)
+	parser.add_argument("--log-level", default="info")
+	args = parser.parse_args(argv)
+	logging.basicConfig(
+		level=args.log_level.upper(), format="%(process)d %(message)s"
+	)
+
+	preload(app)
+	sock = bind_socket(args.host, args.port)
+	launcher = Launcher(
+		lambda on_ready: serve(app, sock, on_ready),
+		workers=worker_count(args.workers),
+		graceful_timeout=settings.graceful_timeout,
+	)
+	try:
+		return launcher.run()
+	finally:
+		sock.close()
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -0,0 +1,137 @@
+"""
+Archival job moving inactive URLs out of the hot `urls` table.
+
+Deactivated rows are never redirected to again, but they keep occupying the
+`urls` table and its indexes. This job moves inactive rows older than a
+configurable age into `urls_archive`, in key order and in chunks, so the hot
+table and its indexes stay small.
+
+Every chunk is its own transaction, and the last archived key is written to
+a checkpoint file after each chunk, so an interrupted run resumes where it
+stopped instead of rescanning the table.
+
+Usage:
+	python -m app.utils.archive [--days N] [--chunk-size N] [--checkpoint F]
+"""
+
+import argparse
+import json
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.api import crud
+from app.core.config import get_settings
+from app.core.database import SessionLocal, get_engine
+
+DEFAULT_CHECKPOINT = ".archive_checkpoint.json"
+
+
+def load_checkpoint(path: Path) -> Optional[dict]:
+	"""
+	Load an archival checkpoint.
+
+	Args:
+		path: Checkpoint file path
+
+	Returns:
+		Dict with `created_before` (datetime) and `last_key`, or None if
+		there is no checkpoint to resume from
+	"""
+	if not path.exists():
+		return None
+	data = json.loads(path.read_text())
+	return {
+		"created_before": datetime.fromisoformat(data["created_before"]),
+		"last_key": data["last_key"],
+	}
+
+
+def save_checkpoint(path: Path, created_before: datetime, last_key: str):
+	"""Atomically persist the archival progress."""
+	tmp_path = path.with_suffix(path.suffix + ".tmp")
+	tmp_path.write_text(
+		json.dumps(
+			{
+				"created_before": created_before.isoformat(),
+				"last_key": last_key,
+			}
+		)
+	)
+	tmp_path.replace(path)
+
+
+def archive_inactive_urls(
+	db: Session,
+	older_than: timedelta,
+	chunk_size: int,
+	checkpoint_path: Optional[Path] = None,
+) -> int:
+	"""
+	Move inactive URLs older than `older_than` into the archive table.
+
+	When a checkpoint exists, the run resumes from it and keeps the cutoff
+	of the interrupted run so both halves archive the same set of rows. The
+	checkpoint is removed once the run completes.
+
+	Args:
+		db: Database session
+		older_than: Minimum age (by created_at) of rows to archive
+		chunk_size: Number of rows moved per transaction
+		checkpoint_path: Optional checkpoint file for resumable runs
+
+	Returns:
+		Number of rows archived
+	"""
+	checkpoint = load_checkpoint(checkpoint_path) if checkpoint_path else None
+	if checkpoint:
+		created_before = checkpoint["created_before"]
+		last_key = checkpoint["last_key"]
+	else:
+		created_before = datetime.now(UTC) - older_than
+		last_key = ""
+
+	archived = 0
+	while keys := crud.archive_inactive_urls_chunk(
+		db, created_before=created_before, after_key=last_key, limit=chunk_size
+	):
+		archived += len(keys)
+		last_key = keys[-1]
+		if checkpoint_path:
+			save_checkpoint(checkpoint_path, created_before, last_key)
+
+	if checkpoint_path:
+		checkpoint_path.unlink(missing_ok=True)
+
+	return archived
+
+
+def main(argv: Optional[list[str]] = None):
+	settings = get_settings()
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument(
+		"--days", type=int, default=settings.archive_after_days
+	)
+	parser.add_argument(
+		"--chunk-size", type=int, default=settings.archive_chunk_size
+	)
+	parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+	args = parser.parse_args(argv)
+
+	db = SessionLocal(bind=get_engine())
+	try:
+		archived = archive_inactive_urls(
+			db,
+			older_than=timedelta(days=args.days),
+			chunk_size=args.chunk_size,
+			checkpoint_path=Path(args.checkpoint),
+		)
+	finally:
+		db.close()
+	print(f"Archived {archived} inactive URLs")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,92 @@
+"""
+Host names of target URLs, in reversed-label form for suffix matching.
+
+`https://www.Example.com/page` is stored with the host `com.example.www`
+(see models.URL.reversed_host). Every link to a domain or one of its
+subdomains then shares a prefix, so "example.com and everything under it"
+is an index range scan (see crud.match_domain) instead of a LIKE scan over
+target URLs.
+
+Hosts are lowercased, stripped of trailing dots and IDNA encoded, so
+`bücher.de` and `xn--bcher-kva.de` are the same host.
+
+Target URLs themselves are stored split in two (see split_target): the
+origin, shared by many links (see models.Host), and the rest.
+"""
+
+from typing import Optional
+from urllib.parse import urlsplit
+
+MAX_LABEL_LENGTH = 63
+
+
+def normalize_host(host: Optional[str]) -> Optional[str]:
+	"""
+	Canonical form of a host name.
+
+	Args:
+		host: Host name, possibly in uppercase or Unicode
+
+	Returns:
+		Lowercase ASCII host without trailing dot, None if not a host name
+	"""
+	host = (host or "").strip().rstrip(".").lower()
+	if not host or ".." in host:
+		return None
+	if host.isascii():
+		# What the IDNA codec checks of ASCII names, without encoding them
+		labels = host.split(".")
+		if labels[0] and max(map(len, labels)) <= MAX_LABEL_LENGTH:
+			return host
+		return None
+	try:
+		return host.encode("idna").decode("ascii")
+	except UnicodeError:
+		return None
+
+
+def target_host(url: str) -> Optional[str]:
+	"""Normalized host of a URL, None when it has none."""
+	try:
+		return normalize_host(urlsplit(url).hostname)
+	except ValueError:
+		return None
+
+
+def reverse_host(host: str) -> str:
+	"""Reverse the labels of a host: `www.example.com` -> `com.example.www`"""
+	return ".".join(reversed(host.split(".")))
+
+
+def reversed_target_host(url: str) -> Optional[str]:
+	"""Value of the reversed_host column for a target URL."""
+	host = target_host(url)
+	return reverse_host(host) if host else None
+
+
+def is_in_domain(reversed_host: Optional[str], reversed_domain: str) -> bool:
+	"""Whether a reversed host is the reversed domain or one under it."""
+	return bool(reversed_host) and (
+		reversed_host == reversed_domain
+		or reversed_host.startswith(reversed_domain + ".")
+	)
+
+
+def split_target(url: str) -> tuple[str, str]:
+	"""
+	Split a URL into its origin and the rest, verbatim.
+
+	`https://Example.com:8080/a?b#c` -> (`https://Example.com:8080`,
+	`/a?b#c`). Nothing is normalized, so the two parts always join back
+	into the exact URL.
+
+	Returns:
+		Origin (scheme and authority, "" if the URL has none) and rest
+	"""
+	start = url.find("://")
+	if start < 0:
+		return "", url
+	end = start + 3
+	while end < len(url) and url[end] not in "/?#":
+		end += 1
+	return url[:end], url[end:]
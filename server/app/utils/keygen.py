@@ -1,9 +1,22 @@
+import re
 import secrets
 import string
+from typing import Iterator
 
 from sqlalchemy.orm import Session
 
 from app.api import crud
+from app.core.keyindex import KEY_INDEX
+from app.core.metrics import KEYGEN_RETRIES
+from app.schemas.url import (
+	CUSTOM_KEY_MAX_LENGTH,
+	CUSTOM_KEY_MIN_LENGTH,
+	CUSTOM_KEY_PATTERN,
+	RESERVED_KEYS,
+)
+
+# Candidates checked (in one batch) per suggestion request
+MAX_SUGGESTION_CANDIDATES = 50
 
 
 def create_random_key(length: int = 5) -> str:
@@ -12,8 +25,18 @@ def create_random_key(length: int = 5) -> str:
 
 
 def create_unique_random_key(db: Session) -> str:
+	"""
+	Generate a random key that is not in use, archived keys included.
+
+	Args:
+		db: Database session
+
+	Returns:
+		Available key (see is_key_available)
+	"""
 	key = create_random_key()
-	while crud.get_db_url_by_key(db, key):
+	while not is_key_available(db, key):
+		KEYGEN_RETRIES.inc()
 		key = create_random_key()
 	return key
 
@@ -23,7 +46,10 @@ def is_key_available(db: Session, key: str) -> bool:
 	Check if a custom key is available (not already in use).
 
 	This checks if the key exists in the database regardless of is_active
-	status, since the key column has a UNIQUE constraint.
+	status, since the key column has a UNIQUE constraint. Once the key
+	index is built the database is not queried: a key it doesn't know may
+	still have been taken by another worker, which the UNIQUE constraint
+	catches on insert (see crud.create_db_url).
 
 	Args:
 		db: Database session
@@ -32,4 +58,81 @@ def is_key_available(db: Session, key: str) -> bool:
 	Returns:
 		True if available, False if already taken
 	"""
+	if KEY_INDEX.ready:
+		return key not in KEY_INDEX
 	return not crud.key_exists_in_db(db, key)
+
+
+def is_valid_custom_key(key: str) -> bool:
+	"""Check a key against the URLBase custom_key rules."""
+	return (
+		CUSTOM_KEY_MIN_LENGTH <= len(key) <= CUSTOM_KEY_MAX_LENGTH
+		and re.fullmatch(CUSTOM_KEY_PATTERN, key) is not None
+		and key.lower() not in RESERVED_KEYS
+	)
+
+
+def key_candidates(key: str) -> Iterator[str]:
+	"""
+	Generate keys close to `key`, nearest first.
+
+	Other characters are replaced by hyphens first. Then come the key with
+	other separators and in lowercase, then numbered keys: "promo" gives
+	promo-2, promo2, promo-3...; a key ending in a number continues it
+	("promo-2" gives promo-3, promo-4...). Numbered keys are truncated to
+	fit the length limit. Candidates may repeat or break the custom key
+	rules; callers filter them.
+
+	Args:
+		key: Wanted key, valid or not
+
+	Yields:
+		Candidate keys
+	"""
+	key = re.sub(r"[^a-zA-Z0-9_-]+", "-", key).strip("-")
+	yield key
+	for old, new in (("_", "-"), ("-", "_"), ("-", ""), ("_", "")):
+		if old in key:
+			yield key.replace(old, new)
+	yield key.lower()
+
+	stem = key.rstrip(string.digits)
+	if stem and stem != key:
+		first = int(key[len(stem) :]) + 1
+		separators = ("",)
+	else:
+		stem = key
+		first = 2
+		separators = ("_" if "_" in key and "-" not in key else "-", "")
+	for number in range(first, first + MAX_SUGGESTION_CANDIDATES):
+		for separator in separators:
+			suffix = f"{separator}{number}"
+			yield stem[: CUSTOM_KEY_MAX_LENGTH - len(suffix)] + suffix
+
+
+def suggest_keys(db: Session, key: str, count: int) -> list[str]:
+	"""
+	Suggest available custom keys close to a taken (or invalid) one.
+
+	Candidates (see key_candidates) are checked all at once, against the
+	key index when it is built, or else with a single query.
+
+	Args:
+		db: Database session
+		key: Wanted key
+		count: Maximum number of suggestions
+
+	Returns:
+		Up to `count` available keys, nearest first
+	"""
+	candidates = {}
+	for candidate in key_candidates(key):
+		if candidate != key and is_valid_custom_key(candidate):
+			candidates[candidate] = None
+			if len(candidates) == MAX_SUGGESTION_CANDIDATES:
+				break
+	if KEY_INDEX.ready:
+		taken = {c for c in candidates if c in KEY_INDEX}
+	else:
+		taken = crud.get_taken_keys(db, list(candidates))
+	return [c for c in candidates if c not in taken][:count]
@@ -0,0 +1,106 @@
+"""
+Bulk takedown of every active link to a domain.
+
+Deactivates the links whose target host is the domain or one of its
+subdomains (`example.com` also takes down `www.example.com`, not
+`badexample.com`). Links are found through the indexed `reversed_host`
+column (see app/utils/hosts.py) and deactivated in chunks, each its own
+transaction, so a huge takedown neither holds long locks nor loses its
+progress when interrupted: running it again finishes the job.
+
+Deactivated keys are evicted from the redirect cache as each chunk commits.
+
+Usage:
+	python -m app.utils.takedown DOMAIN [--batch-size N]
+"""
+
+import argparse
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.api import crud
+from app.core.cache import REDIRECT_CACHE
+from app.core.config import get_settings
+from app.core.database import SessionLocal, get_engine
+from app.utils import hosts
+
+logger = logging.getLogger(__name__)
+
+
+def parse_domain(domain: str) -> str:
+	"""
+	Normalize a domain to take down, e.g. `*.Example.com` -> `example.com`.
+
+	Raises:
+		ValueError: Not a domain name
+	"""
+	host = hosts.normalize_host(domain.strip().removeprefix("*."))
+	if host is None:
+		raise ValueError(f"'{domain}' is not a valid domain")
+	return host
+
+
+def take_down_domain(
+	db: Session,
+	domain: str,
+	batch_size: int,
+	progress: Optional[Callable[[int], None]] = None,
+) -> int:
+	"""
+	Deactivate every active link to `domain` and its subdomains.
+
+	Args:
+		db: Database session
+		domain: Domain name (see parse_domain)
+		batch_size: Links deactivated per transaction
+		progress: Called with the running total after each chunk
+
+	Returns:
+		Number of links deactivated
+
+	Raises:
+		ValueError: Not a domain name
+	"""
+	host = parse_domain(domain)
+	reversed_domain = hosts.reverse_host(host)
+	deactivated = 0
+	while keys := crud.deactivate_urls_by_domain_chunk(
+		db, reversed_domain, limit=batch_size
+	):
+		for key in keys:
+			REDIRECT_CACHE.invalidate(key)
+		deactivated += len(keys)
+		logger.info("Takedown of %s: %d links deactivated", host, deactivated)
+		if progress:
+			progress(deactivated)
+	return deactivated
+
+
+def main(argv: Optional[list[str]] = None):
+	settings = get_settings()
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument("domain")
+	parser.add_argument(
+		"--batch-size", type=int, default=settings.takedown_batch_size
+	)
+	args = parser.parse_args(argv)
+
+	db = SessionLocal(bind=get_engine())
+	try:
+		deactivated = take_down_domain(
+			db,
+			args.domain,
+			batch_size=args.batch_size,
+			progress=lambda total: print(f"{total} links deactivated..."),
+		)
+	except ValueError as error:
+		parser.error(str(error))
+	finally:
+		db.close()
+	print(f"Took down {deactivated} links to {args.domain}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,6 @@
+"""
+Performance tooling for the URL shortener.
+
+Run the microbenchmark suite with `python -m benchmarks` (see
+benchmarks/suite.py for options).
+"""
@@ -0,0 +1,157 @@
+"""
+Memory and lookup speed of the domain blocklist (app/core/blocklist.py).
+
+For every size, a blocklist file of that many random domains is generated
+and loaded, then URLs are checked against it:
+
+	blocklist.load[size=N]           loading the file
+	blocklist.check[hit,size=N]      a subdomain of a blocked domain
+	blocklist.check[miss,size=N]     a host with 4 labels, none blocked
+
+Memory per domain is reported next to the timings, under `memory`.
+
+Usage:
+	python -m benchmarks.blocklist [--sizes 100000,1000000]
+		[--iterations N] [--rounds N] [--output blocklist-results.json]
+"""
+
+import argparse
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.core.blocklist import Blocklist
+from benchmarks.harness import (
+	environment,
+	format_table,
+	measure,
+	summarize,
+	write_results,
+)
+
+TLDS = ("com", "net", "org", "info", "xyz", "co.uk", "com.br")
+
+
+def random_domain(rng: random.Random) -> str:
+	"""Random registrable domain, like the entries of phishing feeds."""
+	length = rng.randint(5, 15)
+	name = "".join(rng.choices(string.ascii_lowercase + "-", k=length))
+	return f"x{name}.{rng.choice(TLDS)}"
+
+
+def write_blocklist(path: Path, domains: list[str]):
+	"""Write domains in the blocklist file format, with a header comment."""
+	with open(path, "w") as file:
+		file.write("# Generated by benchmarks.blocklist\n")
+		file.writelines(f"{domain}\n" for domain in domains)
+
+
+def bench_size(
+	directory: Path, size: int, iterations: int, rounds: int, seed: int = 0
+) -> tuple[dict, dict]:
+	"""
+	Benchmark a blocklist of `size` domains.
+
+	Returns:
+		Benchmarks (name to summary) and memory figures
+	"""
+	rng = random.Random(seed)
+	domains = [random_domain(rng) for _ in range(size)]
+	path = directory / f"blocklist-{size}.txt"
+	write_blocklist(path, domains)
+
+	blocklist = Blocklist()
+	blocklist.configure(str(path), reload_interval=30.0)
+	load_times = []
+	for _ in range(max(rounds // 2, 1)):
+		start = time.perf_counter()
+		blocklist.load()
+		load_times.append(time.perf_counter() - start)
+
+	hits = [f"https://login.{domain}/verify" for domain in domains[:1000]]
+	misses = [
+		f"https://www.a{number}.example.com/page" for number in range(1000)
+	]
+	suffix = f"size={size}"
+	benchmarks = {
+		f"blocklist.load[{suffix}]": summarize(load_times),
+		f"blocklist.check[hit,{suffix}]": measure(
+			lambda: blocklist.blocked_domain(rng.choice(hits)),
+			iterations,
+			rounds,
+		),
+		f"blocklist.check[miss,{suffix}]": measure(
+			lambda: blocklist.blocked_domain(rng.choice(misses)),
+			iterations,
+			rounds,
+		),
+	}
+	memory = {
+		"domains": len(blocklist),
+		"bytes": blocklist.memory_bytes(),
+		"bytes_per_domain": blocklist.memory_bytes() / max(len(blocklist), 1),
+	}
+	return benchmarks, memory
+
+
+def run_blocklist(sizes: list[int], iterations: int, rounds: int) -> dict:
+	"""
+	Benchmark every blocklist size.
+
+	Returns:
+		Dict with `environment`, `parameters`, `benchmarks` and `memory`
+		(per size)
+	"""
+	benchmarks = {}
+	memory = {}
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		for size in sizes:
+			results, memory[str(size)] = bench_size(
+				Path(tmp_dir), size, iterations, rounds
+			)
+			benchmarks.update(results)
+	return {
+		"environment": environment(),
+		"parameters": {
+			"sizes": sizes,
+			"iterations": iterations,
+			"rounds": rounds,
+		},
+		"benchmarks": benchmarks,
+		"memory": memory,
+	}
+
+
+def main(argv: Optional[list[str]] = None):
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument(
+		"--sizes",
+		default="100000,1000000",
+		help="Comma separated blocklist sizes",
+	)
+	parser.add_argument("--iterations", type=int, default=10000)
+	parser.add_argument("--rounds", type=int, default=7)
+	parser.add_argument("--output", default="blocklist-results.json")
+	args = parser.parse_args(argv)
+
+	results = run_blocklist(
+		[int(size) for size in args.sizes.split(",")],
+		iterations=args.iterations,
+		rounds=args.rounds,
+	)
+
+	write_results(Path(args.output), results)
+	print(format_table(results["benchmarks"]))
+	for size, figures in results["memory"].items():
+		print(
+			f"{size} domains: {figures['bytes'] / 2**20:.1f} MiB, "
+			f"{figures['bytes_per_domain']:.1f} bytes per domain"
+		)
+	print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
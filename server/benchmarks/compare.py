@@ -0,0 +1,187 @@
+"""
+Benchmark regression gate.
+
+Compares benchmark results (see benchmarks/suite.py) against a baseline.
+Each benchmark carries one sample per round; samples of several result
+files for the same commit are pooled, so running the suite a few times
+before comparing smooths out machine noise.
+
+For every benchmark the change is the ratio of current to baseline median,
+with a 95% bootstrap confidence interval. A gated benchmark fails the gate
+when it got slower by more than --threshold AND the whole interval lies
+above 1, i.e. the slowdown is not explained by noise. A gate matching
+no benchmark present in both the baseline and the current results fails
+too, so a renamed or dropped benchmark can't silently disable its gate.
+
+Usage:
+	python -m benchmarks.compare benchmarks/baseline.json run1.json
+		[run2.json ...] [--threshold 0.10] [--gate crud.create_db_url]
+
+Exits with status 1 when a gated benchmark regressed or is missing.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+from pathlib import Path
+from typing import Optional
+
+# Benchmarks on the redirect, create and peek paths (prefix match)
+DEFAULT_GATES = (
+	"crud.get_redirect_target",
+	"crud.increment_db_clicks",
+	"crud.create_db_url",
+	"keygen.create_unique_random_key",
+	"crud.get_db_url_for_peek",
+)
+BOOTSTRAP_RESAMPLES = 2000
+
+
+def load_samples(paths: list[Path]) -> dict[str, list[float]]:
+	"""Pool the per-round samples of every benchmark over result files."""
+	pooled = {}
+	for path in paths:
+		results = json.loads(path.read_text())
+		for name, summary in results["benchmarks"].items():
+			pooled.setdefault(name, []).extend(summary["samples"])
+	return pooled
+
+
+def bootstrap_ratio_interval(
+	baseline: list[float],
+	current: list[float],
+	resamples: int = BOOTSTRAP_RESAMPLES,
+	seed: int = 0,
+) -> tuple[float, float]:
+	"""
+	95% bootstrap confidence interval of median(current) / median(baseline).
+
+	A fixed seed keeps the gate deterministic for identical inputs.
+	"""
+	rng = random.Random(seed)
+	ratios = sorted(
+		statistics.median(rng.choices(current, k=len(current)))
+		/ statistics.median(rng.choices(baseline, k=len(baseline)))
+		for _ in range(resamples)
+	)
+	return ratios[int(0.025 * resamples)], ratios[int(0.975 * resamples) - 1]
+
+
+def classify(ratio: float, low: float, high: float, threshold: float) -> str:
+	if ratio > 1 + threshold and low > 1:
+		return "regression"
+	if ratio < 1 - threshold and high < 1:
+		return "improvement"
+	return "ok"
+
+
+def is_gated(name: str, gates: tuple) -> bool:
+	return name.startswith(gates)
+
+
+def missing_gates(rows: list[dict], gates: tuple) -> list[str]:
+	"""Gates that no compared benchmark matches."""
+	return [
+		gate
+		for gate in gates
+		if not any(row["name"].startswith(gate) for row in rows)
+	]
+
+
+def compare(
+	baseline: dict[str, list[float]],
+	current: dict[str, list[float]],
+	threshold: float,
+	gates: tuple = DEFAULT_GATES,
+) -> list[dict]:
+	"""
+	Compare pooled samples benchmark by benchmark.
+
+	Returns:
+		One row per benchmark present in both inputs, sorted by change
+		(largest slowdown first)
+	"""
+	rows = []
+	for name in baseline.keys() & current.keys():
+		baseline_median = statistics.median(baseline[name])
+		current_median = statistics.median(current[name])
+		ratio = current_median / baseline_median
+		low, high = bootstrap_ratio_interval(baseline[name], current[name])
+		rows.append(
+			{
+				"name": name,
+				"baseline": baseline_median,
+				"current": current_median,
+				"ratio": ratio,
+				"low": low,
+				"high": high,
+				"status": classify(ratio, low, high, threshold),
+				"gated": is_gated(name, gates),
+			}
+		)
+	return sorted(rows, key=lambda row: row["ratio"], reverse=True)
+
+
+def format_report(rows: list[dict]) -> str:
+	width = max([len(row["name"]) for row in rows] + [9])
+	lines = [
+		f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  "
+		f"{'change':>8}  {'95% CI':>17}  status"
+	]
+	for row in rows:
+		status = row["status"] if row["gated"] else f"{row['status']} (info)"
+		lines.append(
+			f"{row['name']:<{width}}  {row['baseline'] * 1e6:>8.2f}us  "
+			f"{row['current'] * 1e6:>8.2f}us  {row['ratio'] - 1:>+8.1%}  "
+			f"[{row['low'] - 1:>+6.1%}, {row['high'] - 1:>+6.1%}]  {status}"
+		)
+	return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument("baseline", type=Path)
+	parser.add_argument("current", type=Path, nargs="+")
+	parser.add_argument(
+		"--threshold",
+		type=float,
+		default=0.10,
+		help="Relative slowdown tolerated before failing (default 10%%)",
+	)
+	parser.add_argument(
+		"--gate",
+		action="append",
+		help="Benchmark name prefix to gate on (repeatable)",
+	)
+	args = parser.parse_args(argv)
+
+	gates = tuple(args.gate) if args.gate else DEFAULT_GATES
+	rows = compare(
+		load_samples([args.baseline]),
+		load_samples(args.current),
+		threshold=args.threshold,
+		gates=gates,
+	)
+	print(format_report(rows))
+
+	status = 0
+	if missing := missing_gates(rows, gates):
+		print("\nGates without benchmarks on both sides: ", end="")
+		print(", ".join(missing))
+		status = 1
+	regressions = [
+		row["name"]
+		for row in rows
+		if row["gated"] and row["status"] == "regression"
+	]
+	if regressions:
+		print(f"\nRegressions beyond {args.threshold:.0%}: ", end="")
+		print(", ".join(regressions))
+		status = 1
+	return status
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Timing helpers shared by the benchmark tools.
+
+Every benchmark runs `rounds` rounds of `iterations` calls and keeps the
+mean per-call time of each round as one sample, so results carry enough
+data for later statistical comparison (see benchmarks/compare.py).
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+
+def summarize(samples: list[float]) -> dict:
+	"""
+	Summarize per-call timings (in seconds).
+
+	Args:
+		samples: Mean seconds per call, one value per round
+
+	Returns:
+		Dict with the raw samples plus median, mean, stdev, min, max and
+		operations per second (based on the median)
+	"""
+	median = statistics.median(samples)
+	return {
+		"samples": samples,
+		"median": median,
+		"mean": statistics.fmean(samples),
+		"stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+		"min": min(samples),
+		"max": max(samples),
+		"ops_per_sec": 1 / median if median else None,
+	}
+
+
+def measure(
+	func: Callable[[], object],
+	iterations: int,
+	rounds: int,
+	warmup: int = 1,
+) -> dict:
+	"""
+	Time a callable.
+
+	Args:
+		func: Operation to time, called without arguments
+		iterations: Calls per round
+		rounds: Number of rounds (samples)
+		warmup: Untimed calls made first to fill caches and pools
+
+	Returns:
+		Summary as returned by `summarize`
+	"""
+	for _ in range(warmup):
+		func()
+
+	samples = []
+	for _ in range(rounds):
+		start = time.perf_counter()
+		for _ in range(iterations):
+			func()
+		samples.append((time.perf_counter() - start) / iterations)
+	return summarize(samples)
+
+
+def git_commit() -> Optional[str]:
+	"""Return the current git commit, or None outside a git checkout."""
+	try:
+		return subprocess.run(
+			["git", "rev-parse", "HEAD"],
+			capture_output=True,
+			check=True,
+			text=True,
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def environment() -> dict:
+	"""Describe where the results were measured."""
+	return {
+		"commit": git_commit(),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"timestamp": datetime.now(UTC).isoformat(),
+	}
+
+
+def write_results(path: Path, results: dict):
+	path.parent.mkdir(parents=True, exist_ok=True)
+	path.write_text(json.dumps(results, indent=2) + "\n")
+
+
+def format_table(benchmarks: dict) -> str:
+	"""Render benchmark summaries as a fixed-width text table."""
+	width = max([len(name) for name in benchmarks] + [9])
+	lines = [f"{'benchmark':<{width}}  {'median':>12}  {'ops/s':>12}"]
+	for name, summary in benchmarks.items():
+		lines.append(
+			f"{name:<{width}}  {summary['median'] * 1e6:>10.2f}us"
+			f"  {summary['ops_per_sec'] or 0:>12.0f}"
+		)
+	return "\n".join(lines)
@@ -0,0 +1,338 @@
+"""
+Load generator for the URL shortener HTTP API.
+
+Starts the app with the production launcher (app/server.py) on a fresh
+SQLite database (or targets an already running server with --url), seeds
+it with short URLs and then runs a closed loop of concurrent clients for a
+fixed duration. Every client picks an operation from a weighted mix:
+
+	create    POST /url
+	redirect  GET /{key}            (keys drawn from a Zipf distribution)
+	peek      GET /peek/{key}       (same distribution)
+	peek_batch  POST /peek/batch    (--batch-size keys, same distribution)
+	admin     GET /admin/{secret}
+	scanner   GET /{random}         (404 noise from link scanners)
+
+Throughput (requests and keys looked up per second), latency percentiles
+and error rates per operation are printed and saved as JSON for comparison
+between commits. `--mix peek=50,peek_batch=50` compares batched peeks with
+single ones.
+
+Usage:
+	python -m benchmarks.loadtest [--duration 30] [--concurrency 32]
+		[--mix redirect=80,peek=5,create=5,admin=2,scanner=8]
+		[--keys 10000] [--zipf 1.1] [--batch-size 100] [--workers 1]
+		[--output load.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from sqlalchemy import create_engine
+
+from app import models  # noqa: F401 - registers the tables on Base
+from app.core.database import Base
+from app.core.redirects import REDIRECT_STATUS_CODES
+from benchmarks.harness import environment, write_results
+
+DEFAULT_MIX = "redirect=80,peek=5,create=5,admin=2,scanner=8"
+# Redirects answer with the configured or per-link status code
+EXPECTED_STATUS = {
+	"create": (201,),
+	"redirect": REDIRECT_STATUS_CODES,
+	"peek": (200,),
+	"peek_batch": (200,),
+	"admin": (200,),
+	"scanner": (404,),
+}
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+	"""Parse `op=weight,...` into a dict, rejecting unknown operations."""
+	weights = {}
+	for item in mix.split(","):
+		operation, weight = item.split("=")
+		if operation not in EXPECTED_STATUS:
+			raise ValueError(f"Unknown operation '{operation}'")
+		weights[operation] = float(weight)
+	return weights
+
+
+@dataclass
+class LoadProfile:
+	"""What the simulated clients do and for how long"""
+
+	mix: dict[str, float]
+	duration: float = 30.0
+	concurrency: int = 32
+	keys: int = 10_000
+	zipf: float = 1.1
+	batch_size: int = 100
+
+
+class ZipfKeys:
+	"""Draws keys with probability proportional to 1 / rank ** exponent."""
+
+	def __init__(self, keys: list, exponent: float):
+		self.keys = keys
+		weights = (1 / rank**exponent for rank in range(1, len(keys) + 1))
+		self.cumulative = list(itertools.accumulate(weights))
+
+	def choice(self):
+		point = random.random() * self.cumulative[-1]
+		return self.keys[bisect_left(self.cumulative, point)]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+	"""Nearest-rank percentile of an already sorted list."""
+	if not sorted_values:
+		return 0.0
+	rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+	return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize_operation(
+	latencies: list[float], errors: int, elapsed: float, keys: int = 1
+):
+	"""Summary of one operation whose requests each look up `keys` keys."""
+	latencies = sorted(latencies)
+	throughput = len(latencies) / elapsed if elapsed else 0.0
+	summary = {
+		"requests": len(latencies),
+		"errors": errors,
+		"error_rate": errors / len(latencies) if latencies else 0.0,
+		"throughput": throughput,
+		"key_throughput": throughput * keys,
+		"max": latencies[-1] if latencies else 0.0,
+	}
+	for pct in PERCENTILES:
+		summary[f"p{pct:g}"] = percentile(latencies, pct)
+	return summary
+
+
+async def seed(client: httpx.AsyncClient, count: int) -> list[tuple]:
+	"""Create `count` short URLs, returning (key, secret_key) pairs."""
+
+	async def create(i):
+		response = await client.post(
+			"/url", json={"target_url": f"https://example.com/seed/{i}"}
+		)
+		if response.status_code != httpx.codes.CREATED:
+			raise RuntimeError(
+				f"Seeding failed: POST /url answered {response.status_code}: "
+				f"{response.text[:200]}"
+			)
+		data = response.json()
+		key = data["url"].rsplit("/", 1)[-1]
+		secret_key = data["admin_url"].rsplit("/", 1)[-1]
+		return key, secret_key
+
+	pairs = []
+	for start in range(0, count, 100):
+		batch = range(start, min(start + 100, count))
+		pairs.extend(await asyncio.gather(*(create(i) for i in batch)))
+	return pairs
+
+
+async def run_load(client: httpx.AsyncClient, profile: LoadProfile) -> dict:
+	"""
+	Run the load test against `client`.
+
+	Returns:
+		Per-operation summaries plus a `total` entry
+	"""
+	pairs = await seed(client, profile.keys)
+	popularity = ZipfKeys(pairs, profile.zipf)
+	operations = list(profile.mix)
+	cumulative = list(itertools.accumulate(profile.mix.values()))
+	latencies = {operation: [] for operation in operations}
+	errors = dict.fromkeys(operations, 0)
+
+	def request_for(operation):
+		if operation == "create":
+			target = f"https://example.com/load/{random.random()}"
+			return "POST", "/url", {"target_url": target}
+		if operation == "scanner":
+			return "GET", f"/scan{random.getrandbits(40):x}", None
+		if operation == "peek_batch":
+			keys = [popularity.choice()[0] for _ in range(profile.batch_size)]
+			return "POST", "/peek/batch", {"keys": keys}
+		key, secret_key = popularity.choice()
+		path = {
+			"redirect": f"/{key}",
+			"peek": f"/peek/{key}",
+			"admin": f"/admin/{secret_key}",
+		}[operation]
+		return "GET", path, None
+
+	async def user(deadline):
+		while time.perf_counter() < deadline:
+			point = random.random() * cumulative[-1]
+			operation = operations[bisect_left(cumulative, point)]
+			method, path, body = request_for(operation)
+			start = time.perf_counter()
+			try:
+				response = await client.request(method, path, json=body)
+				failed = response.status_code not in EXPECTED_STATUS[operation]
+			except httpx.HTTPError:
+				failed = True
+			latencies[operation].append(time.perf_counter() - start)
+			errors[operation] += failed
+
+	start = time.perf_counter()
+	deadline = start + profile.duration
+	await asyncio.gather(*(user(deadline) for _ in range(profile.concurrency)))
+	elapsed = time.perf_counter() - start
+
+	results = {
+		operation: summarize_operation(
+			latencies[operation],
+			errors[operation],
+			elapsed,
+			keys=profile.batch_size if operation == "peek_batch" else 1,
+		)
+		for operation in operations
+	}
+	results["total"] = summarize_operation(
+		[value for values in latencies.values() for value in values],
+		sum(errors.values()),
+		elapsed,
+	)
+	results["total"]["key_throughput"] = sum(
+		results[operation]["key_throughput"] for operation in operations
+	)
+	return results
+
+
+def free_port() -> int:
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+def start_server(db_url: str, workers: int) -> tuple[subprocess.Popen, str]:
+	"""
+	Start the production launcher on a free port and wait until it answers.
+
+	Returns:
+		Tuple of (process, base url)
+	"""
+	engine = create_engine(db_url)
+	Base.metadata.create_all(bind=engine)
+	engine.dispose()
+
+	port = free_port()
+	base_url = f"http://127.0.0.1:{port}"
+	env = {**os.environ, "DB_URL": db_url, "BASE_URL": base_url}
+	process = subprocess.Popen(
+		[
+			sys.executable,
+			"-m",
+			"app.server",
+			"--host",
+			"127.0.0.1",
+			"--port",
+			str(port),
+			"--workers",
+			str(workers),
+			"--log-level",
+			"warning",
+		],
+		env=env,
+	)
+	for _ in range(100):
+		try:
+			response = httpx.get(f"{base_url}/health/live")
+			if response.status_code == httpx.codes.OK:
+				return process, base_url
+		except httpx.HTTPError:
+			pass
+		time.sleep(0.1)
+	process.terminate()
+	raise RuntimeError("The server did not start within 10 seconds")
+
+
+def format_report(results: dict) -> str:
+	lines = [
+		f"{'operation':<10} {'req/s':>9} {'keys/s':>9} {'p50 ms':>8} "
+		f"{'p99 ms':>8} {'p99.9 ms':>9} {'errors':>7}"
+	]
+	for operation, summary in results.items():
+		lines.append(
+			f"{operation:<10} {summary['throughput']:>9.1f} "
+			f"{summary['key_throughput']:>9.1f} "
+			f"{summary['p50'] * 1000:>8.2f} {summary['p99'] * 1000:>8.2f} "
+			f"{summary['p99.9'] * 1000:>9.2f} {summary['error_rate']:>7.2%}"
+		)
+	return "\n".join(lines)
+
+
+async def _run(base_url: str, profile: LoadProfile) -> dict:
+	limits = httpx.Limits(max_connections=profile.concurrency)
+	async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+		return await run_load(client, profile)
+
+
+def main(argv: Optional[list[str]] = None):
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument("--url", help="Target a running server instead")
+	parser.add_argument("--db-url", help="Defaults to a temporary SQLite db")
+	parser.add_argument("--workers", type=int, default=1)
+	parser.add_argument("--duration", type=float, default=30.0)
+	parser.add_argument("--concurrency", type=int, default=32)
+	parser.add_argument("--mix", default=DEFAULT_MIX)
+	parser.add_argument("--keys", type=int, default=10_000)
+	parser.add_argument("--zipf", type=float, default=1.1)
+	parser.add_argument("--batch-size", type=int, default=100)
+	parser.add_argument("--output", default="loadtest-results.json")
+	args = parser.parse_args(argv)
+	profile = LoadProfile(
+		mix=parse_mix(args.mix),
+		duration=args.duration,
+		concurrency=args.concurrency,
+		keys=args.keys,
+		zipf=args.zipf,
+		batch_size=args.batch_size,
+	)
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		process = None
+		base_url = args.url
+		if not base_url:
+			db_url = args.db_url or f"sqlite:///{tmp_dir}/load.db"
+			process, base_url = start_server(db_url, args.workers)
+		try:
+			results = asyncio.run(_run(base_url, profile))
+		finally:
+			if process:
+				process.terminate()
+				process.wait()
+
+	write_results(
+		Path(args.output),
+		{
+			"environment": environment(),
+			"parameters": {**asdict(profile), "workers": args.workers},
+			"operations": results,
+		},
+	)
+	print(format_report(results))
+	print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,133 @@
+"""
+Throughput scaling with the number of worker processes.
+
+Runs the load test (benchmarks/loadtest.py) against the production
+launcher (app/server.py) once per worker count and reports total
+throughput, p99 latency and the speedup over the first worker count.
+Efficiency is speedup divided by the worker ratio: close to 1 means the
+extra workers are fully used, lower values point at a shared bottleneck
+(CPU cores, database, locks).
+
+Every worker count gets a fresh SQLite database unless --db-url is given.
+SQLite serializes writes, so use a scratch PostgreSQL database for numbers
+that say something about production.
+
+Usage:
+	python -m benchmarks.scaling [--workers 1,2,4,8] [--duration 15]
+		[--concurrency 64] [--db-url URL] [--output scaling.json]
+"""
+
+import argparse
+import asyncio
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.harness import environment, write_results
+from benchmarks.loadtest import (
+	DEFAULT_MIX,
+	LoadProfile,
+	_run,
+	parse_mix,
+	start_server,
+)
+
+
+def measure_workers(db_url: str, workers: int, profile: LoadProfile) -> dict:
+	"""Load test a launcher running `workers` workers."""
+	process, base_url = start_server(db_url, workers)
+	try:
+		return asyncio.run(_run(base_url, profile))["total"]
+	finally:
+		process.terminate()
+		process.wait()
+
+
+def scaling_table(totals: dict[int, dict]) -> list[dict]:
+	"""
+	Compare throughput across worker counts.
+
+	Args:
+		totals: Worker count to the load test's `total` summary
+
+	Returns:
+		One row per worker count with throughput, p99, speedup and
+		efficiency relative to the smallest worker count
+	"""
+	base_workers = min(totals)
+	base_throughput = totals[base_workers]["throughput"]
+	rows = []
+	for workers in sorted(totals):
+		total = totals[workers]
+		speedup = (
+			total["throughput"] / base_throughput if base_throughput else 0
+		)
+		rows.append(
+			{
+				"workers": workers,
+				"throughput": total["throughput"],
+				"p99": total["p99"],
+				"error_rate": total["error_rate"],
+				"speedup": speedup,
+				"efficiency": speedup / (workers / base_workers),
+			}
+		)
+	return rows
+
+
+def format_report(rows: list[dict]) -> str:
+	lines = [
+		f"{'workers':>7} {'req/s':>9} {'p99 ms':>8} {'speedup':>8} "
+		f"{'efficiency':>10} {'errors':>7}"
+	]
+	for row in rows:
+		lines.append(
+			f"{row['workers']:>7} {row['throughput']:>9.1f} "
+			f"{row['p99'] * 1000:>8.2f} {row['speedup']:>7.2f}x "
+			f"{row['efficiency']:>10.0%} {row['error_rate']:>7.2%}"
+		)
+	return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None):
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument("--workers", default="1,2,4,8")
+	parser.add_argument("--db-url", help="Defaults to temporary SQLite dbs")
+	parser.add_argument("--duration", type=float, default=15.0)
+	parser.add_argument("--concurrency", type=int, default=64)
+	parser.add_argument("--mix", default=DEFAULT_MIX)
+	parser.add_argument("--keys", type=int, default=10_000)
+	parser.add_argument("--zipf", type=float, default=1.1)
+	parser.add_argument("--output", default="scaling-results.json")
+	args = parser.parse_args(argv)
+	profile = LoadProfile(
+		mix=parse_mix(args.mix),
+		duration=args.duration,
+		concurrency=args.concurrency,
+		keys=args.keys,
+		zipf=args.zipf,
+	)
+	worker_counts = [int(workers) for workers in args.workers.split(",")]
+
+	totals = {}
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		for workers in worker_counts:
+			db_url = args.db_url or f"sqlite:///{tmp_dir}/scale-{workers}.db"
+			totals[workers] = measure_workers(db_url, workers, profile)
+
+	rows = scaling_table(totals)
+	write_results(
+		Path(args.output),
+		{
+			"environment": environment(),
+			"parameters": {**asdict(profile), "workers": worker_counts},
+			"scaling": rows,
+		},
+	)
+	print(format_report(rows))
+	print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,155 @@
+"""
+Cold start measurements: import time and time to first request.
+
+Every sample runs in a fresh interpreter, so module caches are cold the way
+they are when an autoscaler starts a new worker:
+
+	startup.import[MODULE]  import time of MODULE, for each --module
+	startup.first_request   from spawning uvicorn to a 200 /health/ready
+
+Import times exclude the interpreter's own startup.
+
+Results use the benchmark JSON format, so they can be compared against a
+baseline with benchmarks.compare.
+
+Usage:
+	python -m benchmarks.startup [--runs 5] [--module app.main ...]
+		[--db-url URL] [--output startup-results.json]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from sqlalchemy import create_engine
+
+from app import models  # noqa: F401 - registers the tables on Base
+from app.core.database import Base
+from benchmarks.harness import (
+	environment,
+	format_table,
+	summarize,
+	write_results,
+)
+from benchmarks.loadtest import free_port
+
+DEFAULT_MODULES = ("app.core.config", "app.models", "app.main")
+IMPORT_SNIPPET = (
+	"import sys, time\n"
+	"start = time.perf_counter()\n"
+	"import {module}\n"
+	"sys.stderr.write(f'{{time.perf_counter() - start}}\\n')\n"
+)
+FIRST_REQUEST_TIMEOUT = 30.0
+
+
+def time_import(module: str) -> float:
+	"""Seconds a fresh interpreter spends importing `module`."""
+	result = subprocess.run(
+		[sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+		capture_output=True,
+		check=True,
+		text=True,
+	)
+	return float(result.stderr.strip().splitlines()[-1])
+
+
+def time_first_request(db_url: str) -> float:
+	"""Seconds from spawning uvicorn until /health/ready answers 200."""
+	port = free_port()
+	base_url = f"http://127.0.0.1:{port}"
+	env = {**os.environ, "DB_URL": db_url, "BASE_URL": base_url}
+	start = time.perf_counter()
+	process = subprocess.Popen(
+		[
+			sys.executable,
+			"-m",
+			"uvicorn",
+			"app.main:app",
+			"--port",
+			str(port),
+			"--log-level",
+			"warning",
+		],
+		env=env,
+	)
+	try:
+		while time.perf_counter() - start < FIRST_REQUEST_TIMEOUT:
+			try:
+				response = httpx.get(f"{base_url}/health/ready")
+				if response.status_code == httpx.codes.OK:
+					return time.perf_counter() - start
+			except httpx.HTTPError:
+				pass
+			time.sleep(0.005)
+		raise RuntimeError("uvicorn did not answer within the timeout")
+	finally:
+		process.terminate()
+		process.wait()
+
+
+def run_startup(
+	db_url: str, modules: list[str], runs: int, server: bool = True
+) -> dict:
+	"""
+	Measure import and first request times.
+
+	Returns:
+		Dict with `environment`, `parameters` and `benchmarks`
+	"""
+	benchmarks = {
+		f"startup.import[{module}]": summarize(
+			[time_import(module) for _ in range(runs)]
+		)
+		for module in modules
+	}
+	if server:
+		engine = create_engine(db_url)
+		Base.metadata.create_all(bind=engine)
+		engine.dispose()
+		benchmarks["startup.first_request"] = summarize(
+			[time_first_request(db_url) for _ in range(runs)]
+		)
+	return {
+		"environment": environment(),
+		"parameters": {"modules": modules, "runs": runs},
+		"benchmarks": benchmarks,
+	}
+
+
+def main(argv: Optional[list[str]] = None):
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument("--runs", type=int, default=5)
+	parser.add_argument(
+		"--module",
+		action="append",
+		help="Module to time the import of (repeatable)",
+	)
+	parser.add_argument("--db-url", help="Defaults to a temporary SQLite db")
+	parser.add_argument(
+		"--no-server", action="store_true", help="Only measure imports"
+	)
+	parser.add_argument("--output", default="startup-results.json")
+	args = parser.parse_args(argv)
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		results = run_startup(
+			args.db_url or f"sqlite:///{tmp_dir}/startup.db",
+			modules=args.module or list(DEFAULT_MODULES),
+			runs=args.runs,
+			server=not args.no_server,
+		)
+
+	write_results(Path(args.output), results)
+	print(format_table(results["benchmarks"]))
+	print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
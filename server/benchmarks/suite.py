@@ -0,0 +1,233 @@
+"""
+Microbenchmarks for the keygen, crud and schema hot paths.
+
+Runs against any database SQLAlchemy can reach; by default a throwaway
+SQLite file. Point --db-url at a scratch PostgreSQL database to measure
+PostgreSQL: the tables are created at the start and dropped at the end
+(unless --keep is given).
+
+Database benchmarks are repeated for every fill level (number of rows in
+`urls`), since index depth and key collisions depend on table size.
+
+Usage:
+	python -m benchmarks [--db-url URL] [--fill 0,10000,100000]
+		[--iterations N] [--rounds N] [--output results.json]
+"""
+
+import argparse
+import random
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import models, schemas
+from app.api import crud
+from app.api.deps import get_admin_info
+from app.core import security
+from app.core.database import Base, connect_args_for
+from app.core.hostcache import HOST_CACHE
+from app.core.keyindex import KeyIndex
+from app.core.ratelimit import RateLimiter
+from app.main import app
+from app.models.url import utc_now
+from app.utils import hosts, keygen
+from benchmarks.harness import (
+	environment,
+	format_table,
+	measure,
+	write_results,
+)
+
+FILL_BATCH_SIZE = 10_000
+TARGET_URL = "https://www.example.com/articles/2025/10/some-article-slug?ref=x"
+
+
+def create_bench_engine(db_url: str):
+	return create_engine(db_url, connect_args=connect_args_for(db_url))
+
+
+def fill_urls(db: Session, rows: int, keys: list[str]):
+	"""
+	Insert generated rows until `keys` holds `rows` keys.
+
+	Keys are random 5-character keys, like the ones keygen produces, so
+	fill levels also affect create_unique_random_key collisions. New keys
+	are appended to `keys`.
+	"""
+	taken = set(keys)
+	origin, target_path = hosts.split_target(TARGET_URL)
+	host_id = crud.get_host_id(db, origin)
+	while len(keys) < rows:
+		batch = []
+		batch_size = min(FILL_BATCH_SIZE, rows - len(keys))
+		while len(batch) < batch_size:
+			key = keygen.create_random_key()
+			if key in taken:
+				continue
+			taken.add(key)
+			batch.append(
+				{
+					"key": key,
+					"secret_key": f"{key}_{keygen.create_random_key(8)}",
+					"host_id": host_id,
+					"target_path": f"{target_path}&id={len(keys)}",
+					"is_active": True,
+					"clicks": 0,
+					"created_at": utc_now(),
+				}
+			)
+			keys.append(key)
+		db.execute(insert(models.URL), batch)
+		db.commit()
+
+
+def bench_pure(iterations: int, rounds: int) -> dict:
+	"""Benchmarks that don't touch the database."""
+	payload = {"target_url": TARGET_URL, "custom_key": "my-custom-key"}
+	limiter = RateLimiter(slots=1024)
+	limiter.configure(1024, {"redirect": (1e9, 1e9)})
+	clients = [f"203.0.113.{i}" for i in range(256)]
+	return {
+		"keygen.create_random_key": measure(
+			keygen.create_random_key, iterations, rounds
+		),
+		"schemas.URLBase.validate": measure(
+			lambda: schemas.URLBase.model_validate(payload), iterations, rounds
+		),
+		"ratelimit.acquire": measure(
+			lambda: limiter.acquire("redirect", random.choice(clients)),
+			iterations,
+			rounds,
+		),
+	}
+
+
+def bench_database(
+	db: Session, keys: list[str], fill: int, iterations: int, rounds: int
+) -> dict:
+	"""Benchmarks of crud and keygen functions at one fill level."""
+	suffix = f"[fill={fill}]"
+	sample_url = crud.create_db_url(db, schemas.URLBase(target_url=TARGET_URL))
+	existing = keys or [sample_url.key]
+	# Not stored when derived (secret_key_hmac)
+	secret_key = security.get_secret_key(sample_url)
+
+	def random_key():
+		return random.choice(existing)
+
+	def admin_info():
+		info = get_admin_info(sample_url, app)
+		return schemas.URLInfo.model_validate(info).model_dump_json()
+
+	key_index = KeyIndex()
+	key_index.build(crud.iter_all_keys(db))
+
+	operations = {
+		"keygen.create_unique_random_key": lambda: (
+			keygen.create_unique_random_key(db)
+		),
+		"crud.get_db_url_by_key": lambda: crud.get_db_url_by_key(
+			db, random_key()
+		),
+		"crud.get_redirect_target": lambda: crud.get_redirect_target(
+			db, random_key()
+		),
+		"crud.get_db_url_for_peek": lambda: crud.get_db_url_for_peek(
+			db, random_key()
+		),
+		"crud.key_exists_in_db": lambda: crud.key_exists_in_db(
+			db, random_key()
+		),
+		"keyindex.contains": lambda: random_key() in key_index,
+		"crud.get_db_url_by_secret_key": lambda: crud.get_db_url_by_secret_key(
+			db, secret_key
+		),
+		"crud.update_db_clicks": lambda: crud.update_db_clicks(db, sample_url),
+		"crud.increment_db_clicks": lambda: crud.increment_db_clicks(
+			db, sample_url.id
+		),
+		"deps.get_admin_info": admin_info,
+		"crud.create_db_url": lambda: crud.create_db_url(
+			db, schemas.URLBase(target_url=TARGET_URL)
+		),
+	}
+	return {
+		name + suffix: measure(func, iterations, rounds)
+		for name, func in operations.items()
+	}
+
+
+def run_suite(
+	db_url: str,
+	fill_levels: list[int],
+	iterations: int,
+	rounds: int,
+	keep: bool = False,
+) -> dict:
+	"""
+	Run every benchmark.
+
+	Returns:
+		Dict with `environment`, `parameters` and `benchmarks` (name to
+		summary, see benchmarks.harness.summarize)
+	"""
+	engine = create_bench_engine(db_url)
+	Base.metadata.create_all(bind=engine)
+	# Host ids are only valid for the database they were read from
+	HOST_CACHE.clear()
+	db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+	keys: list[str] = []
+	benchmarks = bench_pure(iterations, rounds)
+	try:
+		for fill in sorted(fill_levels):
+			fill_urls(db, fill, keys)
+			benchmarks.update(
+				bench_database(db, keys, fill, iterations, rounds)
+			)
+	finally:
+		db.close()
+		if not keep:
+			Base.metadata.drop_all(bind=engine)
+		engine.dispose()
+
+	return {
+		"environment": {**environment(), "dialect": engine.dialect.name},
+		"parameters": {
+			"fill_levels": fill_levels,
+			"iterations": iterations,
+			"rounds": rounds,
+		},
+		"benchmarks": benchmarks,
+	}
+
+
+def main(argv: Optional[list[str]] = None):
+	parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+	parser.add_argument("--db-url", help="Defaults to a temporary SQLite db")
+	parser.add_argument(
+		"--fill",
+		default="0,10000,100000",
+		help="Comma separated table sizes to benchmark at",
+	)
+	parser.add_argument("--iterations", type=int, default=200)
+	parser.add_argument("--rounds", type=int, default=7)
+	parser.add_argument("--output", default="benchmark-results.json")
+	parser.add_argument("--keep", action="store_true", help="Keep tables")
+	args = parser.parse_args(argv)
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		db_url = args.db_url or f"sqlite:///{tmp_dir}/bench.db"
+		results = run_suite(
+			db_url,
+			fill_levels=[int(fill) for fill in args.fill.split(",")],
+			iterations=args.iterations,
+			rounds=args.rounds,
+			keep=args.keep,
+		)
+
+	write_results(Path(args.output), results)
+	print(format_table(results["benchmarks"]))
+	print(f"Results written to {args.output}")
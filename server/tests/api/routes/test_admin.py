@@ -2,8 +2,12 @@
 Unit tests for GET /admin/{secret_key} endpoint
 """
 
+from unittest.mock import patch
+
 from fastapi import status
 
+from app.core.config import get_settings
+
 
 def test_admin_info_returns_all_required_fields(client):
 	"""Test that GET /admin/{secret_key} returns all required fields"""
@@ -135,3 +139,65 @@ def test_admin_info_admin_url_field_is_valid(client):
 
 	# The admin_url should contain the same secret_key
 	assert secret_key in admin_data["admin_url"]
+
+
+def test_admin_url_with_derived_secret_key(client, monkeypatch):
+	"""Test the admin flow when secret keys are derived via HMAC"""
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "server-secret")
+	create_response = client.post(
+		"/url", json={"target_url": "https://www.example.com/derived"}
+	)
+	admin_url = create_response.json()["admin_url"]
+	secret_key = admin_url.split("/")[-1]
+
+	response = client.get(f"/admin/{secret_key}")
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.json()["admin_url"] == admin_url
+
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "rotated")
+	response = client.get(f"/admin/{secret_key}")
+
+	assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_admin_info_answers_unchanged_url_with_304(client):
+	"""Test the ETag of admin info and conditional requests against it"""
+	create_response = client.post(
+		"/url", json={"target_url": "https://www.example.com/etag"}
+	)
+	data = create_response.json()
+	url_key = data["url"].split("/")[-1]
+	secret_key = data["admin_url"].split("/")[-1]
+	etag = client.get(f"/admin/{secret_key}").headers["etag"]
+
+	with patch("app.api.crud.get_db_url_by_secret_key") as mock_lookup:
+		response = client.get(
+			f"/admin/{secret_key}", headers={"If-None-Match": etag}
+		)
+
+	mock_lookup.assert_not_called()
+	assert response.status_code == status.HTTP_304_NOT_MODIFIED
+	assert response.headers["etag"] == etag
+
+	client.get(f"/{url_key}", follow_redirects=False)
+	response = client.get(
+		f"/admin/{secret_key}", headers={"If-None-Match": etag}
+	)
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.json()["clicks"] == 1
+
+
+def test_admin_if_none_match_requires_valid_secret(client):
+	"""Test that a matching ETag is no way around the secret key"""
+	create_response = client.post(
+		"/url", json={"target_url": "https://www.example.com/etag"}
+	)
+	url_key = create_response.json()["url"].split("/")[-1]
+
+	response = client.get(
+		f"/admin/{url_key}_WRONG", headers={"If-None-Match": "*"}
+	)
+
+	assert response.status_code == status.HTTP_404_NOT_FOUND
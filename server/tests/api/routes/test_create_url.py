@@ -4,6 +4,9 @@ Unit tests for POST /url endpoint
 
 from fastapi import status
 
+from app.core.blocklist import BLOCKLIST
+from app.core.metrics import BLOCKED_URLS
+
 
 def test_create_url_returns_all_required_fields(client):
 	"""Test that POST /url returns all required fields"""
@@ -110,3 +113,27 @@ def test_create_url_with_query_params(client):
 
 	assert response.status_code == status.HTTP_201_CREATED
 	assert response.json()["target_url"] == target_url
+
+
+def test_create_url_with_blocked_domain_returns_400(client, tmp_path):
+	"""Test that links to a blocklisted domain or subdomain are refused"""
+	path = tmp_path / "blocklist.txt"
+	path.write_text("evil.com\n")
+	BLOCKLIST.configure(str(path), reload_interval=30.0)
+	BLOCKLIST.load()
+	blocked = BLOCKED_URLS.values.get((), 0)
+
+	try:
+		response = client.post(
+			"/url", json={"target_url": "https://login.evil.com/verify"}
+		)
+		allowed = client.post(
+			"/url", json={"target_url": "https://notevil.com/"}
+		)
+	finally:
+		BLOCKLIST.configure("", reload_interval=30.0)
+
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+	assert response.json()["detail"] == "Links to 'evil.com' are not allowed"
+	assert BLOCKED_URLS.values[()] == blocked + 1
+	assert allowed.status_code == status.HTTP_201_CREATED
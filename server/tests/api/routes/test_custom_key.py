@@ -46,6 +46,13 @@ def test_create_url_with_custom_key_already_exists(client):
 	assert second_response.status_code == status.HTTP_409_CONFLICT
 	assert "already in use" in second_response.json()["detail"]
 	assert custom_key in second_response.json()["detail"]
+	assert second_response.json()["suggestions"] == [
+		"duplicate_key",
+		"duplicatekey",
+		"duplicate-key-2",
+		"duplicate-key2",
+		"duplicate-key-3",
+	]
 
 
 def test_create_url_without_custom_key(client):
@@ -267,3 +274,75 @@ def test_create_url_with_explicit_none_custom_key(client):
 	# Should generate random key when None is provided
 	url_key = data["url"].split("/")[-1]
 	assert len(url_key) == 5
+
+
+def test_conflict_suggestions_skip_taken_keys(client):
+	"""Test that the 409 only suggests keys that are still available"""
+	for key in ("promo", "promo-2", "promo2"):
+		client.post(
+			"/url",
+			json={"target_url": "https://example.com", "custom_key": key},
+		)
+
+	response = client.post(
+		"/url",
+		json={"target_url": "https://example.com", "custom_key": "promo"},
+	)
+
+	assert response.status_code == status.HTTP_409_CONFLICT
+	assert response.json()["suggestions"][:2] == ["promo-3", "promo3"]
+
+
+def test_conflict_suggestions_can_be_disabled(client, monkeypatch):
+	"""Test that KEY_SUGGESTIONS=0 answers 409 without suggestions"""
+	monkeypatch.setattr(client.app.state.settings, "key_suggestions", 0)
+	payload = {"target_url": "https://example.com", "custom_key": "taken"}
+	client.post("/url", json=payload)
+
+	response = client.post("/url", json=payload)
+
+	assert response.status_code == status.HTTP_409_CONFLICT
+	assert response.json()["suggestions"] == []
+
+
+def test_suggest_taken_key(client):
+	"""Test GET /url/suggest for a key in use"""
+	client.post(
+		"/url",
+		json={"target_url": "https://example.com", "custom_key": "sale"},
+	)
+
+	response = client.get("/url/suggest", params={"key": "sale", "count": 2})
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.json() == {
+		"key": "sale",
+		"available": False,
+		"suggestions": ["sale-2", "sale2"],
+	}
+
+
+def test_suggest_available_key(client):
+	"""Test GET /url/suggest for a free key"""
+	response = client.get("/url/suggest", params={"key": "fresh-key"})
+
+	assert response.json()["available"] is True
+	assert len(response.json()["suggestions"]) == 5
+
+
+def test_suggest_invalid_key_offers_valid_ones(client):
+	"""Test that invalid or reserved keys are never suggested or available"""
+	response = client.get("/url/suggest", params={"key": "my link!"})
+	reserved = client.get("/url/suggest", params={"key": "admin"})
+
+	assert response.json()["available"] is False
+	assert response.json()["suggestions"][0] == "my-link"
+	assert reserved.json()["available"] is False
+	assert "admin" not in reserved.json()["suggestions"]
+
+
+def test_suggest_validates_count(client):
+	"""Test that the number of suggestions is bounded"""
+	response = client.get("/url/suggest", params={"key": "abc", "count": 21})
+
+	assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
@@ -0,0 +1,136 @@
+"""
+Unit tests for /health/live and /health/ready endpoints
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import status
+
+from app.api.routes import health
+
+
+@pytest.fixture(autouse=True)
+def reset_readiness_cache():
+	"""Make every test run its own readiness check"""
+	health._cached["expires_at"] = 0.0
+	yield
+	health._cached["expires_at"] = 0.0
+
+
+def test_live_returns_ok(client):
+	"""Test that liveness answers without touching the database"""
+	with patch("app.api.routes.health._ping_database") as mock_ping:
+		response = client.get("/health/live")
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.json() == {"status": "ok"}
+	mock_ping.assert_not_called()
+
+
+def test_ready_reports_database_and_pool(client):
+	"""Test that readiness reports database status and pool saturation"""
+	response = client.get("/health/ready")
+
+	assert response.status_code == status.HTTP_200_OK
+	data = response.json()
+	assert data["status"] == "ok"
+	assert data["database"] == "ok"
+	assert "saturation" in data["pool"]
+
+
+def test_ready_reports_warm_up(client, key_index):
+	"""Test the warm-up figures reported alongside readiness"""
+	key_index.build(["abc", "def"])
+
+	response = client.get("/health/ready")
+
+	assert response.status_code == status.HTTP_200_OK
+	warm_up = response.json()["warm_up"]
+	assert warm_up["key_index"] == {"ready": True, "keys": 2}
+	assert "warmed" in warm_up["redirect_cache"]
+
+
+def test_ready_uses_the_app_settings(client, monkeypatch):
+	"""Test that the probe reads the settings of the app it serves"""
+	settings = client.app.state.settings.model_copy(
+		update={"health_max_pool_saturation": 0.0}
+	)
+	monkeypatch.setattr(client.app.state, "settings", settings)
+
+	with patch("app.api.routes.health._ping_database") as mock_ping:
+		response = client.get("/health/ready")
+
+	assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+	assert response.json()["database"] == "skipped: pool saturated"
+	mock_ping.assert_not_called()
+
+
+def test_ready_result_is_cached(client):
+	"""Test that back-to-back probes share one database check"""
+	with patch("app.api.routes.health._ping_database") as mock_ping:
+		client.get("/health/ready")
+		client.get("/health/ready")
+
+	mock_ping.assert_called_once()
+
+
+def test_ready_returns_503_when_database_fails(client):
+	"""Test that readiness fails when no connection can be obtained"""
+	with patch(
+		"app.api.routes.health._ping_database",
+		side_effect=RuntimeError("down"),
+	):
+		response = client.get("/health/ready")
+
+	assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+	assert response.json()["database"] == "error: RuntimeError"
+
+
+def test_ready_returns_503_when_pool_saturated(client):
+	"""Test that a saturated pool is reported without a database check"""
+	saturated = {"checked_out": 5, "capacity": 5, "saturation": 1.0}
+	with (
+		patch("app.api.routes.health.pool_status", return_value=saturated),
+		patch("app.api.routes.health._ping_database") as mock_ping,
+	):
+		response = client.get("/health/ready")
+
+	assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+	mock_ping.assert_not_called()
+
+
+def test_pool_status_computes_saturation():
+	"""Test saturation as checked out connections over pool capacity"""
+	pool = MagicMock()
+	pool.size.return_value = 5
+	pool.checkedout.return_value = 4
+
+	assert health.pool_status(pool, max_overflow=5) == {
+		"checked_out": 4,
+		"capacity": 10,
+		"saturation": 0.4,
+	}
+
+
+def test_ready_returns_503_on_timeout(client, monkeypatch):
+	"""Test that a slow database check is reported as a timeout"""
+	import threading
+
+	from app.core.config import get_settings
+
+	release = threading.Event()
+	monkeypatch.setattr(get_settings(), "health_check_timeout", 0.01)
+	with patch(
+		"app.api.routes.health._ping_database", side_effect=release.wait
+	):
+		response = client.get("/health/ready")
+		release.set()
+
+	assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+	assert response.json()["database"] == "timeout"
+
+
+def test_pool_status_without_fixed_size():
+	"""Test that pools without a size (e.g. NullPool) are never saturated"""
+	assert health.pool_status(object(), max_overflow=10)["saturation"] == 0.0
@@ -0,0 +1,60 @@
+"""
+Unit tests for GET /metrics endpoint
+"""
+
+import pytest
+from fastapi import status
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.metrics import DB_QUERIES
+
+
+def test_metrics_exposes_prometheus_text(client):
+	"""Test that /metrics answers in the Prometheus text format"""
+	response = client.get("/metrics")
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.headers["content-type"].startswith("text/plain")
+	assert "# TYPE http_requests_total counter" in response.text
+	assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+
+def test_metrics_labels_requests_by_route_template(client):
+	"""Test that requests are labelled by route template, not raw path"""
+	client.get("/some-missing-key", follow_redirects=False)
+
+	response = client.get("/metrics")
+
+	assert 'route="/{url_key}",status="404"' in response.text
+	assert "some-missing-key" not in response.text
+
+
+def test_metrics_counts_db_queries(client):
+	"""Test that SQL statements are counted through engine events"""
+	client.post("/url", json={"target_url": "https://example.com/metrics"})
+
+	response = client.get("/metrics")
+
+	assert 'db_queries_total{statement="INSERT"}' in response.text
+
+
+def test_failed_queries_leave_no_timing_behind(db_session):
+	"""Test that a statement failing in the driver doesn't skew the next"""
+	selects = DB_QUERIES.values.get(("SELECT",), 0)
+	connection = db_session.connection()
+
+	with pytest.raises(OperationalError):
+		connection.execute(text("SELECT * FROM no_such_table"))
+	db_session.rollback()
+	db_session.execute(text("SELECT 1"))
+
+	assert DB_QUERIES.values[("SELECT",)] == selects + 1
+	assert "metrics_query_start" not in db_session.connection().info
+
+
+def test_metrics_is_not_shadowed_by_redirect_route(client):
+	"""Test that /metrics is not treated as a short URL key"""
+	response = client.get("/metrics", follow_redirects=False)
+
+	assert response.status_code == status.HTTP_200_OK
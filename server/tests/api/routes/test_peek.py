@@ -3,6 +3,7 @@ Unit tests for GET /peek/{url_key} endpoint
 """
 
 from datetime import datetime
+from unittest.mock import patch
 
 from fastapi import status
 
@@ -206,3 +207,55 @@ def test_peek_does_not_require_authentication(client):
 	peek_response = client.get(f"/peek/{url_key}")
 	assert peek_response.status_code == status.HTTP_200_OK
 	assert peek_response.json()["target_url"] == target_url
+
+
+def test_peek_answers_unchanged_url_with_304(client):
+	"""Test the ETag of peek and conditional requests against it"""
+	create_response = client.post(
+		"/url", json={"target_url": "https://example.com/etag"}
+	)
+	url_key = create_response.json()["url"].split("/")[-1]
+	etag = client.get(f"/peek/{url_key}").headers["etag"]
+
+	with patch("app.api.crud.get_db_url_for_peek") as mock_lookup:
+		response = client.get(
+			f"/peek/{url_key}", headers={"If-None-Match": etag}
+		)
+
+	mock_lookup.assert_not_called()
+	assert response.status_code == status.HTTP_304_NOT_MODIFIED
+	assert response.headers["etag"] == etag
+	assert response.content == b""
+
+
+def test_peek_etag_changes_on_click_and_deactivate(client):
+	"""Test that clicks and deletion make cached peeks stale"""
+	create_response = client.post(
+		"/url", json={"target_url": "https://example.com/etag"}
+	)
+	data = create_response.json()
+	url_key = data["url"].split("/")[-1]
+	etag = client.get(f"/peek/{url_key}").headers["etag"]
+
+	client.get(f"/{url_key}", follow_redirects=False)
+	response = client.get(f"/peek/{url_key}", headers={"If-None-Match": etag})
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.json()["clicks"] == 1
+	clicked_etag = response.headers["etag"]
+	assert clicked_etag != etag
+
+	client.delete(f"/admin/{data['admin_url'].split('/')[-1]}")
+	response = client.get(
+		f"/peek/{url_key}", headers={"If-None-Match": clicked_etag}
+	)
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.json()["is_active"] is False
+
+
+def test_peek_unknown_key_with_if_none_match(client):
+	"""Test that conditional requests for unknown keys still get 404"""
+	response = client.get("/peek/NOPE1", headers={"If-None-Match": "*"})
+
+	assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,87 @@
+"""
+Unit tests for POST /peek/batch endpoint
+"""
+
+from datetime import datetime
+
+from fastapi import status
+
+from app import models
+from app.schemas.url import PEEK_BATCH_MAX_KEYS
+
+
+def _create(client, target_url):
+	response = client.post("/url", json={"target_url": target_url})
+	return response.json()["url"].split("/")[-1]
+
+
+def test_peek_batch_keeps_input_order(client):
+	"""Test that items follow the requested keys, unknown ones marked"""
+	first = _create(client, "https://example.com/1")
+	second = _create(client, "https://example.com/2")
+
+	response = client.post(
+		"/peek/batch", json={"keys": [second, "missing", first, second]}
+	)
+
+	assert response.status_code == status.HTTP_200_OK
+	items = response.json()["items"]
+	assert [item["key"] for item in items] == [
+		second,
+		"missing",
+		first,
+		second,
+	]
+	assert [item["found"] for item in items] == [True, False, True, True]
+	assert items[0]["url"]["target_url"] == "https://example.com/2"
+	assert items[1]["url"] is None
+	assert items[2]["url"]["key"] == first
+	assert items[3] == items[0]
+
+
+def test_peek_batch_matches_single_peek(client):
+	"""Test that batch items carry the same fields as GET /peek/{key}"""
+	key = _create(client, "https://example.com/same")
+	client.get(f"/{key}")
+
+	single = client.get(f"/peek/{key}").json()
+	batch = client.post("/peek/batch", json={"keys": [key]}).json()
+
+	assert batch["items"][0]["url"] == single
+
+
+def test_peek_batch_includes_inactive_and_archived(client, db_session):
+	"""Test that deactivated and archived URLs are found too"""
+	response = client.post(
+		"/url", json={"target_url": "https://example.com/inactive"}
+	)
+	inactive = response.json()["url"].split("/")[-1]
+	secret_key = response.json()["admin_url"].split("/")[-1]
+	client.delete(f"/admin/{secret_key}")
+	db_session.add(
+		models.URLArchive(
+			id=999,
+			key="archived",
+			target_url="https://example.com/archived",
+			created_at=datetime(2024, 1, 1),
+		)
+	)
+	db_session.commit()
+
+	items = client.post(
+		"/peek/batch", json={"keys": [inactive, "archived"]}
+	).json()["items"]
+
+	assert items[0]["url"]["is_active"] is False
+	assert items[1]["url"]["target_url"] == "https://example.com/archived"
+
+
+def test_peek_batch_limits_keys(client):
+	"""Test that empty and oversized batches are rejected"""
+	empty = client.post("/peek/batch", json={"keys": []})
+	too_many = client.post(
+		"/peek/batch", json={"keys": ["k"] * (PEEK_BATCH_MAX_KEYS + 1)}
+	)
+
+	assert empty.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+	assert too_many.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
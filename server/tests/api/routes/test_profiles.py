@@ -0,0 +1,82 @@
+"""
+Unit tests for /admin/profiles endpoints and request profiling
+"""
+
+import pytest
+from fastapi import status
+
+from app.core.config import get_settings
+from app.core.sampler import PROFILER
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+@pytest.fixture
+def admin_client(client, monkeypatch, tmp_path):
+	"""Client with an admin token configured and profiles in tmp_path"""
+	monkeypatch.setattr(get_settings(), "admin_token", ADMIN_TOKEN)
+	monkeypatch.setattr(PROFILER, "directory", tmp_path)
+	monkeypatch.setattr(PROFILER, "sample_rate", 0.0)
+	return client
+
+
+def test_profiles_require_admin_token(admin_client):
+	"""Test that profile endpoints reject requests without the token"""
+	response = admin_client.get("/admin/profiles")
+
+	assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_profiles_disabled_without_configured_token(client):
+	"""Test that no token is accepted when none is configured"""
+	response = client.get("/admin/profiles", headers={"X-Admin-Token": ""})
+
+	assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_profile_header_records_retrievable_profile(admin_client):
+	"""Test that one request can be profiled on demand"""
+	headers = {"X-Admin-Token": ADMIN_TOKEN}
+	response = admin_client.post(
+		"/url",
+		json={"target_url": "https://example.com/profiled"},
+		headers={**headers, "X-Profile-Request": "1"},
+	)
+	profile_id = response.headers["x-profile-id"]
+
+	listing = admin_client.get("/admin/profiles", headers=headers)
+	assert profile_id in listing.json()["profiles"]
+
+	profile = admin_client.get(
+		f"/admin/profiles/{profile_id}", headers=headers
+	)
+	assert profile.status_code == status.HTTP_200_OK
+
+
+def test_profile_header_without_token_is_ignored(admin_client):
+	"""Test that anonymous clients can't trigger profiling"""
+	response = admin_client.get("/", headers={"X-Profile-Request": "1"})
+
+	assert "x-profile-id" not in response.headers
+
+
+def test_set_sampling_rate(admin_client):
+	"""Test that the sample rate can be changed at runtime"""
+	headers = {"X-Admin-Token": ADMIN_TOKEN}
+
+	response = admin_client.put(
+		"/admin/profiles/sampling", json={"sample_rate": 1.0}, headers=headers
+	)
+	assert response.json()["sample_rate"] == 1.0
+
+	sampled = admin_client.get("/")
+	assert "x-profile-id" in sampled.headers
+
+
+def test_unknown_profile_returns_404(admin_client):
+	"""Test that missing profiles return 404"""
+	response = admin_client.get(
+		"/admin/profiles/missing", headers={"X-Admin-Token": ADMIN_TOKEN}
+	)
+
+	assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -2,8 +2,17 @@
 Unit tests for GET /{url_key} endpoint
 """
 
+from unittest.mock import patch
+
+import pytest
 from fastapi import status
 
+from app.core import database
+from app.core.cache import REDIRECT_CACHE
+from app.core.config import get_settings
+from app.core.jobs import JOBS
+from app.core.metrics import CLICKS_SKIPPED, JOB_RESULTS
+
 
 def test_redirect_to_target_url(client):
 	"""Test that accessing shortened URL redirects to target URL"""
@@ -91,3 +100,203 @@ def test_inactive_url_returns_404(client):
 	# Try to access deleted URL
 	response = client.get(f"/{url_key}")
 	assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.fixture
+def redirect_cache():
+	"""Enable the redirect cache for one test"""
+	REDIRECT_CACHE.configure(max_size=100, ttl=60.0)
+	yield REDIRECT_CACHE
+	REDIRECT_CACHE.configure(max_size=0, ttl=60.0)
+
+
+def test_redirect_is_served_from_cache(client, redirect_cache):
+	"""Test that a cached key skips the lookup but still counts clicks"""
+	create_response = client.post(
+		"/url", json={"target_url": "https://www.example.com/cached"}
+	)
+	data = create_response.json()
+	url_key = data["url"].split("/")[-1]
+	secret_key = data["admin_url"].split("/")[-1]
+
+	client.get(f"/{url_key}", follow_redirects=False)
+	assert redirect_cache.get(url_key) is not None
+
+	with patch("app.api.crud.get_redirect_target") as mock_lookup:
+		response = client.get(f"/{url_key}", follow_redirects=False)
+
+	mock_lookup.assert_not_called()
+	assert response.headers["location"] == "https://www.example.com/cached"
+	assert client.get(f"/admin/{secret_key}").json()["clicks"] == 2
+
+
+def test_delete_invalidates_cached_redirect(client, redirect_cache):
+	"""Test that a deleted URL stops redirecting despite the cache"""
+	create_response = client.post(
+		"/url", json={"target_url": "https://www.example.com/uncached"}
+	)
+	data = create_response.json()
+	url_key = data["url"].split("/")[-1]
+	secret_key = data["admin_url"].split("/")[-1]
+	client.get(f"/{url_key}", follow_redirects=False)
+
+	client.delete(f"/admin/{secret_key}")
+
+	assert redirect_cache.get(url_key) is None
+	response = client.get(f"/{url_key}", follow_redirects=False)
+	assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def _create(client, **policy):
+	create_response = client.post(
+		"/url", json={"target_url": "https://www.example.com/p", **policy}
+	)
+	return create_response.json()["url"].split("/")[-1]
+
+
+def test_redirect_default_policy_is_not_cacheable(client):
+	"""Test that redirects are counted exactly unless configured otherwise"""
+	response = client.get(f"/{_create(client)}", follow_redirects=False)
+
+	assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+	assert response.headers["cache-control"] == "no-store"
+
+
+def test_redirect_uses_per_link_policy(client):
+	"""Test a permanent, cacheable redirect set at creation"""
+	url_key = _create(client, redirect_status=301, cache_max_age=86400)
+
+	response = client.get(f"/{url_key}", follow_redirects=False)
+
+	assert response.status_code == status.HTTP_301_MOVED_PERMANENTLY
+	assert response.headers["cache-control"] == "public, max-age=86400"
+
+
+def test_redirect_falls_back_to_global_policy(client, monkeypatch):
+	"""Test that links without a policy follow the settings"""
+	monkeypatch.setattr(get_settings(), "redirect_status_code", 308)
+	monkeypatch.setattr(get_settings(), "redirect_max_age", 3600)
+	url_key = _create(client)
+	no_store_key = _create(client, cache_max_age=0)
+
+	response = client.get(f"/{url_key}", follow_redirects=False)
+	no_store = client.get(f"/{no_store_key}", follow_redirects=False)
+
+	assert response.status_code == status.HTTP_308_PERMANENT_REDIRECT
+	assert response.headers["cache-control"] == "public, max-age=3600"
+	assert no_store.status_code == status.HTTP_308_PERMANENT_REDIRECT
+	assert no_store.headers["cache-control"] == "no-store"
+
+
+def test_cached_redirect_keeps_policy(client, redirect_cache):
+	"""Test that a cache hit applies the policy without a query"""
+	url_key = _create(client, redirect_status=302, cache_max_age=60)
+	client.get(f"/{url_key}", follow_redirects=False)
+
+	with patch("app.api.crud.get_redirect_target") as mock_lookup:
+		response = client.get(f"/{url_key}", follow_redirects=False)
+
+	mock_lookup.assert_not_called()
+	assert response.status_code == status.HTTP_302_FOUND
+	assert response.headers["cache-control"] == "public, max-age=60"
+
+
+@pytest.mark.parametrize(
+	"policy", [{"redirect_status": 303}, {"cache_max_age": -1}]
+)
+def test_invalid_redirect_policy_is_rejected(client, policy):
+	"""Test that only redirect status codes and positive ages are accepted"""
+	response = client.post(
+		"/url", json={"target_url": "https://www.example.com", **policy}
+	)
+
+	assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+def _clicks(client, data):
+	secret_key = data["admin_url"].split("/")[-1]
+	return client.get(f"/admin/{secret_key}").json()["clicks"]
+
+
+def test_head_redirects_without_counting(client, redirect_cache):
+	"""Test that HEAD gets the redirect, from cache, without a click"""
+	data = client.post(
+		"/url", json={"target_url": "https://www.example.com/head"}
+	).json()
+	url_key = data["url"].split("/")[-1]
+	skipped = CLICKS_SKIPPED.values.get(("head",), 0)
+
+	first = client.head(f"/{url_key}", follow_redirects=False)
+	with (
+		patch("app.api.crud.get_redirect_target") as mock_lookup,
+		patch("app.api.crud.increment_db_clicks") as mock_increment,
+	):
+		second = client.head(f"/{url_key}", follow_redirects=False)
+
+	mock_lookup.assert_not_called()
+	mock_increment.assert_not_called()
+	assert first.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+	assert second.headers["location"] == "https://www.example.com/head"
+	assert CLICKS_SKIPPED.values[("head",)] == skipped + 2
+	assert _clicks(client, data) == 0
+
+
+@pytest.mark.parametrize(
+	("headers", "reason"),
+	[
+		({"User-Agent": "Slackbot-LinkExpanding 1.0"}, "bot"),
+		({"Sec-Purpose": "prefetch"}, "prefetch"),
+	],
+)
+def test_bots_and_prefetchers_are_not_counted(client, headers, reason):
+	"""Test that unfurlers get the redirect without a click write"""
+	data = client.post(
+		"/url", json={"target_url": "https://www.example.com/unfurl"}
+	).json()
+	url_key = data["url"].split("/")[-1]
+	skipped = CLICKS_SKIPPED.values.get((reason,), 0)
+
+	response = client.get(
+		f"/{url_key}", headers=headers, follow_redirects=False
+	)
+
+	assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+	assert CLICKS_SKIPPED.values[(reason,)] == skipped + 1
+	assert _clicks(client, data) == 0
+
+
+def test_bot_clicks_counted_when_filter_disabled(client, monkeypatch):
+	"""Test that SKIP_BOT_CLICKS=false counts every GET"""
+	monkeypatch.setattr(get_settings(), "skip_bot_clicks", False)
+	data = client.post(
+		"/url", json={"target_url": "https://www.example.com/bots"}
+	).json()
+	url_key = data["url"].split("/")[-1]
+
+	client.get(
+		f"/{url_key}",
+		headers={"User-Agent": "Googlebot/2.1"},
+		follow_redirects=False,
+	)
+
+	assert _clicks(client, data) == 1
+
+
+def test_deferred_clicks_are_counted_by_job(client, db_session, monkeypatch):
+	"""Test that DEFER_CLICKS moves the click write to the job runner"""
+	monkeypatch.setattr(get_settings(), "defer_clicks", True)
+	monkeypatch.setitem(database._state, "engine", db_session.get_bind())
+	assert JOBS.running
+	data = client.post(
+		"/url", json={"target_url": "https://www.example.com/deferred"}
+	).json()
+	url_key = data["url"].split("/")[-1]
+
+	done = JOB_RESULTS.values.get(("click", "done"), 0)
+
+	client.get(f"/{url_key}", follow_redirects=False)
+	client.get(f"/{url_key}", follow_redirects=False)
+	JOBS.stop(timeout=5.0)
+
+	assert JOB_RESULTS.values[("click", "done")] == done + 2
+	assert _clicks(client, data) == 2
@@ -0,0 +1,69 @@
+"""
+Unit tests for POST /admin/takedown endpoint
+"""
+
+import pytest
+from fastapi import status
+
+from app.core.config import get_settings
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+@pytest.fixture
+def admin_client(client, monkeypatch):
+	"""Client with an admin token configured"""
+	monkeypatch.setattr(get_settings(), "admin_token", ADMIN_TOKEN)
+	return client
+
+
+def test_takedown_requires_admin_token(admin_client):
+	"""Test that takedowns are operational endpoints"""
+	response = admin_client.post(
+		"/admin/takedown", json={"domain": "evil.com"}
+	)
+
+	assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_takedown_deactivates_links(admin_client, monkeypatch):
+	"""Test that every link to the domain stops redirecting"""
+	monkeypatch.setattr(get_settings(), "takedown_batch_size", 1)
+	keys = [
+		admin_client.post("/url", json={"target_url": url})
+		.json()["url"]
+		.split("/")[-1]
+		for url in ("https://evil.com/1", "https://www.evil.com/2")
+	]
+	safe = admin_client.post("/url", json={"target_url": "https://ok.com"})
+
+	response = admin_client.post(
+		"/admin/takedown",
+		json={"domain": "*.EVIL.com"},
+		headers={"X-Admin-Token": ADMIN_TOKEN},
+	)
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.json() == {"domain": "evil.com", "deactivated": 2}
+	for key in keys:
+		assert (
+			admin_client.get(f"/{key}", follow_redirects=False).status_code
+			== 404
+		)
+	safe_key = safe.json()["url"].split("/")[-1]
+	assert (
+		admin_client.get(f"/{safe_key}", follow_redirects=False).status_code
+		== 307
+	)
+
+
+def test_takedown_rejects_invalid_domain(admin_client):
+	"""Test that a malformed domain is a bad request"""
+	response = admin_client.post(
+		"/admin/takedown",
+		json={"domain": "a..b"},
+		headers={"X-Admin-Token": ADMIN_TOKEN},
+	)
+
+	assert response.status_code == status.HTTP_400_BAD_REQUEST
+	assert "not a valid domain" in response.json()["detail"]
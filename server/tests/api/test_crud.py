@@ -0,0 +1,410 @@
+"""
+Unit tests for database operations (crud.py)
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, func, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app import models, schemas
+from app.api import crud
+from app.core.config import get_settings
+from app.core.hostcache import HOST_CACHE
+from app.core.security import derive_secret_key
+
+
+def test_get_redirect_target_returns_id_and_target(client, db_session):
+	"""Test that get_redirect_target returns only what a redirect needs"""
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/target")
+	)
+
+	target = crud.get_redirect_target(db_session, db_url.key)
+
+	assert target.id == db_url.id
+	assert target.target_url == "https://example.com/target"
+	assert target.redirect_status is None
+	assert target.cache_max_age is None
+
+
+def test_get_redirect_target_ignores_inactive(client, db_session):
+	"""Test that get_redirect_target does not return inactive URLs"""
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/gone")
+	)
+	crud.deactivate_db_url_by_secret_key(db_session, db_url.secret_key)
+
+	assert crud.get_redirect_target(db_session, db_url.key) is None
+
+
+def test_redirect_lookup_uses_covering_index(client, db_session):
+	"""Test that the redirect lookup is answered from the covering index"""
+	bind = db_session.get_bind()
+	if bind.dialect.name == "sqlite":
+		explain = "EXPLAIN QUERY PLAN "
+		expected = "COVERING INDEX ix_urls_active_key"
+	elif bind.dialect.name == "postgresql":
+		explain = "EXPLAIN "
+		expected = "ix_urls_active_key"
+	else:
+		pytest.skip("No covering index for this dialect")
+	emitted = []
+
+	def capture(conn, cursor, statement, parameters, *_):
+		emitted.append((statement, parameters))
+
+	event.listen(bind, "before_cursor_execute", capture)
+	try:
+		crud.get_redirect_target(db_session, "x")
+	finally:
+		event.remove(bind, "before_cursor_execute", capture)
+	[(statement, parameters)] = emitted
+	connection = db_session.connection()
+	plan = " ".join(
+		str(row)
+		for row in connection.exec_driver_sql(explain + statement, parameters)
+	)
+
+	assert expected in plan
+
+
+def test_increment_db_clicks(client, db_session):
+	"""Test that increment_db_clicks adds one click without a row fetch"""
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/clicks")
+	)
+
+	crud.increment_db_clicks(db_session, db_url.id)
+	crud.increment_db_clicks(db_session, db_url.id)
+
+	db_session.refresh(db_url)
+	assert db_url.clicks == 2
+
+
+def test_update_db_clicks_increments_loaded_row(client, db_session):
+	"""Test that update_db_clicks increments and refreshes a loaded row"""
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/orm")
+	)
+
+	updated = crud.update_db_clicks(db_session, db_url)
+
+	assert updated.clicks == 1
+
+
+def test_get_popular_redirect_targets_orders_by_clicks(client, db_session):
+	"""Test that warm-up rows are active URLs, most clicked first"""
+	url = schemas.URLBase(target_url="https://example.com/popular")
+	quiet = crud.create_db_url(db_session, url)
+	popular = crud.create_db_url(db_session, url)
+	inactive = crud.create_db_url(db_session, url)
+	crud.increment_db_clicks(db_session, popular.id)
+	crud.deactivate_db_url_by_secret_key(db_session, inactive.secret_key)
+
+	rows = crud.get_popular_redirect_targets(db_session, limit=10)
+
+	assert [row.key for row in rows] == [popular.key, quiet.key]
+	assert rows[0].id == popular.id
+	assert rows[0].target_url == "https://example.com/popular"
+
+
+def test_secret_key_lookup_verifies_stored_secret(client, db_session):
+	"""Test admin lookups by key plus verification of the stored secret"""
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/admin")
+	)
+
+	assert crud.get_db_url_by_secret_key(db_session, db_url.secret_key) == (
+		db_url
+	)
+	assert crud.get_db_url_by_secret_key(db_session, f"{db_url.key}_X") is None
+	assert crud.get_db_url_by_secret_key(db_session, db_url.key) is None
+
+
+def test_derived_secret_key_is_not_stored(client, db_session, monkeypatch):
+	"""Test that with secret_key_hmac set the secret is derived on lookup"""
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "server-secret")
+	db_url = crud.create_db_url(
+		db_session,
+		schemas.URLBase(target_url="https://example.com", custom_key="my_k"),
+	)
+	secret_key = derive_secret_key("my_k")
+
+	assert db_url.secret_key is None
+	assert crud.get_db_url_by_secret_key(db_session, secret_key) == db_url
+	assert crud.get_db_url_by_secret_key(db_session, "my_k_WRONG") is None
+
+	crud.deactivate_db_url_by_secret_key(db_session, secret_key)
+	assert crud.get_db_url_by_secret_key(db_session, secret_key) is None
+
+
+def test_create_db_url_adds_key_to_built_key_index(
+	client, db_session, key_index
+):
+	"""Test that keys created by this process are indexed right away"""
+	key_index.build([])
+
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com")
+	)
+
+	assert db_url.key in key_index
+
+
+def test_create_db_url_custom_key_taken_after_index_build(
+	client, db_session, key_index
+):
+	"""Test that the unique constraint catches keys the index missed"""
+	crud.create_db_url(
+		db_session,
+		schemas.URLBase(target_url="https://example.com/1", custom_key="race"),
+	)
+	# As if another worker created it after this one built its index
+	key_index.build([])
+
+	db_url = crud.create_db_url(
+		db_session,
+		schemas.URLBase(target_url="https://example.com/2", custom_key="race"),
+	)
+
+	assert db_url is None
+	assert "race" in key_index
+	assert crud.get_db_url_by_key(db_session, "race").target_url == (
+		"https://example.com/1"
+	)
+
+
+def test_create_db_url_retries_key_missing_from_index(
+	client, db_session, key_index
+):
+	"""Test a random key created by another worker after the index build"""
+	existing = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/1")
+	)
+	key_index.build([])
+
+	with patch(
+		"app.utils.keygen.create_random_key",
+		side_effect=[existing.key, "secret00", "FRESH", "secret01"],
+	):
+		db_url = crud.create_db_url(
+			db_session, schemas.URLBase(target_url="https://example.com/2")
+		)
+
+	assert db_url.key == "FRESH"
+	assert existing.key in key_index
+
+
+def test_create_db_url_random_key_collision_raises(client, db_session):
+	"""Test that a key that keeps colliding is not mistaken for a 409"""
+	existing = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/1")
+	)
+
+	with (
+		patch(
+			"app.utils.keygen.create_unique_random_key",
+			return_value=existing.key,
+		) as create_key,
+		pytest.raises(IntegrityError),
+	):
+		crud.create_db_url(
+			db_session, schemas.URLBase(target_url="https://example.com/2")
+		)
+	assert create_key.call_count == crud.RANDOM_KEY_ATTEMPTS
+
+
+def test_iter_all_keys_includes_inactive_and_archived(client, db_session):
+	"""Test that every key in use is streamed, whatever its state"""
+	active = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/1")
+	)
+	inactive = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/2")
+	)
+	crud.deactivate_db_url_by_secret_key(db_session, inactive.secret_key)
+	db_session.add(
+		models.URLArchive(id=999, key="old-key", created_at=datetime.now())
+	)
+	db_session.commit()
+
+	keys = set(crud.iter_all_keys(db_session, batch_size=1))
+
+	assert keys == {active.key, inactive.key, "old-key"}
+
+
+def test_get_taken_keys_checks_both_tables(client, db_session):
+	"""Test that live and archived keys are found in one query"""
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com")
+	)
+	db_session.add(
+		models.URLArchive(id=999, key="old-key", created_at=datetime.now())
+	)
+	db_session.commit()
+
+	taken = crud.get_taken_keys(db_session, [db_url.key, "old-key", "free"])
+
+	assert taken == {db_url.key, "old-key"}
+	assert crud.get_taken_keys(db_session, []) == set()
+
+
+def test_get_peek_rows_queries_in_chunks(client, db_session):
+	"""Test that keys are resolved with one query per chunk"""
+	keys = [
+		crud.create_db_url(
+			db_session, schemas.URLBase(target_url=f"https://example.com/{i}")
+		).key
+		for i in range(5)
+	]
+
+	rows = crud.get_peek_rows(db_session, [*keys, "nope"], chunk_size=2)
+
+	assert set(rows) == set(keys)
+	assert rows[keys[0]].target_url == "https://example.com/0"
+
+
+def test_create_db_url_shares_host_rows(client, db_session):
+	"""Test that targets on one origin share a host row, paths stay apart"""
+	first = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/a?b")
+	)
+	second = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/c")
+	)
+	HOST_CACHE.clear()
+	third = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com")
+	)
+
+	assert first.host_id == second.host_id == third.host_id
+	assert (first.target_path, third.target_path) == ("/a?b", "")
+	assert first.target_url == "https://example.com/a?b"
+	assert db_session.scalar(select(func.count(models.Host.id))) == 1
+
+
+def test_get_host_id_skips_origins_inserted_concurrently(client, db_session):
+	"""Test that an origin added by another worker is reused, not a dupe"""
+	db_session.add(models.Host(id=7, origin="https://example.com"))
+	db_session.commit()
+
+	with patch.object(db_session, "scalar", side_effect=[None, 7]):
+		host_id = crud.get_host_id(db_session, "https://example.com")
+
+	assert host_id == 7
+	assert HOST_CACHE.get_id("https://example.com") == 7
+	assert crud.get_host_id(db_session, "") is None
+
+
+def test_target_urls_are_rebuilt_from_uncached_hosts(client, db_session):
+	"""Test redirect and peek rows once the host cache lost the origins"""
+	keys = [
+		crud.create_db_url(
+			db_session, schemas.URLBase(target_url=f"https://{host}/p")
+		).key
+		for host in ("a.com", "b.com", "a.com")
+	]
+	HOST_CACHE.clear()
+
+	target = crud.get_redirect_target(db_session, keys[1])
+	rows = crud.get_peek_rows(db_session, keys)
+
+	assert target.target_url == "https://b.com/p"
+	assert [rows[key].target_url for key in keys] == [
+		"https://a.com/p",
+		"https://b.com/p",
+		"https://a.com/p",
+	]
+	assert len(HOST_CACHE) == 2
+
+
+def test_domain_lookup_searches_reversed_host_index(client, db_session):
+	"""Test that a takedown chunk is an index range search, not a scan"""
+	bind = db_session.get_bind()
+	if bind.dialect.name != "sqlite":
+		pytest.skip("Query plan checked on SQLite only")
+	query = select(models.URL.id).where(
+		crud.match_domain(models.URL.reversed_host, "com.evil"),
+		models.URL.is_active,
+	)
+	sql = query.compile(bind, compile_kwargs={"literal_binds": True})
+
+	plan = " ".join(
+		str(row)
+		for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+	)
+
+	assert "SEARCH urls USING INDEX ix_urls_reversed_host" in plan
+
+
+def _changes(db_session):
+	return db_session.execute(
+		select(models.URLChange.key, models.URLChange.reversed_domain)
+	).all()
+
+
+def test_url_changes_not_recorded_without_redirect_cache(client, db_session):
+	"""Test that nothing is recorded while there is no cache to invalidate"""
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com")
+	)
+
+	crud.deactivate_db_url_by_secret_key(db_session, db_url.secret_key)
+
+	assert _changes(db_session) == []
+
+
+def test_deactivations_record_url_changes(client, db_session, monkeypatch):
+	"""Test that deletes record their key and takedowns their domain"""
+	monkeypatch.setattr(get_settings(), "redirect_cache_size", 100)
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com")
+	)
+	crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://evil.com")
+	)
+
+	crud.deactivate_db_url_by_secret_key(db_session, db_url.secret_key)
+	crud.deactivate_urls_by_domain_chunk(db_session, "com.evil", limit=10)
+	crud.deactivate_urls_by_domain_chunk(db_session, "com.evil", limit=10)
+
+	assert _changes(db_session) == [(db_url.key, None), (None, "com.evil")]
+
+
+def test_get_url_changes_after_id_and_missing(client, db_session):
+	"""Test reading changes after an id plus skipped ids below it"""
+	db_session.add_all(
+		models.URLChange(id=change_id, key=f"k{change_id}")
+		for change_id in (1, 2, 4, 5, 6)
+	)
+	db_session.commit()
+
+	assert [
+		row.id for row in crud.get_url_changes(db_session, 4, limit=10)
+	] == [5, 6]
+	assert [
+		row.id
+		for row in crud.get_url_changes(db_session, 4, limit=1, missing=[2, 3])
+	] == [2, 5, 6]
+
+
+def test_url_changes_by_age(client, db_session):
+	"""Test positioning on and deleting the changes older than a time"""
+	old = datetime(2020, 1, 1)
+	db_session.add_all(
+		[
+			models.URLChange(id=1, key="a", created_at=old),
+			models.URLChange(id=2, key="b", created_at=old),
+			models.URLChange(id=3, key="c"),
+		]
+	)
+	db_session.commit()
+	cutoff = datetime(2021, 1, 1)
+
+	assert crud.get_last_url_change_id(db_session, datetime(2019, 1, 1)) == 0
+	assert crud.get_last_url_change_id(db_session, cutoff) == 2
+	assert crud.delete_url_changes(db_session, cutoff) == 2
+	assert _changes(db_session) == [("c", None)]
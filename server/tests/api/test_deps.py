@@ -7,7 +7,13 @@ from unittest.mock import MagicMock
 import pytest
 from fastapi import HTTPException, Request, status
 
-from app.api.deps import get_db, raise_bad_request, raise_not_found
+from app.api.deps import (
+	get_db,
+	is_not_modified,
+	make_etag,
+	raise_bad_request,
+	raise_not_found,
+)
 
 
 def test_raise_bad_request():
@@ -190,3 +196,29 @@ def test_main_module_creates_tables():
 	assert hasattr(models.URL, "target_url")
 	assert hasattr(models.URL, "is_active")
 	assert hasattr(models.URL, "clicks")
+
+
+def test_make_etag_changes_with_version():
+	"""Test that the ETag identifies both the URL and its version"""
+	first = make_etag(MagicMock(id=3, version=1))
+
+	assert first == '"3-1"'
+	assert make_etag(MagicMock(id=3, version=2)) != first
+	assert make_etag(MagicMock(id=4, version=1)) != first
+
+
+@pytest.mark.parametrize(
+	("if_none_match", "expected"),
+	[
+		(None, False),
+		("", False),
+		('"3-1"', True),
+		('W/"3-1"', True),
+		('"1-1", "3-1"', True),
+		("*", True),
+		('"3-2"', False),
+	],
+)
+def test_is_not_modified(if_none_match, expected):
+	"""Test If-None-Match lists, weak tags and the wildcard"""
+	assert is_not_modified(if_none_match, '"3-1"') is expected
@@ -0,0 +1,51 @@
+"""
+Tests for the blocklist benchmark
+"""
+
+import json
+import random
+
+from app.core.blocklist import parse_line
+from benchmarks import blocklist
+
+
+def test_random_domain_is_a_valid_host():
+	"""Test that generated domains survive blocklist parsing"""
+	rng = random.Random(1)
+	for _ in range(100):
+		domain = blocklist.random_domain(rng)
+		assert parse_line(domain) == domain
+
+
+def test_run_blocklist_reports_timings_and_memory():
+	"""Test every size gets load and lookup timings plus memory figures"""
+	results = blocklist.run_blocklist([50, 100], iterations=5, rounds=2)
+
+	assert set(results["benchmarks"]) == {
+		f"blocklist.{name}[{case}size={size}]"
+		for size in (50, 100)
+		for name, case in (("load", ""), ("check", "hit,"), ("check", "miss,"))
+	}
+	assert results["memory"]["100"]["domains"] == 100
+	assert results["memory"]["100"]["bytes_per_domain"] > 8
+
+
+def test_main_writes_results(tmp_path, capsys):
+	"""Test the CLI writes JSON results and prints memory per domain"""
+	output = tmp_path / "results.json"
+
+	blocklist.main(
+		[
+			"--sizes",
+			"20",
+			"--iterations",
+			"2",
+			"--rounds",
+			"2",
+			"--output",
+			str(output),
+		]
+	)
+
+	assert "bytes per domain" in capsys.readouterr().out
+	assert json.loads(output.read_text())["memory"]["20"]["domains"] == 20
@@ -0,0 +1,129 @@
+"""
+Tests for the benchmark regression gate
+"""
+
+import json
+
+from benchmarks import compare
+
+BASELINE = [0.0010, 0.0011, 0.0009, 0.0010, 0.0010, 0.0011, 0.0009]
+
+
+def write_results(path, benchmarks):
+	path.write_text(
+		json.dumps(
+			{
+				"benchmarks": {
+					name: {"samples": samples}
+					for name, samples in benchmarks.items()
+				}
+			}
+		)
+	)
+	return path
+
+
+def test_load_samples_pools_repeated_runs(tmp_path):
+	"""Test that samples of several result files are concatenated"""
+	first = write_results(tmp_path / "1.json", {"a": [1.0, 2.0]})
+	second = write_results(tmp_path / "2.json", {"a": [3.0], "b": [4.0]})
+
+	assert compare.load_samples([first, second]) == {
+		"a": [1.0, 2.0, 3.0],
+		"b": [4.0],
+	}
+
+
+def test_interval_contains_ratio_and_is_deterministic():
+	"""Test the bootstrap interval around a doubled median"""
+	doubled = [value * 2 for value in BASELINE]
+
+	low, high = compare.bootstrap_ratio_interval(BASELINE, doubled)
+
+	assert low <= 2 <= high
+	assert compare.bootstrap_ratio_interval(BASELINE, doubled) == (low, high)
+
+
+def test_compare_classifies_regressions_and_improvements():
+	"""Test regression, improvement and noise verdicts"""
+	baseline = {
+		"crud.get_redirect_target[fill=0]": BASELINE,
+		"crud.create_db_url[fill=0]": BASELINE,
+		"crud.get_db_url_for_peek[fill=0]": BASELINE,
+		"schemas.URLBase.validate": BASELINE,
+	}
+	current = {
+		"crud.get_redirect_target[fill=0]": [v * 2 for v in BASELINE],
+		"crud.create_db_url[fill=0]": [v / 2 for v in BASELINE],
+		"crud.get_db_url_for_peek[fill=0]": [v * 1.05 for v in BASELINE],
+		"schemas.URLBase.validate": [v * 3 for v in BASELINE],
+	}
+
+	rows = compare.compare(baseline, current, threshold=0.1)
+	by_name = {row["name"]: row for row in rows}
+
+	assert rows[0]["name"] == "schemas.URLBase.validate"
+	assert not rows[0]["gated"]
+	assert by_name["crud.get_redirect_target[fill=0]"]["status"] == (
+		"regression"
+	)
+	assert by_name["crud.create_db_url[fill=0]"]["status"] == "improvement"
+	assert by_name["crud.get_db_url_for_peek[fill=0]"]["status"] == "ok"
+
+
+def test_compare_ignores_benchmarks_missing_on_one_side():
+	"""Test that only benchmarks present in both runs are compared"""
+	rows = compare.compare({"a": BASELINE}, {"b": BASELINE}, threshold=0.1)
+
+	assert rows == []
+
+
+def test_main_fails_on_gated_regression(tmp_path, capsys):
+	"""Test the exit status and report of a regressed redirect"""
+	name = "crud.get_redirect_target[fill=0]"
+	baseline = write_results(tmp_path / "baseline.json", {name: BASELINE})
+	current = write_results(
+		tmp_path / "current.json", {name: [v * 2 for v in BASELINE]}
+	)
+
+	status = compare.main([str(baseline), str(current)])
+
+	output = capsys.readouterr().out
+	assert status == 1
+	assert "+100.0%" in output
+	assert f"Regressions beyond 10%: {name}" in output
+
+
+def test_main_passes_when_regression_is_not_gated(tmp_path, capsys):
+	"""Test that --gate limits which benchmarks can fail the run"""
+	name = "crud.get_redirect_target[fill=0]"
+	gated = "crud.create_db_url[random]"
+	baseline = write_results(
+		tmp_path / "baseline.json", {name: BASELINE, gated: BASELINE}
+	)
+	current = write_results(
+		tmp_path / "current.json",
+		{name: [v * 2 for v in BASELINE], gated: BASELINE},
+	)
+
+	status = compare.main(
+		[str(baseline), str(current), "--gate", "crud.create_db_url"]
+	)
+
+	assert status == 0
+	assert "regression (info)" in capsys.readouterr().out
+
+
+def test_main_fails_on_missing_gated_benchmark(tmp_path, capsys):
+	"""Test that a gate matching no compared benchmark fails the run"""
+	name = "crud.get_redirect_target[fill=0]"
+	baseline = write_results(tmp_path / "baseline.json", {name: BASELINE})
+	current = write_results(tmp_path / "current.json", {"other": BASELINE})
+
+	status = compare.main(
+		[str(baseline), str(current), "--gate", "crud.get_redirect_target"]
+	)
+
+	output = capsys.readouterr().out
+	assert status == 1
+	assert "without benchmarks on both sides: crud.get_redirect" in output
@@ -0,0 +1,139 @@
+"""
+Unit tests for the synthetic dataset generator
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.database import Base
+from benchmarks import dataset
+
+
+def test_generated_keys_are_unique_and_sized_for_the_table():
+	"""Test that keys never collide and grow with the row count"""
+	options = dataset.DatasetOptions(rows=5000, inactive_ratio=0.5)
+
+	rows = list(dataset.generate_rows(options))
+
+	assert len({row[0] for row in rows}) == 5000
+	assert all(len(row[0]) == 5 for row in rows)
+	assert dataset.key_length(100_000_000) == 6
+
+
+def test_generated_rows_follow_requested_ratios():
+	"""Test the inactive ratio and the target host and path"""
+	options = dataset.DatasetOptions(rows=4000, inactive_ratio=0.25)
+
+	rows = list(dataset.generate_rows(options))
+
+	inactive = sum(1 for row in rows if not row[4])
+	assert 800 < inactive < 1200
+	assert all(1 <= row[2] <= options.hosts for row in rows)
+	assert all(row[3].startswith("/") for row in rows)
+	assert all(row[1].startswith(f"{row[0]}_") for row in rows)
+	assert all(row[5] >= 0 for row in rows)
+	assert all(row[6].startswith("com.example.site") for row in rows)
+
+
+def test_slices_are_disjoint_parts_of_the_key_sequence():
+	"""Test that parallel slices produce the same keys as one pass"""
+	options = dataset.DatasetOptions(rows=100)
+
+	full = [row[0] for row in dataset.generate_rows(options)]
+	first = [row[0] for row in dataset.generate_rows(options, 0, 40)]
+	second = [row[0] for row in dataset.generate_rows(options, 40, 100)]
+
+	assert first + second == full
+
+
+def test_main_loads_sqlite_with_deferred_indexes(tmp_path, capsys):
+	"""Test a full load into SQLite, rebuilding the indexes afterwards"""
+	db_url = f"sqlite:///{tmp_path}/synthetic.db"
+
+	dataset.main(
+		[
+			"--rows",
+			"1500",
+			"--db-url",
+			db_url,
+			"--batch-size",
+			"500",
+			"--defer-indexes",
+		]
+	)
+
+	engine = create_engine(db_url)
+	with engine.connect() as connection:
+		count = connection.execute(text("SELECT count(*) FROM urls"))
+		indexes = connection.execute(
+			text("SELECT name FROM sqlite_master WHERE tbl_name = 'urls'")
+		)
+		assert count.scalar() == 1500
+		assert "ix_urls_active_key" in indexes.scalars().all()
+	engine.dispose()
+	assert "Loaded 1500 rows" in capsys.readouterr().out
+
+
+def test_generate_dataset_refuses_a_table_with_rows(tmp_path):
+	"""Test that a second load fails before writing colliding keys"""
+	db_url = f"sqlite:///{tmp_path}/synthetic.db"
+	options = dataset.DatasetOptions(rows=20, hosts=3)
+	dataset.generate_dataset(db_url, options)
+
+	with pytest.raises(RuntimeError, match="urls already has rows"):
+		dataset.generate_dataset(db_url, options)
+
+	engine = create_engine(db_url)
+	with engine.connect() as connection:
+		count = connection.execute(text("SELECT count(*) FROM urls"))
+		assert count.scalar() == 20
+	engine.dispose()
+
+
+def test_load_postgres_streams_copy_batches():
+	"""Test the COPY payload sent to PostgreSQL"""
+	engine = MagicMock()
+	cursor = engine.raw_connection.return_value.cursor.return_value
+	payloads = []
+	cursor.copy_expert.side_effect = lambda sql, buffer: payloads.append(
+		buffer.read()
+	)
+	rows = dataset.generate_rows(dataset.DatasetOptions(rows=3))
+
+	dataset.load_postgres(engine, rows, batch_size=2)
+
+	assert cursor.copy_expert.call_args.args[0].startswith("COPY urls (key")
+	assert [payload.count("\n") for payload in payloads] == [2, 1]
+	assert payloads[0].split("\t")[4] in {"t", "f"}
+	engine.raw_connection.return_value.close.assert_called_once()
+
+
+def test_load_hosts_inserts_the_pool_once(tmp_path):
+	"""Test that reloads keep the host ids, and other hosts are left alone"""
+	engine = create_engine(f"sqlite:///{tmp_path}/synthetic.db")
+	Base.metadata.create_all(bind=engine)
+	options = dataset.DatasetOptions(rows=10, hosts=3)
+	origins = dataset.host_origins(options)
+	with engine.begin() as connection:
+		connection.execute(
+			text("INSERT INTO hosts (origin) VALUES ('https://app.example')")
+		)
+		connection.execute(
+			text("INSERT INTO hosts (origin) VALUES (:origin)"),
+			{"origin": origins[1]},
+		)
+
+	host_ids = dataset.load_hosts(engine, options)
+	assert dataset.load_hosts(engine, options) == host_ids
+
+	with engine.connect() as connection:
+		rows = dict(
+			connection.execute(text("SELECT origin, id FROM hosts")).all()
+		)
+	assert rows == {"https://app.example": 1, **dict(zip(origins, host_ids))}
+	assert host_ids[1] == 2
+	rows = dataset.generate_rows(options, host_ids=host_ids)
+	assert {row[2] for row in rows} <= set(host_ids)
+	engine.dispose()
@@ -0,0 +1,225 @@
+"""
+Unit tests for the load generator
+"""
+
+import asyncio
+import json
+from collections import Counter
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from app.main import app
+from benchmarks import loadtest
+
+
+def test_parse_mix_rejects_unknown_operations():
+	"""Test that typos in the traffic mix are reported"""
+	assert loadtest.parse_mix("redirect=9,peek=1") == {
+		"redirect": 9.0,
+		"peek": 1.0,
+	}
+	with pytest.raises(ValueError, match="Unknown operation"):
+		loadtest.parse_mix("redirekt=1")
+
+
+def test_zipf_keys_favour_popular_keys():
+	"""Test that low ranks are drawn far more often than high ranks"""
+	keys = loadtest.ZipfKeys(list(range(100)), exponent=1.2)
+
+	draws = Counter(keys.choice() for _ in range(5000))
+
+	assert draws[0] > draws[50] * 10
+
+
+def test_percentile_nearest_rank():
+	"""Test nearest-rank percentiles on a sorted list"""
+	values = [float(i) for i in range(1, 101)]
+
+	assert loadtest.percentile(values, 50) == 50.0
+	assert loadtest.percentile(values, 99) == 99.0
+	assert loadtest.percentile([], 99) == 0.0
+
+
+def test_run_load_reports_every_operation(client):
+	"""Test a short in-process run through the ASGI app"""
+	# One user and one seed key: the test client shares a single session
+	profile = loadtest.LoadProfile(
+		mix=loadtest.parse_mix(loadtest.DEFAULT_MIX),
+		duration=0.3,
+		concurrency=1,
+		keys=1,
+	)
+
+	async def run():
+		transport = httpx.ASGITransport(app=app)
+		async with httpx.AsyncClient(
+			transport=transport, base_url="http://test"
+		) as async_client:
+			return await loadtest.run_load(async_client, profile)
+
+	results = asyncio.run(run())
+
+	assert results["total"]["requests"] > 0
+	assert results["total"]["errors"] == 0
+	assert set(results) == {*profile.mix, "total"}
+
+
+def test_run_load_counts_keys_of_batched_peeks(client):
+	"""Test that batched peeks report keys per second"""
+	profile = loadtest.LoadProfile(
+		mix=loadtest.parse_mix("peek=1,peek_batch=1"),
+		duration=0.3,
+		concurrency=1,
+		keys=1,
+		batch_size=10,
+	)
+
+	async def run():
+		transport = httpx.ASGITransport(app=app)
+		async with httpx.AsyncClient(
+			transport=transport, base_url="http://test"
+		) as async_client:
+			return await loadtest.run_load(async_client, profile)
+
+	results = asyncio.run(run())
+
+	batch = results["peek_batch"]
+	assert batch["errors"] == 0
+	assert batch["key_throughput"] == pytest.approx(batch["throughput"] * 10)
+	assert results["peek"]["key_throughput"] == results["peek"]["throughput"]
+	assert results["total"]["key_throughput"] == pytest.approx(
+		batch["key_throughput"] + results["peek"]["key_throughput"]
+	)
+
+
+def test_run_load_counts_transport_errors():
+	"""Test that connection failures count as errors"""
+
+	def handler(request):
+		if request.url.path == "/url":
+			return httpx.Response(
+				201,
+				json={"url": "http://t/abc", "admin_url": "http://t/admin/x"},
+			)
+		raise httpx.ConnectError("refused")
+
+	profile = loadtest.LoadProfile(
+		mix={"redirect": 1.0}, duration=0.05, concurrency=1, keys=1
+	)
+
+	async def run():
+		transport = httpx.MockTransport(handler)
+		async with httpx.AsyncClient(
+			transport=transport, base_url="http://test"
+		) as async_client:
+			return await loadtest.run_load(async_client, profile)
+
+	results = asyncio.run(run())
+
+	assert results["redirect"]["error_rate"] == 1.0
+
+
+def test_run_load_accepts_every_redirect_status():
+	"""Test that configured and per-link redirect statuses are not errors"""
+	statuses = iter([301, 302, 308] * 1000)
+
+	def handler(request):
+		if request.url.path == "/url":
+			return httpx.Response(
+				201,
+				json={"url": "http://t/abc", "admin_url": "http://t/admin/x"},
+			)
+		return httpx.Response(next(statuses))
+
+	profile = loadtest.LoadProfile(
+		mix={"redirect": 1.0}, duration=0.05, concurrency=1, keys=1
+	)
+
+	async def run():
+		transport = httpx.MockTransport(handler)
+		async with httpx.AsyncClient(
+			transport=transport, base_url="http://test"
+		) as async_client:
+			return await loadtest.run_load(async_client, profile)
+
+	results = asyncio.run(run())
+
+	assert results["redirect"]["requests"] > 0
+	assert results["redirect"]["errors"] == 0
+
+
+def test_seed_reports_failed_creates():
+	"""Test that a create refused while seeding raises a clear error"""
+
+	def handler(request):
+		return httpx.Response(429, text="Too many requests")
+
+	async def run():
+		transport = httpx.MockTransport(handler)
+		async with httpx.AsyncClient(
+			transport=transport, base_url="http://test"
+		) as async_client:
+			return await loadtest.seed(async_client, 1)
+
+	with pytest.raises(RuntimeError, match="answered 429: Too many"):
+		asyncio.run(run())
+
+
+def test_start_server_waits_for_liveness(tmp_path):
+	"""Test that start_server returns once /health/live answers"""
+	ok = httpx.Response(200)
+	with (
+		patch("benchmarks.loadtest.subprocess.Popen") as mock_popen,
+		patch(
+			"benchmarks.loadtest.httpx.get",
+			side_effect=[httpx.ConnectError("starting"), ok],
+		),
+		patch("benchmarks.loadtest.time.sleep"),
+	):
+		process, base_url = loadtest.start_server(
+			f"sqlite:///{tmp_path}/load.db", workers=2
+		)
+
+	assert process is mock_popen.return_value
+	assert base_url.startswith("http://127.0.0.1:")
+	assert "--workers" in mock_popen.call_args.args[0]
+
+
+def test_start_server_gives_up(tmp_path):
+	"""Test that a server that never answers is terminated"""
+	with (
+		patch("benchmarks.loadtest.subprocess.Popen") as mock_popen,
+		patch(
+			"benchmarks.loadtest.httpx.get",
+			side_effect=httpx.ConnectError("down"),
+		),
+		patch("benchmarks.loadtest.time.sleep"),
+		pytest.raises(RuntimeError, match="did not start"),
+	):
+		loadtest.start_server(f"sqlite:///{tmp_path}/load.db", workers=1)
+
+	mock_popen.return_value.terminate.assert_called_once()
+
+
+def test_main_writes_results(tmp_path, capsys):
+	"""Test the command line entry point end to end with a fake server"""
+	output = tmp_path / "load.json"
+	summary = loadtest.summarize_operation([0.001, 0.002], 0, 1.0)
+	process = MagicMock()
+
+	with (
+		patch(
+			"benchmarks.loadtest.start_server",
+			return_value=(process, "http://test"),
+		),
+		patch("benchmarks.loadtest.run_load", return_value={"total": summary}),
+	):
+		loadtest.main(["--duration", "1", "--output", str(output)])
+
+	results = json.loads(output.read_text())
+	assert results["operations"]["total"]["requests"] == 2
+	assert results["parameters"]["workers"] == 1
+	process.terminate.assert_called_once()
+	assert "total" in capsys.readouterr().out
@@ -0,0 +1,63 @@
+"""
+Tests for the worker scaling benchmark
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from benchmarks import loadtest, scaling
+
+
+def _total(throughput):
+	return loadtest.summarize_operation([0.01] * 10, 0, 10 / throughput)
+
+
+def test_scaling_table_reports_speedup_and_efficiency():
+	"""Test speedup and efficiency relative to the smallest worker count"""
+	rows = scaling.scaling_table({4: _total(300), 1: _total(100)})
+
+	assert [row["workers"] for row in rows] == [1, 4]
+	assert rows[1]["speedup"] == pytest.approx(3.0)
+	assert rows[1]["efficiency"] == pytest.approx(0.75)
+
+
+def test_measure_workers_stops_server():
+	"""Test that the launcher is stopped after the load test"""
+	process = MagicMock()
+	with (
+		patch(
+			"benchmarks.scaling.start_server",
+			return_value=(process, "http://test"),
+		) as mock_start,
+		patch(
+			"benchmarks.scaling._run",
+			MagicMock(return_value=None),
+		),
+		patch(
+			"benchmarks.scaling.asyncio.run",
+			return_value={"total": _total(50)},
+		),
+	):
+		total = scaling.measure_workers("sqlite:///x.db", 2, MagicMock())
+
+	assert total["throughput"] == pytest.approx(50)
+	assert mock_start.call_args.args[1] == 2
+	process.terminate.assert_called_once()
+
+
+def test_main_writes_results(tmp_path, capsys):
+	"""Test the command line entry point with the load test stubbed out"""
+	output = tmp_path / "scaling.json"
+
+	with patch(
+		"benchmarks.scaling.measure_workers",
+		side_effect=lambda db_url, workers, profile: _total(100 * workers),
+	):
+		scaling.main(["--workers", "1,2", "--output", str(output)])
+
+	results = json.loads(output.read_text())
+	assert [row["workers"] for row in results["scaling"]] == [1, 2]
+	assert results["parameters"]["workers"] == [1, 2]
+	assert "speedup" in capsys.readouterr().out
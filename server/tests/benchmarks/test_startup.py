@@ -0,0 +1,78 @@
+"""
+Tests for the cold start measurements
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from benchmarks import startup
+
+
+def test_time_import_runs_in_fresh_interpreter():
+	"""Test that import time is measured in a subprocess"""
+	elapsed = startup.time_import("json")
+
+	assert 0 < elapsed < 5
+
+
+def test_time_first_request_polls_until_ready():
+	"""Test that the server is polled until readiness answers"""
+	responses = [httpx.ConnectError("starting"), httpx.Response(503)]
+	with (
+		patch("benchmarks.startup.subprocess.Popen") as mock_popen,
+		patch(
+			"benchmarks.startup.httpx.get",
+			side_effect=[*responses, httpx.Response(200)],
+		) as mock_get,
+		patch("benchmarks.startup.time.sleep"),
+	):
+		elapsed = startup.time_first_request("sqlite:///unused.db")
+
+	assert elapsed > 0
+	assert mock_get.call_count == 3
+	mock_popen.return_value.terminate.assert_called_once()
+
+
+def test_time_first_request_gives_up(monkeypatch):
+	"""Test that a server that never answers is reported and stopped"""
+	monkeypatch.setattr(startup, "FIRST_REQUEST_TIMEOUT", 0.0)
+	with (
+		patch("benchmarks.startup.subprocess.Popen") as mock_popen,
+		pytest.raises(RuntimeError, match="did not answer"),
+	):
+		startup.time_first_request("sqlite:///unused.db")
+
+	mock_popen.return_value.terminate.assert_called_once()
+
+
+def test_main_writes_results(tmp_path, capsys):
+	"""Test the command line entry point with the server stubbed out"""
+	output = tmp_path / "startup.json"
+
+	with patch(
+		"benchmarks.startup.time_first_request",
+		MagicMock(return_value=0.5),
+	):
+		startup.main(
+			["--runs", "2", "--module", "json", "--output", str(output)]
+		)
+
+	results = json.loads(output.read_text())
+	assert set(results["benchmarks"]) == {
+		"startup.import[json]",
+		"startup.first_request",
+	}
+	assert results["benchmarks"]["startup.first_request"]["median"] == 0.5
+	assert "Results written" in capsys.readouterr().out
+
+
+def test_run_startup_without_server():
+	"""Test that --no-server only measures imports"""
+	results = startup.run_startup(
+		"sqlite:///unused.db", modules=["json"], runs=1, server=False
+	)
+
+	assert list(results["benchmarks"]) == ["startup.import[json]"]
@@ -0,0 +1,76 @@
+"""
+Smoke tests for the microbenchmark suite
+"""
+
+import json
+
+import pytest
+
+from app.core.config import get_settings
+from benchmarks import harness, suite
+
+
+def test_summarize_reports_median_and_throughput():
+	"""Test the statistics kept for every benchmark"""
+	summary = harness.summarize([0.002, 0.001, 0.004])
+
+	assert summary["median"] == 0.002
+	assert summary["min"] == 0.001
+	assert summary["max"] == 0.004
+	assert summary["ops_per_sec"] == pytest.approx(500)
+	assert summary["samples"] == [0.002, 0.001, 0.004]
+
+
+def test_measure_calls_function_for_every_iteration():
+	"""Test that measure runs warmup plus rounds x iterations calls"""
+	calls = []
+
+	summary = harness.measure(
+		lambda: calls.append(1), iterations=3, rounds=2, warmup=1
+	)
+
+	assert len(calls) == 7
+	assert len(summary["samples"]) == 2
+
+
+def test_suite_writes_json_results(tmp_path, capsys):
+	"""Test a minimal end-to-end run against SQLite"""
+	output = tmp_path / "results.json"
+
+	suite.main(
+		[
+			"--fill",
+			"0,20",
+			"--iterations",
+			"2",
+			"--rounds",
+			"2",
+			"--output",
+			str(output),
+		]
+	)
+
+	results = json.loads(output.read_text())
+	assert results["environment"]["dialect"] == "sqlite"
+	assert "crud.get_redirect_target[fill=20]" in results["benchmarks"]
+	assert "schemas.URLBase.validate" in results["benchmarks"]
+	assert "ratelimit.acquire" in results["benchmarks"]
+	assert "Results written to" in capsys.readouterr().out
+
+
+def test_suite_runs_with_derived_secret_keys(tmp_path, monkeypatch):
+	"""Test the admin lookup benchmark when secret keys aren't stored"""
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "server-secret")
+
+	results = suite.run_suite(
+		f"sqlite:///{tmp_path}/bench.db", [0], iterations=2, rounds=1
+	)
+
+	assert "crud.get_db_url_by_secret_key[fill=0]" in results["benchmarks"]
+
+
+def test_git_commit_outside_repository(monkeypatch, tmp_path):
+	"""Test that a missing git checkout doesn't break result metadata"""
+	monkeypatch.chdir(tmp_path)
+
+	assert harness.git_commit() is None
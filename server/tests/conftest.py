@@ -13,6 +13,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 # Import after path is set
 from app.api.deps import get_db
 from app.core.database import Base
+from app.core.hostcache import HOST_CACHE
+from app.core.keyindex import KEY_INDEX
 from app.main import app
 
 # Set test database URL
@@ -50,6 +52,8 @@ def db_session(setup_test_db):
 @pytest.fixture
 def clean_db(db_session):
 	"""Clean all data from tables between tests"""
+	# Cached host ids would refer to deleted hosts
+	HOST_CACHE.clear()
 	# Delete all data from tables
 	for table in reversed(Base.metadata.sorted_tables):
 		db_session.execute(table.delete())
@@ -77,3 +81,10 @@ def client(db_session, clean_db):
 		yield test_client
 
 	app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def key_index():
+	"""Key index, emptied (and unused again) after the test"""
+	yield KEY_INDEX
+	KEY_INDEX.clear()
@@ -0,0 +1,130 @@
+"""
+Unit tests for blocklist.py module
+"""
+
+import logging
+import os
+
+import pytest
+
+from app.core import blocklist
+from app.core.blocklist import Blocklist
+from app.core.metrics import BLOCKLIST_DOMAINS
+
+BLOCKLIST_FILE = """\
+# Phishing feed
+evil.com
+*.Phish.example.ORG.
+0.0.0.0 tracker.net  # hosts file entry
+bücher.de
+
+not a..domain
+"""
+
+
+@pytest.fixture
+def blocked(tmp_path):
+	"""Blocklist loaded from a file with every supported line format"""
+	path = tmp_path / "blocklist.txt"
+	path.write_text(BLOCKLIST_FILE)
+	domains = Blocklist()
+	domains.configure(str(path), reload_interval=0.01)
+	domains.load()
+	yield domains
+	domains.stop()
+
+
+def _touch(path, content):
+	"""Rewrite a file with a later modification time"""
+	mtime = os.stat(path).st_mtime
+	path.write_text(content)
+	os.utime(path, (mtime + 10, mtime + 10))
+
+
+def test_parse_line():
+	"""Test plain, wildcard and hosts file lines, comments and junk"""
+	assert blocklist.parse_line("Evil.com\n") == "evil.com"
+	assert blocklist.parse_line("*.evil.com") == "evil.com"
+	assert blocklist.parse_line("127.0.0.1  evil.com # feed") == "evil.com"
+	assert blocklist.parse_line("# evil.com") is None
+	assert blocklist.parse_line("   \n") is None
+	assert blocklist.parse_line("a..b") is None
+
+
+def test_load_counts_valid_domains(blocked):
+	"""Test that every valid line is one domain, junk lines are skipped"""
+	assert len(blocked) == 4
+	assert BLOCKLIST_DOMAINS.values[()] == 4
+	assert blocked.memory_bytes() > 4 * 8
+
+
+def test_blocked_domain_matches_host_and_parents(blocked):
+	"""Test that a domain blocks its subdomains, not its lookalikes"""
+	assert blocked.blocked_domain("https://evil.com/") == "evil.com"
+	assert blocked.blocked_domain("http://a.b.EVIL.com:8080/x") == "evil.com"
+	assert (
+		blocked.blocked_domain("https://login.phish.example.org/")
+		== "phish.example.org"
+	)
+	assert blocked.blocked_domain("https://bücher.de/") == "xn--bcher-kva.de"
+	assert blocked.blocked_domain("https://notevil.com/") is None
+	assert blocked.blocked_domain("https://evil.com.example.net/") is None
+	assert blocked.blocked_domain("https://example.org/") is None
+	assert blocked.blocked_domain("not a url") is None
+
+
+def test_empty_blocklist_blocks_nothing():
+	"""Test that an unconfigured blocklist is disabled and empty"""
+	domains = Blocklist()
+
+	assert not domains.enabled
+	assert domains.blocked_domain("https://evil.com/") is None
+	domains.start()
+	assert domains._thread is None
+
+
+def test_reload_if_changed(blocked, tmp_path):
+	"""Test that only a modified file is loaded again"""
+	assert blocked.reload_if_changed() is False
+
+	_touch(tmp_path / "blocklist.txt", "other.com\n")
+
+	assert blocked.reload_if_changed() is True
+	assert blocked.blocked_domain("https://evil.com/") is None
+	assert blocked.blocked_domain("https://www.other.com/") == "other.com"
+
+
+def test_failed_load_keeps_previous_list(blocked, tmp_path):
+	"""Test that a missing file leaves the loaded domains in place"""
+	(tmp_path / "blocklist.txt").unlink()
+
+	with pytest.raises(FileNotFoundError):
+		blocked.reload_if_changed()
+
+	assert blocked.blocked_domain("https://evil.com/") == "evil.com"
+
+
+def test_watcher_reloads_in_background(blocked, tmp_path, caplog):
+	"""Test that the watcher thread swaps in a changed file"""
+	path = tmp_path / "blocklist.txt"
+	blocked.start()
+	blocked.start()
+
+	_touch(path, "other.com\n")
+	for _ in range(500):
+		if blocked.blocked_domain("https://other.com/"):
+			break
+		blocked._stop.wait(0.01)
+	assert blocked.blocked_domain("https://other.com/") == "other.com"
+
+	with caplog.at_level(logging.ERROR, logger="app.core.blocklist"):
+		path.unlink()
+		for _ in range(500):
+			if "Blocklist reload failed" in caplog.text:
+				break
+			blocked._stop.wait(0.01)
+	assert "Blocklist reload failed" in caplog.text
+
+	blocked.stop()
+	blocked.stop()
+	assert blocked._thread is None
@@ -0,0 +1,41 @@
+"""
+Unit tests for bots.py module
+"""
+
+import pytest
+
+from app.core.bots import BotClassifier
+
+
+@pytest.fixture
+def classifier():
+	return BotClassifier(["bot", "facebookexternalhit", " ", "Mail.Scan"])
+
+
+@pytest.mark.parametrize(
+	("headers", "expected"),
+	[
+		({"user-agent": "Mozilla/5.0 (X11; Linux x86_64) Firefox/131"}, None),
+		({"user-agent": "Slackbot-LinkExpanding 1.0"}, "bot"),
+		({"user-agent": "facebookexternalhit/1.1"}, "bot"),
+		({"user-agent": "mail.scan/2"}, "bot"),
+		({"user-agent": "MailXScan/2"}, None),
+		({"purpose": "prefetch", "user-agent": "Firefox"}, "prefetch"),
+		({"sec-purpose": "prefetch;prerender"}, "prefetch"),
+		({"x-purpose": "preview"}, "prefetch"),
+		({"x-moz": "prefetch"}, "prefetch"),
+		({"purpose": "navigate"}, None),
+		({}, None),
+	],
+)
+def test_classify(classifier, headers, expected):
+	"""Test prefetch headers and escaped, case-insensitive UA patterns"""
+	assert classifier.classify(headers) == expected
+
+
+def test_no_patterns_only_detects_prefetch():
+	"""Test that an empty pattern list matches no User-Agent"""
+	classifier = BotClassifier([""])
+
+	assert classifier.classify({"user-agent": "Googlebot/2.1"}) is None
+	assert classifier.classify({"purpose": "prefetch"}) == "prefetch"
@@ -0,0 +1,130 @@
+"""
+Unit tests for cache.py module
+"""
+
+from collections import namedtuple
+
+from app.core import cache
+from app.core.cache import RedirectCache
+from app.core.metrics import CACHE_LOOKUPS
+
+Target = namedtuple("Target", ["key", "id", "target_url"])
+
+
+def _lookups(result):
+	return CACHE_LOOKUPS.values.get(("redirect", result), 0)
+
+
+def test_disabled_cache_stores_nothing():
+	"""Test that a size 0 cache is a no-op and records no lookups"""
+	redirects = RedirectCache(max_size=0)
+	misses = _lookups("miss")
+
+	redirects.set("abc", "row")
+
+	assert redirects.get("abc") is None
+	assert len(redirects) == 0
+	assert _lookups("miss") == misses
+
+
+def test_get_returns_stored_value_and_counts_hits():
+	"""Test hits and misses are reported to the metrics registry"""
+	redirects = RedirectCache(max_size=10)
+	hits, misses = _lookups("hit"), _lookups("miss")
+
+	redirects.set("abc", "row")
+
+	assert redirects.get("abc") == "row"
+	assert redirects.get("xyz") is None
+	assert _lookups("hit") == hits + 1
+	assert _lookups("miss") == misses + 1
+
+
+def test_least_recently_used_entry_is_evicted():
+	"""Test that reading an entry protects it from eviction"""
+	redirects = RedirectCache(max_size=2)
+	redirects.set("a", 1)
+	redirects.set("b", 2)
+	redirects.get("a")
+
+	redirects.set("c", 3)
+
+	assert redirects.get("a") == 1
+	assert redirects.get("b") is None
+	assert redirects.get("c") == 3
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+	"""Test that expired entries are dropped on read"""
+	now = [100.0]
+	monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+	redirects = RedirectCache(max_size=10, ttl=5.0)
+	redirects.set("abc", "row")
+
+	now[0] = 105.0
+
+	assert redirects.get("abc") is None
+	assert len(redirects) == 0
+
+
+def test_invalidate_and_clear():
+	"""Test removing one entry and all entries"""
+	redirects = RedirectCache(max_size=10)
+	redirects.set("a", 1)
+	redirects.set("b", 2)
+
+	redirects.invalidate("a")
+	redirects.invalidate("missing")
+	assert redirects.get("a") is None
+	assert redirects.get("b") == 2
+
+	redirects.clear()
+	assert len(redirects) == 0
+
+
+def test_invalidate_where():
+	"""Test removing the entries whose value matches a predicate"""
+	redirects = RedirectCache(max_size=10)
+	for key, value in (("a", 1), ("b", 2), ("c", 3)):
+		redirects.set(key, value)
+
+	assert redirects.invalidate_where(lambda value: value % 2) == 2
+
+	assert redirects.get("a") is None
+	assert redirects.get("b") == 2
+	assert redirects.get("c") is None
+
+
+def test_configure_resizes_and_empties_cache():
+	"""Test that reconfiguring drops entries cached under old settings"""
+	redirects = RedirectCache(max_size=10)
+	redirects.set("a", 1)
+
+	redirects.configure(max_size=5, ttl=1.0)
+
+	assert redirects.enabled
+	assert redirects.ttl == 1.0
+	assert len(redirects) == 0
+
+
+def test_warm_stops_when_cache_is_full():
+	"""Test that warm-up keeps the first (most popular) rows"""
+	redirects = RedirectCache(max_size=2)
+	rows = [Target(f"k{i}", i, f"https://example.com/{i}") for i in range(5)]
+
+	added = redirects.warm(rows)
+
+	assert added == 2
+	assert redirects.get("k0") == rows[0]
+	assert redirects.get("k1") == rows[1]
+	assert redirects.get("k2") is None
+
+
+def test_warm_reports_progress():
+	"""Test that warmed counts the entries added by the last warm-up"""
+	redirects = RedirectCache(max_size=10)
+	rows = [Target(f"k{i}", i, f"https://example.com/{i}") for i in range(3)]
+
+	redirects.warm(rows)
+
+	assert redirects.warmed == 3
@@ -0,0 +1,55 @@
+"""
+Unit tests for hostcache.py module
+"""
+
+from app.core.hostcache import HostCache
+from app.core.metrics import CACHE_LOOKUPS
+
+
+def _lookups(result):
+	return CACHE_LOOKUPS.values.get(("host", result), 0)
+
+
+def test_lookups_both_ways_count_hits_and_misses():
+	"""Test origin to id and id to origin lookups and their metrics"""
+	host_cache = HostCache(max_size=10)
+	hits, misses = _lookups("hit"), _lookups("miss")
+
+	host_cache.add(1, "https://example.com")
+
+	assert host_cache.get_id("https://example.com") == 1
+	assert host_cache.get_origin(1) == "https://example.com"
+	assert host_cache.get_id("https://other.com") is None
+	assert host_cache.get_origin(2) is None
+	assert _lookups("hit") == hits + 2
+	assert _lookups("miss") == misses + 2
+
+
+def test_least_recently_used_host_is_evicted():
+	"""Test that the bound evicts the host looked up least recently"""
+	host_cache = HostCache(max_size=2)
+	host_cache.add(1, "https://a.com")
+	host_cache.add(2, "https://b.com")
+
+	host_cache.get_origin(1)
+	host_cache.add(3, "https://c.com")
+
+	assert len(host_cache) == 2
+	assert host_cache.get_id("https://b.com") is None
+	assert host_cache.get_origin(2) is None
+	assert host_cache.get_id("https://a.com") == 1
+
+
+def test_configure_and_clear_empty_the_cache():
+	"""Test that a size 0 cache stores nothing and clear() drops entries"""
+	host_cache = HostCache()
+	host_cache.add(1, "https://a.com")
+
+	host_cache.configure(max_size=0)
+	host_cache.add(2, "https://b.com")
+
+	assert len(host_cache) == 0
+	host_cache.configure(max_size=10)
+	host_cache.add(1, "https://a.com")
+	host_cache.clear()
+	assert host_cache.get_origin(1) is None
@@ -0,0 +1,310 @@
+"""
+Unit tests for invalidation.py module
+"""
+
+import contextlib
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app import models, schemas
+from app.api import crud
+from app.core import invalidation
+from app.core.cache import REDIRECT_CACHE
+from app.core.config import get_settings
+from app.core.invalidation import CacheInvalidator
+from app.core.metrics import CACHE_INVALIDATIONS
+
+SERVER_DIR = Path(__file__).parent.parent.parent
+
+# Deletes a URL from another process, like a second worker would
+DELETE_SCRIPT = """
+import sys
+from app.api import crud
+from app.core.database import SessionLocal, get_engine
+
+db = SessionLocal(bind=get_engine())
+assert crud.deactivate_db_url_by_secret_key(db, sys.argv[1])
+"""
+
+
+def _target(key, target_url="https://example.com/"):
+	return SimpleNamespace(key=key, target_url=target_url)
+
+
+def _wait_for(condition, timeout=5.0):
+	deadline = time.monotonic() + timeout
+	while not condition():
+		if time.monotonic() > deadline:
+			return False
+		time.sleep(0.01)
+	return True
+
+
+@pytest.fixture
+def invalidator(client, db_session, monkeypatch):
+	"""Invalidator of an enabled redirect cache, with changes recorded"""
+	monkeypatch.setattr(get_settings(), "redirect_cache_size", 100)
+	REDIRECT_CACHE.configure(max_size=100, ttl=60.0)
+	changes = CacheInvalidator()
+	changes.configure(interval=0.02, retention=3600.0, replay=60.0)
+	yield changes
+	changes.stop()
+	REDIRECT_CACHE.configure(max_size=0, ttl=60.0)
+
+
+def _record(db_session, *keys, reversed_domain=None):
+	crud.record_url_changes(db_session, keys, reversed_domain)
+	db_session.commit()
+
+
+def test_poll_evicts_changed_keys(invalidator, db_session):
+	"""Test that recorded keys are evicted once, by the next poll"""
+	evicted = CACHE_INVALIDATIONS.values.get(("key",), 0)
+	assert invalidator.poll(db_session) == 0
+	for key in ("a", "b", "c"):
+		REDIRECT_CACHE.set(key, _target(key))
+
+	_record(db_session, "a", "b")
+
+	assert invalidator.poll(db_session) == 2
+	assert REDIRECT_CACHE.get("a") is None
+	assert REDIRECT_CACHE.get("b") is None
+	assert REDIRECT_CACHE.get("c") is not None
+	assert invalidator.poll(db_session) == 0
+	assert CACHE_INVALIDATIONS.values[("key",)] == evicted + 2
+
+
+def test_poll_evicts_targets_in_changed_domain(invalidator, db_session):
+	"""Test that a takedown evicts every cached target in the domain"""
+	invalidator.poll(db_session)
+	REDIRECT_CACHE.set("a", _target("a", "https://evil.com/x"))
+	REDIRECT_CACHE.set("b", _target("b", "https://login.evil.com/"))
+	REDIRECT_CACHE.set("c", _target("c", "https://evil-twin.com/"))
+
+	_record(db_session, reversed_domain="com.evil")
+	invalidator.poll(db_session)
+
+	assert REDIRECT_CACHE.get("a") is None
+	assert REDIRECT_CACHE.get("b") is None
+	assert REDIRECT_CACHE.get("c") is not None
+
+
+def test_first_poll_replays_recent_changes(invalidator, db_session):
+	"""Test that changes within the replay window apply at startup"""
+	db_session.add_all(
+		[
+			models.URLChange(key="old", created_at=datetime(2020, 1, 1)),
+			models.URLChange(key="new"),
+		]
+	)
+	db_session.commit()
+	REDIRECT_CACHE.set("old", _target("old"))
+	REDIRECT_CACHE.set("new", _target("new"))
+
+	assert invalidator.poll(db_session) == 1
+
+	assert REDIRECT_CACHE.get("old") is not None
+	assert REDIRECT_CACHE.get("new") is None
+
+
+def test_poll_waits_for_skipped_ids(invalidator, db_session, monkeypatch):
+	"""Test that ids committed late are applied until the gap times out"""
+	invalidator.poll(db_session)
+	db_session.add_all(
+		[models.URLChange(id=1, key="a"), models.URLChange(id=3, key="c")]
+	)
+	db_session.commit()
+	invalidator.poll(db_session)
+	REDIRECT_CACHE.set("b", _target("b"))
+
+	# Id 2 commits after id 3 was read
+	db_session.add(models.URLChange(id=2, key="b"))
+	db_session.commit()
+	assert invalidator.poll(db_session) == 1
+	assert REDIRECT_CACHE.get("b") is None
+
+	# A gap that never fills is given up
+	db_session.add(models.URLChange(id=5, key="e"))
+	db_session.commit()
+	monkeypatch.setattr(invalidation, "GAP_TIMEOUT", 0.0)
+	invalidator.poll(db_session)
+	assert invalidator._missing == {}
+
+
+def test_poll_reads_every_batch(invalidator, db_session, monkeypatch):
+	"""Test that a backlog larger than a batch is read in one poll"""
+	monkeypatch.setattr(invalidation, "BATCH_SIZE", 2)
+	invalidator.poll(db_session)
+
+	_record(db_session, "a", "b", "c", "d", "e")
+
+	assert invalidator.poll(db_session) == 5
+
+
+def test_prune_deletes_expired_changes_periodically(invalidator, db_session):
+	"""Test that changes past retention go, at most once per interval"""
+	db_session.add(
+		models.URLChange(key="old", created_at=datetime(2020, 1, 1))
+	)
+	db_session.commit()
+
+	assert invalidator.prune(db_session) == 1
+	db_session.add(
+		models.URLChange(key="old", created_at=datetime(2020, 1, 1))
+	)
+	db_session.commit()
+	assert invalidator.prune(db_session) == 0
+
+
+def test_poll_after_prune_emptied_the_table(invalidator, db_session):
+	"""Test that ids keep growing once every change has been pruned"""
+	invalidator.poll(db_session)
+	_record(db_session, "a", "b", "c")
+	invalidator.poll(db_session)
+	db_session.query(models.URLChange).delete()
+	db_session.commit()
+	REDIRECT_CACHE.set("d", _target("d"))
+
+	_record(db_session, "d")
+
+	assert invalidator.poll(db_session) == 1
+	assert REDIRECT_CACHE.get("d") is None
+
+
+def test_started_invalidator_evicts_within_interval(invalidator, db_session):
+	"""Test the background thread picks up changes from this process"""
+	invalidator.start(db_session.get_bind())
+	invalidator.start(db_session.get_bind())
+	assert invalidator.running
+	assert _wait_for(lambda: invalidator._last_id is not None)
+	REDIRECT_CACHE.set("a", _target("a"))
+
+	_record(db_session, "a")
+
+	assert _wait_for(lambda: "a" not in REDIRECT_CACHE._entries)
+	invalidator.stop()
+	invalidator.stop()
+	assert not invalidator.running
+
+
+def test_deletion_in_another_process_is_evicted(invalidator, db_session):
+	"""Test that a URL deleted by another worker process leaves this cache"""
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/")
+	)
+	key, secret_key = db_url.key, db_url.secret_key
+	db_session.commit()
+	REDIRECT_CACHE.set(key, _target(key))
+	invalidator.start(db_session.get_bind())
+	assert _wait_for(lambda: invalidator._last_id is not None)
+
+	env = dict(
+		os.environ,
+		DB_URL=db_session.get_bind().url.render_as_string(hide_password=False),
+		REDIRECT_CACHE_SIZE="100",
+	)
+	subprocess.run(
+		[sys.executable, "-c", DELETE_SCRIPT, secret_key],
+		cwd=SERVER_DIR,
+		env=env,
+		check=True,
+		timeout=60,
+	)
+
+	assert _wait_for(lambda: key not in REDIRECT_CACHE._entries)
+
+
+class FakeDriverConnection:
+	"""psycopg2-like connection whose notifications come over a socket"""
+
+	def __init__(self):
+		self.reader, self.writer = socket.socketpair()
+		self.autocommit = False
+		self.executed = []
+		self.notifies = []
+
+	def fileno(self):
+		return self.reader.fileno()
+
+	def cursor(self):
+		return contextlib.nullcontext(
+			SimpleNamespace(execute=self.executed.append)
+		)
+
+	def poll(self):
+		self.reader.recv(100)
+		self.notifies.append("notify")
+
+
+class FakeEngine:
+	"""PostgreSQL engine handing out one fake listening connection"""
+
+	dialect = SimpleNamespace(name="postgresql")
+
+	def __init__(self):
+		self.driver_connection = FakeDriverConnection()
+		self.invalidated = False
+		self.closed = False
+
+	def raw_connection(self):
+		return SimpleNamespace(
+			driver_connection=self.driver_connection,
+			invalidate=lambda: setattr(self, "invalidated", True),
+			close=lambda: setattr(self, "closed", True),
+		)
+
+
+def test_listen_and_wait_for_notifications():
+	"""Test LISTENing on the channel and waking up on a notification"""
+	engine = FakeEngine()
+
+	connection = invalidation.listen(engine)
+
+	assert engine.driver_connection.autocommit is True
+	assert engine.driver_connection.executed == ["LISTEN url_changes"]
+	assert invalidation.wait(connection, 0.01) is False
+	engine.driver_connection.writer.send(b"x")
+	assert invalidation.wait(connection, 1.0) is True
+	assert engine.driver_connection.notifies == []
+
+
+def test_run_listens_and_recovers_from_errors(monkeypatch, caplog):
+	"""Test the thread loop: notified polls, then a failure and a retry"""
+	engine = FakeEngine()
+	stop = threading.Event()
+	calls = []
+
+	def poll(db):
+		calls.append(db)
+		if len(calls) == 2:
+			raise RuntimeError("connection lost")
+		if len(calls) == 3:
+			stop.set()
+
+	changes = CacheInvalidator()
+	changes.configure(interval=0.01, retention=3600.0, replay=60.0)
+	monkeypatch.setattr(changes, "poll", poll)
+	monkeypatch.setattr(changes, "prune", lambda db: 0)
+	monkeypatch.setattr(
+		invalidation,
+		"SessionLocal",
+		lambda bind: SimpleNamespace(close=lambda: None),
+	)
+
+	with caplog.at_level(logging.ERROR, logger="app.core.invalidation"):
+		changes._run(engine, stop)
+
+	assert len(calls) == 3
+	assert engine.invalidated
+	assert engine.closed
+	assert "Applying URL changes failed" in caplog.text
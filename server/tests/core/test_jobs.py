@@ -0,0 +1,175 @@
+"""
+Unit tests for jobs.py module
+"""
+
+import logging
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.jobs import JobRunner
+from app.core.metrics import JOB_LAG, JOB_QUEUE_DEPTH, JOB_RESULTS
+
+DB_ERROR = OperationalError("UPDATE urls", {}, Exception("locked"))
+
+
+def _results(result, job="test"):
+	return JOB_RESULTS.values.get((job, result), 0)
+
+
+@pytest.fixture
+def runner():
+	"""Job runner with a "test" job type recording its calls"""
+	jobs = JobRunner()
+	jobs.configure(max_queue=100, workers=2, retries=3, backoff=0.001)
+	jobs.calls = []
+	jobs.register("test", lambda *args: jobs.calls.append(args))
+	yield jobs
+	jobs.stop(timeout=5.0)
+
+
+def test_jobs_run_inline_until_started(runner):
+	"""Test that a runner that isn't started runs jobs in the caller"""
+	inline = _results("inline")
+
+	runner.submit("test", 1, "a")
+
+	assert runner.calls == [(1, "a")]
+	assert _results("inline") == inline + 1
+
+
+def test_started_runner_runs_jobs_in_background(runner):
+	"""Test background runs, queue lag and a drained shutdown"""
+	lags = JOB_LAG.values.get(("test",), [0])[-1]
+	runner.start()
+	runner.start()
+	assert runner.running
+
+	for number in range(50):
+		runner.submit("test", number)
+
+	assert runner.stop(timeout=5.0) == 0
+	assert not runner.running
+	assert sorted(runner.calls) == [(number,) for number in range(50)]
+	assert JOB_LAG.values[("test",)][-1] == lags + 50
+	assert JOB_QUEUE_DEPTH.values[("test",)] == 0
+	assert [t for t in runner._threads if t.is_alive()] == []
+
+
+def test_full_queue_runs_jobs_in_caller(runner):
+	"""Test the caller-runs backpressure of a full queue"""
+	gate, taken = threading.Event(), threading.Event()
+
+	def handler(name):
+		if name == "block":
+			taken.set()
+			gate.wait()
+		runner.calls.append((name, threading.current_thread().name))
+
+	runner.register("test", handler)
+	runner.configure(max_queue=1, workers=1, retries=0, backoff=0.0)
+	runner.start()
+	runner.submit("test", "block")
+	assert taken.wait(5.0)
+
+	runner.submit("test", "queued")
+	runner.submit("test", "inline")
+
+	assert runner.calls == [("inline", threading.current_thread().name)]
+	assert JOB_QUEUE_DEPTH.values[("test",)] == 1
+	gate.set()
+	runner.stop(timeout=5.0)
+	assert [name for name, _ in runner.calls] == ["inline", "block", "queued"]
+
+
+def test_database_errors_are_retried(runner):
+	"""Test that a job failing with a database error is run again"""
+	failures = [DB_ERROR, DB_ERROR]
+
+	def flaky():
+		if failures:
+			raise failures.pop()
+		runner.calls.append("ok")
+
+	runner.register("test", flaky)
+	retried, done = _results("retried"), _results("done")
+
+	runner.submit("test")
+
+	assert runner.calls == ["ok"]
+	assert _results("retried") == retried + 2
+	assert _results("done") == done + 1
+
+
+def test_failing_jobs_are_logged_and_dropped(runner, caplog):
+	"""Test giving up after the retries and not retrying other errors"""
+
+	def broken(error):
+		runner.calls.append(error)
+		raise error
+
+	runner.register("test", broken)
+	failed = _results("failed")
+
+	with caplog.at_level(logging.ERROR, logger="app.core.jobs"):
+		runner.submit("test", DB_ERROR)
+		runner.submit("test", ValueError("bad"))
+
+	assert runner.calls.count(DB_ERROR) == 4
+	assert len(runner.calls) == 5
+	assert _results("failed") == failed + 2
+	assert "failed after 4 attempts" in caplog.text
+
+
+def test_stop_drops_jobs_left_after_deadline(runner, caplog):
+	"""Test that shutdown waits no longer than its deadline"""
+	gate, taken = threading.Event(), threading.Event()
+
+	def slow(number):
+		taken.set()
+		gate.wait()
+
+	runner.register("test", slow)
+	# Full queue: not even the stop signal fits in before the deadline
+	runner.configure(max_queue=3, workers=1, retries=0, backoff=0.0)
+	runner.start()
+	runner.submit("test", 0)
+	assert taken.wait(5.0)
+	for number in range(1, 4):
+		runner.submit("test", number)
+
+	with caplog.at_level(logging.WARNING, logger="app.core.jobs"):
+		assert runner.stop(timeout=0.1) == 3
+
+	assert "Dropped 3 queued jobs" in caplog.text
+	gate.set()
+	assert runner.stop(timeout=0.1) == 0
+
+
+def test_full_queue_does_not_keep_other_types_from_draining(runner):
+	"""Test that every job type gets its stop signal, full queue or not"""
+	gate, taken = threading.Event(), threading.Event()
+
+	def slow(number):
+		taken.set()
+		gate.wait()
+
+	# "blocked" sorts first and its queue is full, so its stop signal
+	# waits until the deadline
+	runner.handlers = {"blocked": slow, "test": runner.handlers["test"]}
+	runner.configure(max_queue=3, workers=1, retries=0, backoff=0.0)
+	runner.start()
+	runner.submit("blocked", 0)
+	assert taken.wait(5.0)
+	for number in range(1, 4):
+		runner.submit("blocked", number)
+	for number in range(2):
+		runner.submit("test", number)
+
+	assert runner.stop(timeout=0.5) == 3
+
+	assert sorted(runner.calls) == [(0,), (1,)]
+	alive = [thread.name for thread in runner._threads if thread.is_alive()]
+	assert alive == ["job-blocked-0"]
+	gate.set()
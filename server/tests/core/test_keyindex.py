@@ -0,0 +1,194 @@
+"""
+Unit tests for app/core/keyindex.py module
+"""
+
+import random
+import string
+from array import array
+
+import pytest
+
+from app.core import keyindex
+from app.core.keyindex import (
+	KeyIndex,
+	block_contains,
+	decode_block,
+	encode_block,
+	merge_sorted,
+	pack,
+)
+from app.core.metrics import KEY_INDEX_BYTES, KEY_INDEX_KEYS
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+	"""Merge pending keys every 4 additions"""
+	monkeypatch.setattr(keyindex, "MIN_PENDING", 4)
+
+
+def test_pack_generated_keys():
+	"""Test that digits and uppercase keys up to 6 chars are packed"""
+	assert pack("0") == 0
+	assert pack("Z") == 35
+	assert pack("ZZZZZZ") == 36**6 - 1
+	assert pack("12345") == int("12345", 36)
+
+
+def test_pack_rejects_other_keys():
+	"""Test that other keys are left to the front-coded blocks"""
+	assert pack("") is None
+	assert pack("abc") is None
+	assert pack("ABCDEFG") is None
+	assert pack("AB-C") is None
+	assert pack("ÀB") is None
+
+
+def test_pack_preserves_order_within_a_length():
+	"""Test that packed values sort like their keys"""
+	keys = sorted(["A0", "09", "ZZ", "B1", "1A"])
+
+	assert [pack(k) for k in keys] == sorted(pack(k) for k in keys)
+
+
+def test_block_round_trip():
+	"""Test that front-coded blocks decode to the same keys"""
+	keys = [b"my-link", b"my-link-2", b"my-list", b"other"]
+
+	block = encode_block(keys)
+
+	assert decode_block(block) == keys
+	assert len(block) < sum(map(len, keys)) + 2 * len(keys)
+
+
+def test_block_contains():
+	"""Test membership inside a block, stopping at larger keys"""
+	block = encode_block([b"alpha", b"beta", b"gamma"])
+
+	assert block_contains(block, b"beta")
+	assert not block_contains(block, b"b")
+	assert not block_contains(block, b"zeta")
+
+
+def test_merge_sorted_skips_duplicates():
+	"""Test that merging keeps the array sorted and unique"""
+	values = array("I", [1, 3, 5])
+
+	merged = merge_sorted(values, [0, 3, 4, 9])
+
+	assert list(merged) == [0, 1, 3, 4, 5, 9]
+
+
+def test_not_ready_until_built():
+	"""Test that a fresh index is empty and not used"""
+	index = KeyIndex()
+
+	assert not index.ready
+	assert len(index) == 0
+	assert "ABCDE" not in index
+
+
+def test_build_indexes_every_kind_of_key():
+	"""Test lookups of packed, front-coded and overlong keys"""
+	index = KeyIndex()
+	long_key = "x" * 300
+
+	count = index.build(["ABCDE", "my-link", long_key, "ABCDE", "42"])
+
+	assert index.ready
+	assert count == 4
+	for key in ("ABCDE", "my-link", long_key, "42"):
+		assert key in index
+	for key in ("ABCDF", "my-lin", "x" * 299, "43", "a"):
+		assert key not in index
+
+
+def test_add_is_visible_before_and_after_merge(small_batches):
+	"""Test that added keys are found pending and once merged"""
+	index = KeyIndex()
+	index.build([])
+
+	for key in ("k-1", "K2", "k-3"):
+		index.add(key)
+	assert "K2" in index
+	assert len(index._pending) == 3
+
+	index.add("k-4")
+
+	assert not index._pending
+	assert len(index) == 4
+	for key in ("k-1", "K2", "k-3", "k-4"):
+		assert key in index
+
+
+def test_add_existing_key_is_ignored(small_batches):
+	"""Test that adding a known key doesn't grow the index"""
+	index = KeyIndex()
+	index.build(["my-key", "ABCDE"])
+
+	index.add("my-key")
+	index.add("ABCDE")
+
+	assert len(index) == 2
+	assert not index._pending
+
+
+def test_merges_split_blocks_and_keep_order(small_batches):
+	"""Test that blocks split as keys arrive in any order"""
+	keys = [f"key-{n:04d}" for n in range(500)]
+	random.Random(1).shuffle(keys)
+	index = KeyIndex()
+	index.build(keys[:100])
+
+	for key in keys[100:]:
+		index.add(key)
+	# Smaller than every key already in the first block
+	index.add("aaa")
+
+	assert len(index) == 501
+	assert len(index._blocks) > 500 // keyindex.BLOCK_SIZE
+	assert index._firsts == sorted(index._firsts)
+	assert all(
+		len(decode_block(block)) <= keyindex.BLOCK_SIZE
+		for block in index._blocks
+	)
+	assert all(key in index for key in keys)
+	assert "aaa" in index
+	assert "key-0500" not in index
+
+
+def test_clear_empties_the_index():
+	"""Test that clear drops the keys and marks the index unused"""
+	index = KeyIndex()
+	index.build(["ABCDE"])
+
+	index.clear()
+
+	assert not index.ready
+	assert "ABCDE" not in index
+
+
+def test_memory_stays_under_16_bytes_per_key():
+	"""Test the footprint of a realistic mix of generated and custom keys"""
+	rng = random.Random(7)
+	alphabet = string.ascii_uppercase + string.digits
+	generated = {"".join(rng.choices(alphabet, k=5)) for _ in range(100000)}
+	words = ["promo", "docs", "launch", "summer", "team", "blog", "event"]
+	custom = {
+		f"{rng.choice(words)}-{rng.choice(words)}-{n}" for n in range(10000)
+	}
+	index = KeyIndex()
+
+	count = index.build(generated | custom)
+
+	assert count == len(generated) + len(custom)
+	assert index.memory_bytes() / count < 16
+
+
+def test_build_reports_metrics():
+	"""Test that keys and memory are exported as gauges"""
+	index = KeyIndex()
+
+	index.build(["ABCDE", "my-key"])
+
+	assert KEY_INDEX_KEYS.values[()] == 2
+	assert KEY_INDEX_BYTES.values[()] == index.memory_bytes()
@@ -0,0 +1,228 @@
+"""
+Unit tests for metrics.py module
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from app.core import metrics
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+
+
+def _registry():
+	registry = Registry()
+	counter = registry.register(Counter("hits_total", "Hits.", ("route",)))
+	histogram = registry.register(
+		Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+	)
+	return registry, counter, histogram
+
+
+def test_counter_renders_labels_and_value():
+	"""Test that counters render one sample per label combination"""
+	registry, counter, _ = _registry()
+
+	counter.inc("/a")
+	counter.inc("/a")
+	counter.inc("/b", amount=3)
+
+	output = registry.render()
+	assert "# TYPE hits_total counter" in output
+	assert 'hits_total{route="/a"} 2' in output
+	assert 'hits_total{route="/b"} 3' in output
+
+
+def test_histogram_renders_cumulative_buckets():
+	"""Test that histogram buckets are cumulative and end with +Inf"""
+	registry, _, histogram = _registry()
+
+	histogram.observe(0.05)
+	histogram.observe(0.5)
+	histogram.observe(5.0)
+
+	output = registry.render()
+	assert 'latency_seconds_bucket{le="0.1"} 1' in output
+	assert 'latency_seconds_bucket{le="1.0"} 2' in output
+	assert 'latency_seconds_bucket{le="+Inf"} 3' in output
+	assert "latency_seconds_count 3" in output
+
+
+def test_gauge_renders_last_value_summed_over_workers(tmp_path):
+	"""Test that a gauge keeps its last value and sums process dumps"""
+	registry = Registry()
+	gauge = registry.register(Gauge("depth", "Depth.", ("job",)))
+	registry.configure(str(tmp_path), flush_interval=1.0)
+	gauge.set(5, "click")
+	gauge.set(2, "click")
+	(tmp_path / f"{os.getppid()}.json").write_text(
+		json.dumps({"depth": [[["click"], 3]]})
+	)
+
+	output = registry.render()
+	assert "# TYPE depth gauge" in output
+	assert 'depth{job="click"} 5' in output
+
+
+def test_collect_merges_other_worker_dumps(tmp_path):
+	"""Test that values dumped by other workers are added to our own"""
+	registry, counter, histogram = _registry()
+	registry.configure(str(tmp_path), flush_interval=1.0)
+	counter.inc("/a")
+	histogram.observe(0.05)
+
+	other_worker = {
+		"hits_total": [[["/a"], 4]],
+		"latency_seconds": [[[], [0, 1, 0, 0.5, 1]]],
+	}
+	(tmp_path / f"{os.getppid()}.json").write_text(json.dumps(other_worker))
+
+	merged = registry.collect()
+	assert merged["hits_total"][("/a",)] == 5
+	assert merged["latency_seconds"][()] == [1, 1, 0, 0.55, 2]
+
+
+def test_flush_writes_process_dump(tmp_path):
+	"""Test that flush writes this process' values to the metrics dir"""
+	registry, counter, _ = _registry()
+	registry.configure(str(tmp_path), flush_interval=1.0)
+	counter.inc("/a")
+
+	registry.flush()
+
+	dumps = list(tmp_path.glob("*.json"))
+	assert len(dumps) == 1
+	assert json.loads(dumps[0].read_text())["hits_total"] == [[["/a"], 1]]
+
+
+def test_collect_skips_unreadable_and_unknown_dumps(tmp_path):
+	"""Test that broken dumps and unknown metrics are ignored"""
+	registry, counter, _ = _registry()
+	registry.configure(str(tmp_path), flush_interval=1.0)
+	counter.inc("/a")
+	(tmp_path / "1.json").write_text("{not json")
+	(tmp_path / "2.json").write_text(json.dumps({"gone_total": [[[], 1]]}))
+
+	merged = registry.collect()
+
+	assert merged == {"hits_total": {("/a",): 1}, "latency_seconds": {}}
+
+
+def test_retire_keeps_counters_and_drops_gauges(tmp_path):
+	"""Test that an exited worker's totals stay and its gauges go"""
+	registry, _, _ = _registry()
+	registry.register(Gauge("depth", "Depth."))
+	registry.configure(str(tmp_path), flush_interval=1.0)
+	for pid, hits in ((999998, 2), (999999, 3)):
+		(tmp_path / f"{pid}.json").write_text(
+			json.dumps(
+				{
+					"hits_total": [[["/a"], hits]],
+					"latency_seconds": [[[], [1, 0, 0, 0.05, 1]]],
+					"depth": [[[], 4]],
+				}
+			)
+		)
+
+	registry.retire(999998)
+	registry.retire(999999)
+	registry.retire(999997)
+
+	assert [path.name for path in tmp_path.glob("*.json")] == ["retired.json"]
+	merged = registry.collect()
+	assert merged["hits_total"][("/a",)] == 5
+	assert merged["latency_seconds"][()] == [2, 0, 0, 0.1, 2]
+	assert merged["depth"] == {}
+
+
+def exited_pid() -> int:
+	process = subprocess.Popen([sys.executable, "-c", ""])
+	process.wait()
+	return process.pid
+
+
+def test_collect_retires_dumps_of_exited_workers(tmp_path):
+	"""Test that a dead worker's dump is retired without the launcher"""
+	registry = Registry()
+	counter = registry.register(Counter("hits_total", "Hits.", ("route",)))
+	gauge = registry.register(Gauge("depth", "Depth."))
+	registry.configure(str(tmp_path), flush_interval=1.0)
+	gauge.set(1)
+	dump = {"hits_total": [[["/a"], 2]], "depth": [[[], 4]]}
+	for pid in (exited_pid(), os.getppid()):
+		(tmp_path / f"{pid}.json").write_text(json.dumps(dump))
+
+	merged = registry.collect()
+	assert merged["hits_total"][("/a",)] == 4
+	assert merged["depth"][()] == 5
+	assert sorted(path.name for path in tmp_path.glob("*.json")) == sorted(
+		[f"{os.getppid()}.json", "retired.json"]
+	)
+	counter.inc("/a")
+	assert registry.collect()["hits_total"][("/a",)] == 5
+
+
+def test_retire_without_metrics_dir_is_noop():
+	"""Test that single-process mode has no dumps to retire"""
+	registry, _, _ = _registry()
+
+	registry.retire(999999)
+
+	assert registry.metrics_dir is None
+
+
+def test_maybe_flush_respects_interval(tmp_path):
+	"""Test that dumps are rate limited to one per flush interval"""
+	registry, counter, _ = _registry()
+	registry.configure(str(tmp_path), flush_interval=60.0)
+	registry.maybe_flush()
+	counter.inc("/a")
+
+	registry.maybe_flush()
+
+	dump = next(tmp_path.glob("*.json"))
+	assert json.loads(dump.read_text())["hits_total"] == []
+
+
+def test_flush_without_metrics_dir_is_noop(tmp_path):
+	"""Test that single-process mode never writes dumps"""
+	registry, _, _ = _registry()
+
+	registry.flush()
+
+	assert registry.metrics_dir is None
+
+
+def test_record_cache_lookup_counts_hits_and_misses():
+	"""Test that cache lookups are counted by result"""
+	from app.core.metrics import CACHE_LOOKUPS, record_cache_lookup
+
+	before = CACHE_LOOKUPS.values.get(("test", "hit"), 0)
+
+	record_cache_lookup("test", hit=True)
+	record_cache_lookup("test", hit=False)
+
+	assert CACHE_LOOKUPS.values[("test", "hit")] == before + 1
+	assert CACHE_LOOKUPS.values[("test", "miss")] >= 1
+
+
+def test_statements_without_context_are_not_timed():
+	"""Test that a statement with no execution context is skipped"""
+	selects = metrics.DB_QUERIES.values.get(("SELECT",), 0)
+
+	metrics._before_cursor_execute(None, None, "SELECT 1", (), None)
+	metrics._after_cursor_execute(None, None, "SELECT 1", (), None)
+
+	assert metrics.DB_QUERIES.values.get(("SELECT",), 0) == selects
+
+
+def test_empty_statement_is_counted_as_other():
+	"""Test that a blank statement doesn't break the query listener"""
+	context = type("Context", (), {})()
+	others = metrics.DB_QUERIES.values.get(("OTHER",), 0)
+
+	metrics._before_cursor_execute(None, None, "  ", (), context)
+	metrics._after_cursor_execute(None, None, "  ", (), context)
+
+	assert metrics.DB_QUERIES.values[("OTHER",)] == others + 1
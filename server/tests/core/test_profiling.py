@@ -0,0 +1,131 @@
+"""
+Unit tests for profiling.py module
+"""
+
+import json
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core import profiling
+
+
+@pytest.fixture
+def profiled_app(db_session):
+	"""Minimal app running two statements per request under profiling"""
+	profiling.instrument_engines()
+	app = FastAPI()
+
+	def get_session():
+		yield db_session
+
+	@app.get("/queries")
+	def run_queries(db=Depends(get_session)):
+		db.execute(text("SELECT 1"))
+		db.execute(text("SELECT 2"))
+		return {}
+
+	@app.get("/admin/{secret_key}")
+	def run_admin_queries(secret_key: str, db=Depends(get_session)):
+		db.execute(text("SELECT 1"))
+		return {}
+
+	@app.get("/failing")
+	def run_failing_query(db=Depends(get_session)):
+		with pytest.raises(OperationalError):
+			db.execute(text("SELECT * FROM no_such_table"))
+		db.rollback()
+		db.execute(text("SELECT 1"))
+		return {}
+
+	return app
+
+
+def test_server_timing_header_reports_queries(profiled_app):
+	"""Test that the response carries query count and DB time"""
+	profiled_app.add_middleware(profiling.ProfilingMiddleware)
+
+	with TestClient(profiled_app) as test_client:
+		response = test_client.get("/queries")
+
+	header = response.headers["server-timing"]
+	assert 'desc="2 queries"' in header
+	assert "db-slowest;dur=" in header
+	assert "total;dur=" in header
+
+
+def test_failed_query_is_not_counted(profiled_app):
+	"""Test that a statement failing in the driver isn't recorded"""
+	profiled_app.add_middleware(profiling.ProfilingMiddleware)
+
+	with TestClient(profiled_app) as test_client:
+		response = test_client.get("/failing")
+
+	assert 'desc="1 queries"' in response.headers["server-timing"]
+
+
+def test_slow_request_is_logged(profiled_app, caplog):
+	"""Test that requests above the threshold produce a JSON log line"""
+	profiled_app.add_middleware(
+		profiling.ProfilingMiddleware, slow_request_ms=1e-9
+	)
+
+	with (
+		caplog.at_level(logging.WARNING, logger="app.profiling"),
+		TestClient(profiled_app) as test_client,
+	):
+		test_client.get("/queries")
+
+	record = json.loads(caplog.records[-1].getMessage())
+	assert record["event"] == "slow_request_sql"
+	assert record["route"] == "/queries"
+	assert record["query_count"] == 2
+	assert record["slowest_statement"].startswith("SELECT")
+
+
+def test_slow_request_log_hides_path_parameters(profiled_app, caplog):
+	"""Test that the logged route is the template, not the secret key"""
+	profiled_app.add_middleware(
+		profiling.ProfilingMiddleware, slow_request_ms=1e-9
+	)
+
+	with (
+		caplog.at_level(logging.WARNING, logger="app.profiling"),
+		TestClient(profiled_app) as test_client,
+	):
+		test_client.get("/admin/ABCDE_SECRET")
+
+	message = caplog.records[-1].getMessage()
+	assert json.loads(message)["route"] == "/admin/{secret_key}"
+	assert "SECRET" not in message
+
+
+def test_fast_request_is_not_logged(profiled_app, caplog):
+	"""Test that requests below the threshold are not logged"""
+	profiled_app.add_middleware(
+		profiling.ProfilingMiddleware, slow_request_ms=60_000
+	)
+
+	with (
+		caplog.at_level(logging.WARNING, logger="app.profiling"),
+		TestClient(profiled_app) as test_client,
+	):
+		test_client.get("/queries")
+
+	assert not caplog.records
+
+
+def test_server_timing_formats_milliseconds():
+	"""Test the Server-Timing value built from a profile"""
+	profile = profiling.RequestProfile()
+	profile.record("SELECT 1", 0.002)
+	profile.record("UPDATE urls", 0.003)
+
+	assert profile.server_timing(0.010) == (
+		'db;dur=5.00;desc="2 queries", db-slowest;dur=3.00, total;dur=10.00'
+	)
+	assert profile.slowest_statement == "UPDATE urls"
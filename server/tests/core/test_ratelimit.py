@@ -0,0 +1,180 @@
+"""
+Unit tests for ratelimit.py module
+"""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_db
+from app.core import ratelimit
+from app.core.config import get_settings
+from app.core.metrics import RATE_LIMITED
+from app.core.ratelimit import LIMITER, RateLimiter, classify
+from app.main import create_app
+
+
+@pytest.fixture
+def clock(monkeypatch):
+	"""Controllable time.monotonic for the limiter"""
+	now = [1000.0]
+	monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+	return now
+
+
+@pytest.fixture
+def reset_limiter():
+	"""Leave the shared limiter without budgets after the test"""
+	yield
+	LIMITER.configure(65536, {})
+
+
+def test_burst_then_refill(clock):
+	"""Test that a bucket allows its burst and refills at its rate"""
+	limiter = RateLimiter(slots=64)
+	limiter.configure(64, {"create": (2.0, 3)})
+
+	assert [limiter.acquire("create", "a") for _ in range(3)] == [0.0] * 3
+	assert limiter.acquire("create", "a") == pytest.approx(0.5)
+
+	clock[0] += 0.5
+	assert limiter.acquire("create", "a") == 0.0
+	assert limiter.acquire("create", "a") == pytest.approx(0.5)
+
+	clock[0] += 60
+	assert [limiter.acquire("create", "a") for _ in range(3)] == [0.0] * 3
+	assert limiter.acquire("create", "a") > 0
+
+
+def test_budgets_and_clients_are_independent(clock):
+	"""Test that each (budget, client) pair has its own bucket"""
+	limiter = RateLimiter(slots=64)
+	limiter.configure(64, {"create": (1.0, 1), "redirect": (1.0, 1)})
+
+	assert limiter.acquire("create", "a") == 0.0
+	assert limiter.acquire("create", "a") > 0
+
+	assert limiter.acquire("redirect", "a") == 0.0
+	assert limiter.acquire("create", "b") == 0.0
+
+
+def test_table_size_is_fixed_under_many_clients(clock):
+	"""Test that new clients evict the least recently updated buckets"""
+	limiter = RateLimiter(slots=4)
+	limiter.configure(4, {"create": (1.0, 1)})
+	size = len(limiter._table)
+
+	assert limiter.acquire("create", "old") == 0.0
+	assert limiter.acquire("create", "old") > 0
+	for i in range(100):
+		clock[0] += 0.001
+		assert limiter.acquire("create", f"client-{i}") == 0.0
+
+	assert len(limiter._table) == size
+	# Evicted, so the old client starts over with a full bucket
+	assert limiter.acquire("create", "old") == 0.0
+
+
+@pytest.mark.filterwarnings(
+	"ignore:This process .* is multi-threaded:DeprecationWarning"
+)
+def test_forked_processes_share_buckets():
+	"""Test that a bucket drained by a child is empty in the parent"""
+	limiter = RateLimiter(slots=64)
+	limiter.configure(64, {"create": (0.001, 2)})
+
+	pid = os.fork()
+	if pid == 0:
+		limiter.acquire("create", "a")
+		limiter.acquire("create", "a")
+		os._exit(0)
+	os.waitpid(pid, 0)
+
+	assert limiter.acquire("create", "a") > 0
+
+
+@pytest.mark.parametrize(
+	("method", "path", "budget"),
+	[
+		("POST", "/url", "create"),
+		("GET", "/url", "redirect"),
+		("GET", "/abc12", "redirect"),
+		("HEAD", "/abc12", "redirect"),
+		("POST", "/abc12", None),
+		("GET", "/peek/abc12", "redirect"),
+		("GET", "/url/suggest", "redirect"),
+		("POST", "/peek/batch", "redirect"),
+		("GET", "/admin/abc12_SECRET", "admin"),
+		("DELETE", "/admin/abc12_SECRET", "admin"),
+		("GET", "/health", None),
+		("GET", "/health/live", None),
+		("GET", "/metrics", None),
+		("GET", "/docs", None),
+		("GET", "/", None),
+	],
+)
+def test_classify(method, path, budget):
+	"""Test the budget each route counts against"""
+	assert classify(method, path) == budget
+
+
+def _limited_client(db_session, **update):
+	settings = get_settings().model_copy(
+		update={
+			"rate_limit_enabled": True,
+			"rate_limit_create_per_minute": 1.0,
+			"rate_limit_create_burst": 1,
+			**update,
+		}
+	)
+	app = create_app(settings)
+
+	def override_get_db():
+		yield db_session
+
+	app.dependency_overrides[get_db] = override_get_db
+	return TestClient(app)
+
+
+def test_middleware_rejects_clients_over_budget(
+	db_session, clean_db, reset_limiter
+):
+	"""Test the 429 response, its Retry-After header and the metric"""
+	client = _limited_client(db_session)
+	limited = RATE_LIMITED.values.get(("create",), 0)
+	payload = {"target_url": "https://example.com"}
+
+	assert client.post("/url", json=payload).status_code == 201
+	response = client.post("/url", json=payload)
+
+	assert response.status_code == 429
+	assert response.json() == {"detail": "Too many requests"}
+	assert response.headers["retry-after"] == "60"
+	assert RATE_LIMITED.values[("create",)] == limited + 1
+	# Unlimited routes are never rejected
+	assert client.get("/health/live").status_code == 200
+
+
+def test_middleware_identifies_clients_by_key_header(
+	db_session, clean_db, reset_limiter
+):
+	"""Test that clients behind one IP get separate buckets per key"""
+	client = _limited_client(db_session, rate_limit_key_header="X-API-Key")
+	payload = {"target_url": "https://example.com"}
+
+	def create(key):
+		return client.post("/url", json=payload, headers={"X-API-Key": key})
+
+	assert create("first").status_code == 201
+	assert create("first").status_code == 429
+	assert create("second").status_code == 201
+	# Requests without the header fall back to the IP address
+	assert client.post("/url", json=payload).status_code == 201
+
+
+def test_middleware_client_without_address():
+	"""Test that requests without a client address share one bucket"""
+	middleware = ratelimit.RateLimitMiddleware(None)
+
+	assert middleware.client_id({"headers": [], "client": None}) == "unknown"
@@ -0,0 +1,48 @@
+"""
+Unit tests for redirects.py module
+"""
+
+from types import SimpleNamespace
+
+from app.core.config import get_settings
+from app.core.redirects import RedirectTarget, cache_control, resolve
+
+
+def _row(**policy):
+	return SimpleNamespace(
+		key="abc12",
+		id=7,
+		target_url="https://example.com",
+		**{"redirect_status": None, "cache_max_age": None, **policy},
+	)
+
+
+def test_cache_control():
+	"""Test the header of cacheable and uncacheable redirects"""
+	assert cache_control(0) == "no-store"
+	assert cache_control(300) == "public, max-age=300"
+
+
+def test_resolve_uses_global_defaults():
+	"""Test that NULL policy columns fall back to the settings"""
+	settings = get_settings().model_copy(
+		update={"redirect_status_code": 302, "redirect_max_age": 120}
+	)
+
+	assert resolve(_row(), settings) == RedirectTarget(
+		key="abc12",
+		id=7,
+		target_url="https://example.com",
+		status_code=302,
+		cache_control="public, max-age=120",
+	)
+
+
+def test_resolve_prefers_per_link_policy():
+	"""Test that a link's own policy, including max-age 0, wins"""
+	settings = get_settings().model_copy(update={"redirect_max_age": 120})
+
+	target = resolve(_row(redirect_status=308, cache_max_age=0), settings)
+
+	assert target.status_code == 308
+	assert target.cache_control == "no-store"
@@ -0,0 +1,137 @@
+"""
+Unit tests for sampler.py module
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+
+from app.core.sampler import SamplingProfiler, collapse_stack
+
+
+def _busy_loop(stop: threading.Event):
+	while not stop.is_set():
+		sum(range(1000))
+
+
+def test_collapse_stack_goes_from_root_to_leaf():
+	"""Test that collapsed stacks end with the innermost function"""
+	stack = collapse_stack(sys._getframe())
+
+	assert stack.endswith(
+		"test_sampler:test_collapse_stack_goes_from_root_to_leaf"
+	)
+	assert ";" in stack
+
+
+def test_session_collects_stacks_of_busy_threads(tmp_path):
+	"""Test that a session records samples from a working thread"""
+	profiler = SamplingProfiler()
+	profiler.configure(0.0, 0.001, str(tmp_path), 10)
+	stop = threading.Event()
+	worker = threading.Thread(target=_busy_loop, args=(stop,))
+	worker.start()
+
+	session_id = profiler.start_session()
+	time.sleep(0.05)
+	stack_counts = profiler.stop_session(session_id)
+	stop.set()
+	worker.join()
+
+	assert any("_busy_loop" in stack for stack in stack_counts)
+
+
+def test_save_and_load_collapsed_profile(tmp_path):
+	"""Test that saved profiles round-trip in collapsed stack format"""
+	profiler = SamplingProfiler()
+	profiler.configure(0.0, 0.001, str(tmp_path), 10)
+
+	profile_id = profiler.save(Counter({"a:main;a:work": 3}), "GET /abc")
+
+	assert profile_id in profiler.list_profiles()
+	assert profiler.load(profile_id) == "a:main;a:work 3\n"
+
+
+def test_save_prunes_oldest_profiles(tmp_path):
+	"""Test that only the newest max_files profiles are kept"""
+	profiler = SamplingProfiler()
+	profiler.configure(0.0, 0.001, str(tmp_path), 2)
+
+	ids = [profiler.save(Counter({"a:b": 1}), f"GET /{i}") for i in range(3)]
+
+	assert profiler.list_profiles() == [ids[2], ids[1]]
+
+
+def test_load_rejects_path_traversal(tmp_path):
+	"""Test that profile ids can't escape the profile directory"""
+	profiler = SamplingProfiler()
+	profiler.configure(0.0, 0.001, str(tmp_path), 10)
+
+	assert profiler.load("../secrets") is None
+
+
+def test_list_profiles_without_directory(tmp_path):
+	"""Test that listing works before any profile was saved"""
+	profiler = SamplingProfiler()
+	profiler.configure(0.0, 0.001, str(tmp_path / "missing"), 10)
+
+	assert profiler.list_profiles() == []
+
+
+def test_session_is_closed_when_request_fails():
+	"""Test that a failing request doesn't leave its session open"""
+	import asyncio
+
+	import pytest
+
+	from app.core.sampler import SamplingProfilerMiddleware
+
+	profiler = SamplingProfiler()
+	profiler.sample_rate = 1.0
+
+	async def failing_app(scope, receive, send):
+		raise RuntimeError("boom")
+
+	middleware = SamplingProfilerMiddleware(failing_app, profiler)
+	scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+
+	with pytest.raises(RuntimeError):
+		asyncio.run(middleware(scope, None, None))
+
+	assert profiler._sessions == {}
+
+
+def test_profile_is_saved_off_the_event_loop(tmp_path):
+	"""Test that writing the profile doesn't block the event loop thread"""
+	import asyncio
+
+	from app.core.sampler import SamplingProfilerMiddleware
+
+	profiler = SamplingProfiler()
+	profiler.configure(1.0, 0.001, str(tmp_path), max_files=10)
+	save = profiler.save
+	save_threads = []
+
+	def recording_save(stack_counts, label):
+		save_threads.append(threading.get_ident())
+		return save(stack_counts, label)
+
+	profiler.save = recording_save
+	sent = []
+
+	async def app(scope, receive, send):
+		await send({"type": "http.response.start", "status": 200})
+
+	async def send(message):
+		sent.append(message)
+
+	middleware = SamplingProfilerMiddleware(app, profiler)
+	scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+
+	asyncio.run(middleware(scope, None, send))
+
+	assert len(save_threads) == 1
+	assert save_threads[0] != threading.get_ident()
+	profile_id = dict(sent[0]["headers"])[b"x-profile-id"].decode()
+	assert profiler.load(profile_id) is not None
@@ -0,0 +1,68 @@
+"""
+Unit tests for security.py module
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.security import (
+	derive_secret_key,
+	get_secret_key,
+	is_secret_key,
+)
+
+
+@pytest.fixture
+def server_secret(monkeypatch):
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "server-secret")
+
+
+def test_derive_secret_key_without_server_secret(monkeypatch):
+	"""Test that nothing is derived while secret_key_hmac is unset"""
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "")
+
+	assert derive_secret_key("abc12") is None
+
+
+def test_derived_secret_key_format(server_secret):
+	"""Test that the key can be split off at the last underscore"""
+	secret_key = derive_secret_key("my_key")
+
+	key, _, mac = secret_key.rpartition("_")
+	assert key == "my_key"
+	assert len(mac) == 16
+	assert mac.isalnum()
+	assert mac.isupper()
+	assert derive_secret_key("my_key") == secret_key
+	assert derive_secret_key("my_kez") != secret_key
+
+
+def test_derived_secret_key_depends_on_server_secret(monkeypatch):
+	"""Test that another server secret yields another secret key"""
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "one")
+	first = derive_secret_key("abc12")
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "two")
+
+	assert derive_secret_key("abc12") != first
+
+
+def test_stored_secret_key_takes_precedence(server_secret):
+	"""Test that rows created before the option keep their secret key"""
+	legacy = SimpleNamespace(key="abc12", secret_key="abc12_RANDOM12")
+	derived = SimpleNamespace(key="abc12", secret_key=None)
+
+	assert get_secret_key(legacy) == "abc12_RANDOM12"
+	assert is_secret_key(legacy, "abc12_RANDOM12")
+	assert not is_secret_key(legacy, derive_secret_key("abc12"))
+	assert get_secret_key(derived) == derive_secret_key("abc12")
+	assert is_secret_key(derived, derive_secret_key("abc12"))
+	assert not is_secret_key(derived, "abc12_RANDOM12")
+
+
+def test_is_secret_key_without_any_secret(monkeypatch):
+	"""Test that a row without stored or derivable secret never matches"""
+	monkeypatch.setattr(get_settings(), "secret_key_hmac", "")
+
+	assert not is_secret_key(SimpleNamespace(key="a", secret_key=None), "a_")
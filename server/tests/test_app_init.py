@@ -0,0 +1,23 @@
+"""
+Unit tests for app/__init__.py module
+"""
+
+import pytest
+
+
+def test_package_attributes_are_imported_on_access():
+	"""Test that models, schemas and Base are available from the package"""
+	import app
+	from app.core.database import Base
+
+	assert app.models.URL.__tablename__ == "urls"
+	assert app.schemas.URLBase is not None
+	assert app.Base is Base
+
+
+def test_unknown_package_attribute_raises():
+	"""Test that other names still raise AttributeError"""
+	import app
+
+	with pytest.raises(AttributeError, match="no attribute 'missing'"):
+		_ = app.missing
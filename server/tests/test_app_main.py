@@ -0,0 +1,244 @@
+"""
+Unit tests for app/main.py module
+"""
+
+import logging
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+from app import schemas
+from app.api import crud
+from app.core import database
+from app.core.blocklist import BLOCKLIST
+from app.core.cache import REDIRECT_CACHE
+from app.core.config import get_settings
+from app.core.invalidation import INVALIDATOR
+from app.core.jobs import JOBS
+from app.core.keyindex import KEY_INDEX
+from app.core.profiling import ProfilingMiddleware
+from app.main import build_key_index, create_app, load_blocklist, warm_up
+
+
+@pytest.fixture
+def reset_cache():
+	"""Leave the redirect cache disabled after the test"""
+	yield
+	REDIRECT_CACHE.configure(max_size=0, ttl=60.0)
+
+
+def test_profiling_middleware_installed_when_enabled():
+	"""Test that PROFILING_ENABLED adds the Server-Timing middleware"""
+	settings = get_settings().model_copy(update={"profiling_enabled": True})
+
+	app = create_app(settings)
+
+	middleware = [m.cls for m in app.user_middleware]
+	assert ProfilingMiddleware in middleware
+	assert app.state.settings is settings
+
+
+def test_create_app_does_not_create_engine(monkeypatch):
+	"""Test that building the app leaves the engine to the lifespan"""
+	monkeypatch.setitem(database._state, "engine", None)
+
+	create_app(get_settings())
+
+	assert database._state["engine"] is None
+
+
+def test_lifespan_creates_and_disposes_engine(monkeypatch, tmp_path):
+	"""Test that the engine and job threads live from startup to shutdown"""
+	monkeypatch.setitem(database._state, "engine", None)
+	settings = get_settings().model_copy(
+		update={"db_url": f"sqlite:///{tmp_path}/lifespan.db"}
+	)
+
+	with TestClient(create_app(settings)) as client:
+		assert str(database._state["engine"].url) == settings.db_url
+		assert client.get("/health/live").status_code == 200
+		assert JOBS.running
+
+	assert database._state["engine"] is None
+	assert not JOBS.running
+	assert not INVALIDATOR.running
+
+
+def test_lifespan_runs_cache_invalidation_with_redirect_cache(
+	monkeypatch, tmp_path, reset_cache
+):
+	"""Test that workers with a redirect cache apply other workers' changes"""
+	monkeypatch.setitem(database._state, "engine", None)
+	settings = get_settings().model_copy(
+		update={
+			"db_url": f"sqlite:///{tmp_path}/lifespan.db",
+			"redirect_cache_size": 10,
+			"redirect_cache_ttl": 30.0,
+			"cache_invalidation_interval": 0.25,
+		}
+	)
+
+	with TestClient(create_app(settings)):
+		assert INVALIDATOR.running
+		assert INVALIDATOR.interval == 0.25
+		assert INVALIDATOR.replay == 30.0
+
+	assert not INVALIDATOR.running
+
+
+def test_warm_up_fills_pool_and_redirect_cache(
+	client, db_session, monkeypatch, reset_cache
+):
+	"""Test that warm-up opens connections and caches popular URLs"""
+	engine = db_session.get_bind()
+	monkeypatch.setitem(database._state, "engine", engine)
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/warm")
+	)
+	settings = get_settings().model_copy(
+		update={
+			"db_pool_prewarm": 2,
+			"redirect_cache_size": 10,
+			"redirect_cache_warm": 5,
+		}
+	)
+	REDIRECT_CACHE.configure(max_size=10, ttl=60.0)
+
+	with patch.object(
+		database, "prewarm_pool", wraps=database.prewarm_pool
+	) as mock_prewarm:
+		warm_up(settings)
+
+	mock_prewarm.assert_called_once_with(engine, 2)
+	assert REDIRECT_CACHE.get(db_url.key).target_url == (
+		"https://example.com/warm"
+	)
+
+
+def test_warm_up_survives_database_errors(monkeypatch, caplog, reset_cache):
+	"""Test that a worker still starts when the database is down"""
+	settings = get_settings().model_copy(update={"redirect_cache_size": 10})
+	REDIRECT_CACHE.configure(max_size=10, ttl=60.0)
+	monkeypatch.setattr(database, "get_engine", lambda settings: None)
+
+	with (
+		patch.object(
+			database,
+			"prewarm_pool",
+			side_effect=OperationalError("SELECT 1", {}, Exception("down")),
+		),
+		caplog.at_level(logging.ERROR, logger="app.main"),
+	):
+		warm_up(settings)
+
+	assert "Warm-up failed" in caplog.text
+
+
+def test_create_app_configures_redirect_cache(reset_cache):
+	"""Test that the cache is sized from the settings"""
+	settings = get_settings().model_copy(
+		update={"redirect_cache_size": 50, "redirect_cache_ttl": 5.0}
+	)
+
+	app = create_app(settings)
+
+	assert REDIRECT_CACHE.max_size == 50
+	assert REDIRECT_CACHE.ttl == 5.0
+	assert app.state.cache_preloaded is False
+
+
+def test_warm_up_skips_cache_preloaded_before_fork(monkeypatch, reset_cache):
+	"""Test that workers don't refill a cache inherited from the master"""
+	settings = get_settings().model_copy(update={"redirect_cache_size": 10})
+	monkeypatch.setattr(database, "get_engine", lambda settings: None)
+
+	with (
+		patch.object(database, "prewarm_pool"),
+		patch("app.main.warm_cache") as mock_warm_cache,
+	):
+		warm_up(settings, fill_cache=False)
+
+	mock_warm_cache.assert_not_called()
+
+
+def test_build_key_index_disabled_by_default():
+	"""Test that the key index stays unused unless enabled"""
+	assert build_key_index(get_settings()) == 0
+	assert not KEY_INDEX.ready
+
+
+def test_build_key_index_loads_every_key(
+	monkeypatch, client, db_session, key_index
+):
+	"""Test that the key index holds the keys of the database"""
+	monkeypatch.setitem(database._state, "engine", db_session.get_bind())
+	settings = get_settings().model_copy(update={"key_index_enabled": True})
+	db_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com")
+	)
+
+	assert build_key_index(settings) == 1
+	assert key_index.ready
+	assert db_url.key in key_index
+
+
+def test_warm_up_builds_key_index(monkeypatch):
+	"""Test that workers build their own key index unless preloaded"""
+	monkeypatch.setattr(database, "get_engine", lambda settings: None)
+
+	with (
+		patch.object(database, "prewarm_pool"),
+		patch("app.main.warm_cache"),
+		patch("app.main.build_key_index") as mock_build,
+	):
+		warm_up(get_settings())
+		warm_up(get_settings(), fill_cache=False)
+
+	mock_build.assert_called_once_with(get_settings())
+
+
+@pytest.fixture
+def reset_blocklist():
+	"""Leave the blocklist disabled after the test"""
+	yield
+	BLOCKLIST.stop()
+	BLOCKLIST.configure("", reload_interval=30.0)
+
+
+def test_load_blocklist(tmp_path, caplog, reset_blocklist):
+	"""Test loading the configured blocklist, and a missing file"""
+	path = tmp_path / "blocklist.txt"
+	path.write_text("evil.com\nphish.org\n")
+	assert load_blocklist(get_settings()) == 0
+
+	settings = get_settings().model_copy(update={"blocklist_path": str(path)})
+	create_app(settings)
+	assert load_blocklist(settings) == 2
+
+	path.unlink()
+	assert load_blocklist(settings) == 0
+	assert "Can't load the blocklist" in caplog.text
+	assert len(BLOCKLIST) == 2
+
+
+def test_lifespan_loads_and_watches_blocklist(
+	monkeypatch, tmp_path, reset_blocklist
+):
+	"""Test that workers load the blocklist and watch it for changes"""
+	monkeypatch.setitem(database._state, "engine", None)
+	path = tmp_path / "blocklist.txt"
+	path.write_text("evil.com\n")
+	settings = get_settings().model_copy(
+		update={
+			"db_url": f"sqlite:///{tmp_path}/lifespan.db",
+			"blocklist_path": str(path),
+		}
+	)
+
+	with TestClient(create_app(settings)):
+		assert len(BLOCKLIST) == 1
+		assert BLOCKLIST._thread is not None
+
+	assert BLOCKLIST._thread is None
@@ -0,0 +1,268 @@
+"""
+Unit tests for app/server.py module (the production launcher)
+"""
+
+import asyncio
+import os
+import signal
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import uvicorn
+from sqlalchemy.exc import OperationalError
+
+from app import server
+from app.core import database
+from app.server import Launcher
+
+pytestmark = pytest.mark.filterwarnings(
+	"ignore:This process .* is multi-threaded:DeprecationWarning"
+)
+
+
+def idle_worker(on_ready):
+	"""Worker that serves nothing until SIGTERM (default action) ends it"""
+	on_ready()
+	while True:
+		time.sleep(1)
+
+
+def failing_worker(on_ready):
+	raise SystemExit(3)
+
+
+def wait_for(condition, timeout=10.0):
+	deadline = time.monotonic() + timeout
+	while not condition():
+		if time.monotonic() > deadline:
+			raise AssertionError("Condition not met in time")
+		time.sleep(0.05)
+
+
+@pytest.fixture
+def master_signals():
+	"""Restore the test process' signal handlers"""
+	handlers = {sig: signal.getsignal(sig) for sig in server.MASTER_SIGNALS}
+	yield
+	for sig, handler in handlers.items():
+		signal.signal(sig, handler)
+
+
+def test_worker_count_defaults_to_usable_cores(monkeypatch):
+	"""Test that 0 workers means one per CPU core"""
+	assert server.worker_count(3) == 3
+	assert server.worker_count(0) == len(os.sched_getaffinity(0))
+
+	monkeypatch.delattr(server.os, "sched_getaffinity")
+	assert server.worker_count(0) == (os.cpu_count() or 1)
+
+
+def test_bind_socket_is_inheritable():
+	"""Test that forked workers can accept on the master's socket"""
+	sock = server.bind_socket("127.0.0.1", 0)
+	try:
+		assert sock.get_inheritable()
+	finally:
+		sock.close()
+
+
+def test_launcher_supervises_workers(master_signals, monkeypatch):
+	"""Test startup, crash replacement, rolling restart and stop"""
+	launcher = Launcher(idle_worker, workers=2, graceful_timeout=5.0)
+	result = {}
+	retired = []
+	monkeypatch.setattr(server.REGISTRY, "retire", retired.append)
+
+	def drive():
+		wait_for(lambda: len(launcher.pids) == 2)
+		time.sleep(0.3)
+		first = set(launcher.pids)
+
+		crashed = next(iter(first))
+		os.kill(crashed, signal.SIGKILL)
+		wait_for(
+			lambda: crashed not in launcher.pids and len(launcher.pids) == 2
+		)
+		after_crash = set(launcher.pids)
+
+		os.kill(os.getpid(), signal.SIGHUP)
+		wait_for(lambda: not launcher.pids & after_crash)
+		result["after_restart"] = set(launcher.pids)
+
+		os.kill(os.getpid(), signal.SIGTERM)
+
+	thread = threading.Thread(target=drive)
+	thread.start()
+	status = launcher.run()
+	thread.join()
+
+	assert status == 0
+	assert len(result["after_restart"]) == 2
+	assert launcher.pids == set()
+	# Crashed, replaced and stopped workers all leave their metrics dump
+	assert len(retired) == 5
+	assert len(set(retired)) == 5
+
+
+def test_launcher_fails_when_workers_cannot_start(master_signals):
+	"""Test that the master gives up if a worker exits before ready"""
+	launcher = Launcher(failing_worker, workers=2, graceful_timeout=1.0)
+
+	assert launcher.run() == 1
+	assert launcher.pids == set()
+
+
+def test_rolling_restart_keeps_workers_when_replacement_fails():
+	"""Test that a broken replacement aborts the restart"""
+	launcher = Launcher(idle_worker, workers=1, graceful_timeout=5.0)
+	old_pid, ready_fd = launcher.spawn()
+	assert launcher.wait_ready(old_pid, ready_fd)
+
+	launcher.worker = failing_worker
+	launcher.rolling_restart()
+
+	assert launcher.pids == {old_pid}
+	launcher.stop()
+	assert launcher.pids == set()
+
+
+def test_stop_worker_kills_worker_ignoring_sigterm():
+	"""Test that a hung worker is SIGKILLed after the graceful timeout"""
+
+	def stubborn_worker(on_ready):
+		signal.signal(signal.SIGTERM, signal.SIG_IGN)
+		idle_worker(on_ready)
+
+	launcher = Launcher(stubborn_worker, workers=1, graceful_timeout=0.2)
+	pid, ready_fd = launcher.spawn()
+	assert launcher.wait_ready(pid, ready_fd)
+
+	launcher.stop_worker(pid)
+
+	with pytest.raises(ChildProcessError):
+		os.waitpid(pid, os.WNOHANG)
+
+
+def test_stop_worker_ignores_reaped_worker():
+	"""Test stopping a worker that is already gone"""
+	launcher = Launcher(idle_worker, workers=1)
+	launcher.pids.add(123)
+
+	with patch.object(server.os, "kill", side_effect=ProcessLookupError):
+		launcher.stop_worker(123)
+
+	assert launcher.pids == set()
+
+
+def test_run_worker_reports_ready_and_exit_status(master_signals, monkeypatch):
+	"""Test the child side of spawn without forking"""
+	monkeypatch.setitem(database._state, "engine", None)
+
+	def exit_status(worker):
+		read_fd, write_fd = os.pipe()
+		status = Launcher(worker, workers=1)._run_worker(
+			os.dup(read_fd), write_fd
+		)
+		os.close(write_fd)
+		with os.fdopen(read_fd, "rb") as pipe:
+			return status, pipe.read()
+
+	def crashing_worker(on_ready):
+		raise RuntimeError("boom")
+
+	def exiting_worker(on_ready):
+		raise SystemExit("bye")
+
+	assert exit_status(lambda on_ready: on_ready()) == (0, b".")
+	assert exit_status(failing_worker) == (3, b"")
+	assert exit_status(crashing_worker) == (1, b"")
+	assert exit_status(exiting_worker) == (1, b"")
+	assert signal.getsignal(signal.SIGHUP) == signal.SIG_DFL
+
+
+def test_preload_warms_cache_and_drops_engine(monkeypatch):
+	"""Test that the master keeps no engine after preloading"""
+	app = MagicMock()
+	app.state.cache_preloaded = False
+	with (
+		patch("app.server.warm_cache", return_value=5) as mock_warm_cache,
+		patch("app.server.build_key_index") as mock_build_key_index,
+		patch("app.server.load_blocklist") as mock_load_blocklist,
+		patch("app.server.database.dispose_engine") as mock_dispose,
+		patch("app.server.gc.freeze") as mock_freeze,
+	):
+		server.preload(app)
+
+	mock_warm_cache.assert_called_once_with(app.state.settings)
+	mock_build_key_index.assert_called_once_with(app.state.settings)
+	mock_load_blocklist.assert_called_once_with(app.state.settings)
+	assert app.state.cache_preloaded is True
+	mock_dispose.assert_called_once()
+	mock_freeze.assert_called_once()
+
+
+def test_preload_survives_database_errors(caplog):
+	"""Test that workers fill their own cache if the master can't"""
+	app = MagicMock()
+	app.state.cache_preloaded = False
+	with (
+		patch(
+			"app.server.warm_cache",
+			side_effect=OperationalError("SELECT", {}, Exception("down")),
+		),
+		patch("app.server.database.dispose_engine") as mock_dispose,
+		patch("app.server.gc.freeze"),
+	):
+		server.preload(app)
+
+	assert app.state.cache_preloaded is False
+	assert "Cache preload failed" in caplog.text
+	mock_dispose.assert_called_once()
+
+
+def test_worker_server_reports_ready_after_startup():
+	"""Test that readiness is reported only for a successful startup"""
+	config = uvicorn.Config(MagicMock())
+	on_ready = MagicMock()
+	worker_server = server.WorkerServer(config, on_ready)
+
+	with patch.object(uvicorn.Server, "startup", AsyncMock()):
+		asyncio.run(worker_server.startup())
+		on_ready.assert_called_once()
+
+		worker_server.should_exit = True
+		asyncio.run(worker_server.startup())
+		on_ready.assert_called_once()
+
+
+def test_serve_runs_uvicorn_on_given_socket():
+	"""Test that workers serve the preloaded app on the shared socket"""
+	sock = MagicMock()
+	with patch.object(server.WorkerServer, "run") as mock_run:
+		server.serve(MagicMock(), sock, MagicMock())
+
+	mock_run.assert_called_once_with(sockets=[sock])
+
+
+def test_main_preloads_binds_and_runs_launcher():
+	"""Test the command line entry point wiring"""
+	sock = MagicMock()
+	with (
+		patch("app.server.preload") as mock_preload,
+		patch("app.server.bind_socket", return_value=sock) as mock_bind,
+		patch("app.server.Launcher") as mock_launcher,
+		patch("app.server.serve") as mock_serve,
+	):
+		mock_launcher.return_value.run.return_value = 0
+		status = server.main(["--port", "9000", "--workers", "3"])
+		worker = mock_launcher.call_args.args[0]
+		worker("on_ready")
+
+	assert status == 0
+	mock_preload.assert_called_once_with(server.app)
+	mock_bind.assert_called_once_with("0.0.0.0", 9000)
+	assert mock_launcher.call_args.kwargs["workers"] == 3
+	mock_serve.assert_called_once_with(server.app, sock, "on_ready")
+	sock.close.assert_called_once()
@@ -0,0 +1,161 @@
+"""
+Unit tests for archive.py module
+"""
+
+from datetime import timedelta
+
+from fastapi import status
+
+from app import models, schemas
+from app.api import crud
+from app.utils import archive
+
+
+def _create_inactive(db_session, target_url, custom_key=None):
+	db_url = crud.create_db_url(
+		db_session,
+		schemas.URLBase(target_url=target_url, custom_key=custom_key),
+	)
+	crud.deactivate_db_url_by_secret_key(db_session, db_url.secret_key)
+	return db_url.key
+
+
+def test_archive_moves_only_inactive_urls(client, db_session):
+	"""Test that only inactive URLs are moved into the archive table"""
+	inactive_key = _create_inactive(db_session, "https://example.com/old")
+	active = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/live")
+	)
+
+	archived = archive.archive_inactive_urls(
+		db_session, older_than=timedelta(0), chunk_size=10
+	)
+
+	assert archived == 1
+	assert db_session.query(models.URL).count() == 1
+	assert crud.get_db_url_by_key(db_session, active.key) is not None
+	archived_row = db_session.query(models.URLArchive).one()
+	assert archived_row.key == inactive_key
+	assert archived_row.is_active is False
+
+
+def test_archive_respects_minimum_age(client, db_session):
+	"""Test that recently created inactive URLs are kept in the hot table"""
+	_create_inactive(db_session, "https://example.com/recent")
+
+	archived = archive.archive_inactive_urls(
+		db_session, older_than=timedelta(days=1), chunk_size=10
+	)
+
+	assert archived == 0
+	assert db_session.query(models.URLArchive).count() == 0
+
+
+def test_archive_processes_in_chunks(client, db_session):
+	"""Test that archival works through the table in several chunks"""
+	for i in range(5):
+		_create_inactive(db_session, f"https://example.com/{i}")
+
+	archived = archive.archive_inactive_urls(
+		db_session, older_than=timedelta(0), chunk_size=2
+	)
+
+	assert archived == 5
+	assert db_session.query(models.URL).count() == 0
+	assert db_session.query(models.URLArchive).count() == 5
+
+
+def test_archive_resumes_from_checkpoint(client, db_session, tmp_path):
+	"""Test that a run resumes after the key stored in the checkpoint"""
+	for key in ("aaa-key", "bbb-key", "ccc-key"):
+		_create_inactive(db_session, "https://example.com/x", key)
+
+	checkpoint = tmp_path / "checkpoint.json"
+	created_before = crud.get_db_url_for_peek(db_session, "ccc-key").created_at
+	archive.save_checkpoint(
+		checkpoint, created_before + timedelta(seconds=1), "aaa-key"
+	)
+
+	archived = archive.archive_inactive_urls(
+		db_session,
+		older_than=timedelta(days=365),
+		chunk_size=1,
+		checkpoint_path=checkpoint,
+	)
+
+	assert archived == 2
+	assert not checkpoint.exists()
+	remaining = db_session.query(models.URL).one()
+	assert remaining.key == "aaa-key"
+
+
+def test_peek_falls_back_to_archive(client, db_session):
+	"""Test that peek keeps working for archived keys"""
+	key = _create_inactive(db_session, "https://example.com/archived")
+	archive.archive_inactive_urls(
+		db_session, older_than=timedelta(0), chunk_size=10
+	)
+
+	response = client.get(f"/peek/{key}")
+
+	assert response.status_code == status.HTTP_200_OK
+	assert response.json()["target_url"] == "https://example.com/archived"
+	assert response.json()["is_active"] is False
+
+
+def test_archived_custom_key_stays_reserved(client, db_session):
+	"""Test that an archived custom key cannot be reused"""
+	_create_inactive(db_session, "https://example.com/a", "kept-key")
+	archive.archive_inactive_urls(
+		db_session, older_than=timedelta(0), chunk_size=10
+	)
+
+	response = client.post(
+		"/url",
+		json={"target_url": "https://example.com/b", "custom_key": "kept-key"},
+	)
+
+	assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_archived_ids_are_not_reused(client, db_session):
+	"""Test that the newest row's id isn't handed out again once archived"""
+	_create_inactive(db_session, "https://example.com/first")
+	archive.archive_inactive_urls(
+		db_session, older_than=timedelta(0), chunk_size=10
+	)
+	_create_inactive(db_session, "https://example.com/second")
+
+	archived = archive.archive_inactive_urls(
+		db_session, older_than=timedelta(0), chunk_size=10
+	)
+
+	assert archived == 1
+	assert db_session.query(models.URLArchive).count() == 2
+
+
+def test_load_checkpoint_without_file(tmp_path):
+	"""Test that a missing checkpoint means starting from scratch"""
+	assert archive.load_checkpoint(tmp_path / "missing.json") is None
+
+
+def test_main_archives_with_cli_arguments(
+	client, db_session, monkeypatch, tmp_path, capsys
+):
+	"""Test the command line entry point"""
+	_create_inactive(db_session, "https://example.com/cli")
+	monkeypatch.setattr(archive, "SessionLocal", lambda bind: db_session)
+
+	archive.main(
+		[
+			"--days",
+			"0",
+			"--chunk-size",
+			"5",
+			"--checkpoint",
+			str(tmp_path / "checkpoint.json"),
+		]
+	)
+
+	assert "Archived 1 inactive URLs" in capsys.readouterr().out
+	assert db_session.query(models.URLArchive).count() == 1
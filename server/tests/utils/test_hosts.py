@@ -0,0 +1,64 @@
+"""
+Unit tests for hosts.py module
+"""
+
+from app.utils import hosts
+
+
+def test_normalize_host():
+	"""Test lowercasing, trailing dots and IDNA encoding"""
+	assert hosts.normalize_host("WWW.Example.COM.") == "www.example.com"
+	assert hosts.normalize_host("bücher.de") == "xn--bcher-kva.de"
+	assert hosts.normalize_host(" example.com ") == "example.com"
+
+
+def test_normalize_host_rejects_non_hosts():
+	"""Test that empty and malformed names are not hosts"""
+	assert hosts.normalize_host(None) is None
+	assert hosts.normalize_host("") is None
+	assert hosts.normalize_host("a..b") is None
+	assert hosts.normalize_host("a" * 64 + ".com") is None
+
+
+def test_reversed_target_host():
+	"""Test the reversed_host column value of target URLs"""
+	assert (
+		hosts.reversed_target_host("https://user@WWW.Example.com:8443/p?q")
+		== "com.example.www"
+	)
+	assert hosts.reversed_target_host("http://localhost/") == "localhost"
+	assert hosts.reversed_target_host("not a url") is None
+	assert hosts.reversed_target_host("http://[bad/") is None
+
+
+def test_is_in_domain():
+	"""Test that a domain holds itself and its subdomains, not lookalikes"""
+	assert hosts.is_in_domain("com.evil", "com.evil")
+	assert hosts.is_in_domain("com.evil.login", "com.evil")
+	assert not hosts.is_in_domain("com.evil-twin", "com.evil")
+	assert not hosts.is_in_domain("com.evilx", "com.evil")
+	assert not hosts.is_in_domain(None, "com.evil")
+
+
+def test_normalize_host_ascii_labels():
+	"""Test the label checks of ASCII names, done without the IDNA codec"""
+	assert hosts.normalize_host("a" * 63 + ".com") == "a" * 63 + ".com"
+	assert hosts.normalize_host(".example.com") is None
+	assert hosts.normalize_host("ü" * 64 + ".de") is None
+
+
+def test_split_target():
+	"""Test splitting a target URL into its origin and the rest, verbatim"""
+	assert hosts.split_target("https://Example.com:8443/a?b#c") == (
+		"https://Example.com:8443",
+		"/a?b#c",
+	)
+	assert hosts.split_target("https://example.com") == (
+		"https://example.com",
+		"",
+	)
+	assert hosts.split_target("https://example.com?q") == (
+		"https://example.com",
+		"?q",
+	)
+	assert hosts.split_target("no scheme") == ("", "no scheme")
@@ -3,8 +3,10 @@ Unit tests for keygen.py module
 """
 
 import string
+from datetime import datetime
 from unittest.mock import patch
 
+from app import models
 from app.utils import keygen
 
 
@@ -89,6 +91,25 @@ def test_create_unique_random_key_handles_collision(db_session):
 		assert unique_key == "NEWKEY123"
 
 
+def test_create_unique_random_key_skips_archived_and_indexed_keys(
+	client, db_session, key_index
+):
+	"""Test that archived keys and keys in the key index are never reused"""
+	db_session.add(
+		models.URLArchive(id=1, key="ARCHD", created_at=datetime(2020, 1, 1))
+	)
+	db_session.commit()
+
+	with patch("app.utils.keygen.create_random_key") as mock_create:
+		mock_create.side_effect = ["ARCHD", "FRESH"]
+		assert keygen.create_unique_random_key(db_session) == "FRESH"
+
+	key_index.build(["INDXD"])
+	with patch("app.utils.keygen.create_random_key") as mock_create:
+		mock_create.side_effect = ["INDXD", "OTHER"]
+		assert keygen.create_unique_random_key(db_session) == "OTHER"
+
+
 def test_create_unique_random_key_multiple_collisions(db_session):
 	"""Test that create_unique_random_key handles multiple collisions"""
 	from app import schemas
@@ -116,6 +137,24 @@ def test_create_unique_random_key_multiple_collisions(db_session):
 		assert unique_key == "UNIQUE999"
 
 
+def test_create_unique_random_key_counts_retries(db_session):
+	"""Test that every collision is counted in the keygen retries metric"""
+	from app import schemas
+	from app.api import crud
+	from app.core.metrics import KEYGEN_RETRIES
+
+	existing_url = crud.create_db_url(
+		db_session, schemas.URLBase(target_url="https://example.com/retry")
+	)
+	retries_before = KEYGEN_RETRIES.values.get((), 0)
+
+	with patch("app.utils.keygen.create_random_key") as mock_create:
+		mock_create.side_effect = [existing_url.key, "RETRY42"]
+		keygen.create_unique_random_key(db_session)
+
+	assert KEYGEN_RETRIES.values[()] == retries_before + 1
+
+
 def test_create_random_key_length_one():
 	"""Test that create_random_key works with length of 1"""
 	key = keygen.create_random_key(length=1)
@@ -225,3 +264,69 @@ def test_key_exists_in_db_with_nonexistent_key(db_session):
 
 	# Check that a random key doesn't exist
 	assert crud.key_exists_in_db(db_session, "nonexistent-key") is False
+
+
+def test_is_key_available_uses_built_key_index(db_session, key_index):
+	"""Test that a built key index answers without querying the database"""
+	key_index.build(["taken-key"])
+
+	with patch("app.api.crud.key_exists_in_db") as mock_exists:
+		assert keygen.is_key_available(db_session, "taken-key") is False
+		assert keygen.is_key_available(db_session, "free-key") is True
+
+	mock_exists.assert_not_called()
+
+
+def test_is_valid_custom_key_follows_urlbase_rules():
+	"""Test the pattern, length limits and reserved words"""
+	assert keygen.is_valid_custom_key("my_link-2")
+	assert not keygen.is_valid_custom_key("ab")
+	assert not keygen.is_valid_custom_key("a" * 51)
+	assert not keygen.is_valid_custom_key("my link")
+	assert not keygen.is_valid_custom_key("abc\n")
+	assert not keygen.is_valid_custom_key("Metrics")
+
+
+def test_key_candidates_continue_numbering():
+	"""Test that a numbered key suggests the next numbers"""
+	candidates = list(keygen.key_candidates("promo-9"))
+
+	assert candidates[:3] == ["promo-9", "promo_9", "promo9"]
+	assert candidates[4:6] == ["promo-10", "promo-11"]
+
+
+def test_key_candidates_fit_length_limit():
+	"""Test that numbered candidates of long keys are truncated"""
+	key = "a" * 50
+
+	candidates = list(keygen.key_candidates(key))
+
+	assert candidates[2] == "a" * 48 + "-2"
+	assert all(len(c) <= 50 for c in candidates)
+
+
+def test_suggest_keys_uses_one_query(db_session):
+	"""Test that all candidates are checked in a single batch"""
+	from app.api import crud
+
+	with patch(
+		"app.api.crud.get_taken_keys", wraps=crud.get_taken_keys
+	) as mock_taken:
+		suggestions = keygen.suggest_keys(db_session, "batch", 3)
+
+	assert suggestions == ["batch-2", "batch2", "batch-3"]
+	mock_taken.assert_called_once()
+	assert len(mock_taken.call_args.args[1]) == (
+		keygen.MAX_SUGGESTION_CANDIDATES
+	)
+
+
+def test_suggest_keys_uses_built_key_index(db_session, key_index):
+	"""Test that a built key index answers without querying"""
+	key_index.build(["idx-2", "idx2"])
+
+	with patch("app.api.crud.get_taken_keys") as mock_taken:
+		suggestions = keygen.suggest_keys(db_session, "idx", 2)
+
+	assert suggestions == ["idx-3", "idx3"]
+	mock_taken.assert_not_called()
@@ -0,0 +1,99 @@
+"""
+Unit tests for the bulk takedown (takedown.py)
+"""
+
+import pytest
+
+from app import models, schemas
+from app.api import crud
+from app.core.cache import REDIRECT_CACHE
+from app.utils import takedown
+
+
+def _create(db_session, target_url):
+	return crud.create_db_url(
+		db_session, schemas.URLBase(target_url=target_url)
+	)
+
+
+@pytest.fixture
+def redirect_cache():
+	"""Redirect cache enabled for the test"""
+	REDIRECT_CACHE.configure(max_size=100, ttl=60.0)
+	yield REDIRECT_CACHE
+	REDIRECT_CACHE.configure(max_size=0, ttl=60.0)
+
+
+def test_parse_domain():
+	"""Test that wildcards, case and trailing dots are accepted"""
+	assert takedown.parse_domain("*.Evil.com.") == "evil.com"
+	with pytest.raises(ValueError, match="not a valid domain"):
+		takedown.parse_domain("..")
+
+
+def test_take_down_domain_matches_subdomains_only(client, db_session):
+	"""Test that the domain and its subdomains, not lookalikes, go down"""
+	hit = [
+		_create(db_session, "https://evil.com/a"),
+		_create(db_session, "https://login.EVIL.com/b"),
+		_create(db_session, "http://a.b.evil.com:8080/c"),
+	]
+	spared = [
+		_create(db_session, "https://notevil.com/"),
+		_create(db_session, "https://evil.com.example.org/"),
+		_create(db_session, "https://evil.co/"),
+		_create(db_session, "https://evil-twin.com/"),
+	]
+
+	deactivated = takedown.take_down_domain(db_session, "evil.com", 100)
+
+	assert deactivated == len(hit)
+	for db_url in hit:
+		db_session.refresh(db_url)
+		assert db_url.is_active is False
+		assert db_url.version == 2
+	for db_url in spared:
+		db_session.refresh(db_url)
+		assert db_url.is_active is True
+
+
+def test_take_down_domain_in_batches_with_progress(
+	client, db_session, redirect_cache
+):
+	"""Test chunked deactivation, progress and cache eviction"""
+	keys = [_create(db_session, f"https://evil.com/{i}").key for i in range(5)]
+	for key in keys:
+		redirect_cache.set(key, "cached")
+	progress = []
+
+	deactivated = takedown.take_down_domain(
+		db_session, "evil.com", batch_size=2, progress=progress.append
+	)
+
+	assert deactivated == 5
+	assert progress == [2, 4, 5]
+	assert all(redirect_cache.get(key) is None for key in keys)
+	assert takedown.take_down_domain(db_session, "evil.com", 2) == 0
+
+
+def test_main_takes_down_with_cli_arguments(
+	client, db_session, monkeypatch, capsys
+):
+	"""Test the command line entry point"""
+	_create(db_session, "https://evil.com/cli")
+	monkeypatch.setattr(takedown, "SessionLocal", lambda bind: db_session)
+
+	takedown.main(["evil.com", "--batch-size", "5"])
+
+	assert "Took down 1 links to evil.com" in capsys.readouterr().out
+	assert db_session.query(models.URL).filter_by(is_active=True).count() == 0
+
+
+def test_main_rejects_invalid_domain(db_session, monkeypatch, capsys):
+	"""Test that the command line reports invalid domains"""
+	monkeypatch.setattr(takedown, "SessionLocal", lambda bind: db_session)
+
+	with pytest.raises(SystemExit):
+		takedown.main([".."])
+
+	assert "not a valid domain" in capsys.readouterr().err